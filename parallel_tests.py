@@ -0,0 +1,181 @@
+"""
+Параллельный запуск тестов YaNews и YaNote.
+
+Для каждого проекта один раз строится шаблонная тестовая база
+с применёнными миграциями; она пересобирается, только когда
+меняются миграции. Тестовые файлы делятся между процессами,
+каждый процесс получает свою копию шаблона и запускает pytest
+с --reuse-db, поэтому миграции заново не выполняются. В конце
+печатаются самые медленные тесты всех процессов.
+
+    python parallel_tests.py --shards 2 --slowest 10
+"""
+import argparse
+import hashlib
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from importlib.metadata import version
+from pathlib import Path
+from xml.etree import ElementTree
+
+BASE_DIR = Path(__file__).resolve().parent
+
+Project = namedtuple('Project', ('name', 'settings', 'tests'))
+Shard = namedtuple(
+    'Shard', ('project', 'index', 'returncode', 'output', 'seconds', 'report')
+)
+
+PROJECTS = {
+    'ya_news': Project('ya_news', 'yanews.settings', 'news/pytest_tests'),
+    'ya_note': Project('ya_note', 'yanote.settings', 'notes/tests'),
+}
+BUILD_TEMPLATE = (
+    'import django; django.setup(); '
+    'from django.db import connection; '
+    'connection.creation.create_test_db(verbosity=0, keepdb=True)'
+)
+
+
+def project_env(project, database):
+    return dict(
+        os.environ,
+        DJANGO_SETTINGS_MODULE=project.settings,
+        DJANGO_TEST_DATABASE=str(database),
+    )
+
+
+def migrations_digest(project):
+    """Хеш файлов миграций и версии Django: ключ шаблонной базы."""
+    digest = hashlib.sha1(version('django').encode())
+    for path in sorted((BASE_DIR / project.name).glob('*/migrations/*.py')):
+        digest.update(path.name.encode())
+        digest.update(path.read_bytes())
+    return digest.hexdigest()[:12]
+
+
+def build_template(project, cache_dir):
+    """Путь к шаблону; при необходимости шаблон строится заново."""
+    template = cache_dir / f'{project.name}-{migrations_digest(project)}.db'
+    if template.exists():
+        return template
+    building = template.with_suffix(f'.{os.getpid()}.tmp')
+    subprocess.run(
+        [sys.executable, '-c', BUILD_TEMPLATE],
+        cwd=BASE_DIR / project.name,
+        env=project_env(project, building),
+        check=True,
+    )
+    os.replace(building, template)
+    return template
+
+
+def split_files(project, shards):
+    """Делит тестовые файлы между процессами, крупные — первыми."""
+    files = sorted(
+        (BASE_DIR / project.name / project.tests).glob('test_*.py'),
+        key=lambda path: path.stat().st_size, reverse=True
+    )
+    groups = [[] for _ in range(min(shards, len(files)))]
+    sizes = [0] * len(groups)
+    for path in files:
+        smallest = sizes.index(min(sizes))
+        groups[smallest].append(path)
+        sizes[smallest] += path.stat().st_size
+    return groups
+
+
+def run_shard(project, index, files, template, work_dir):
+    database = work_dir / f'{project.name}-{index}.db'
+    report = work_dir / f'{project.name}-{index}.xml'
+    shutil.copyfile(template, database)
+    started = time.perf_counter()
+    process = subprocess.run(
+        [sys.executable, '-m', 'pytest', '-q', '--reuse-db',
+         f'--junitxml={report}',
+         *(str(path.relative_to(BASE_DIR / project.name)) for path in files)],
+        cwd=BASE_DIR / project.name,
+        env=project_env(project, database),
+        capture_output=True, text=True,
+    )
+    return Shard(
+        project.name, index, process.returncode,
+        process.stdout + process.stderr,
+        time.perf_counter() - started, report
+    )
+
+
+def slowest_tests(shards, count):
+    timings = []
+    for shard in shards:
+        if not shard.report.exists():
+            continue
+        for case in ElementTree.parse(shard.report).iter('testcase'):
+            timings.append((
+                float(case.get('time', 0)), shard.project,
+                f'{case.get("classname")}::{case.get("name")}'
+            ))
+    return sorted(timings, reverse=True)[:count]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        '--projects', nargs='+', choices=PROJECTS, default=list(PROJECTS)
+    )
+    parser.add_argument(
+        '--shards', type=int, default=2,
+        help='Процессов pytest на каждый проект.'
+    )
+    parser.add_argument('--slowest', type=int, default=10)
+    parser.add_argument(
+        '--cache-dir',
+        default=os.path.join(tempfile.gettempdir(), 'practice_test_templates'),
+        help='Где хранить шаблонные базы между запусками.'
+    )
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    cache_dir = Path(args.cache_dir)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    projects = [PROJECTS[name] for name in args.projects]
+    with ThreadPoolExecutor(len(projects)) as pool:
+        templates = dict(zip(args.projects, pool.map(
+            lambda project: build_template(project, cache_dir), projects
+        )))
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        jobs = [
+            (project, index, files)
+            for project in projects
+            for index, files in enumerate(split_files(project, args.shards))
+        ]
+        with ThreadPoolExecutor(len(jobs)) as pool:
+            shards = list(pool.map(
+                lambda job: run_shard(
+                    *job, templates[job[0].name], Path(work_dir)
+                ),
+                jobs
+            ))
+        slowest = slowest_tests(shards, args.slowest)
+
+    for shard in shards:
+        summary = shard.output.strip().splitlines()[-1:] or ['']
+        print(f'{shard.project}[{shard.index}] {shard.seconds:.1f} с: '
+              f'{summary[0]}')
+        if shard.returncode:
+            print(shard.output)
+    print(f'\nСамые медленные тесты (из {len(shards)} процессов):')
+    for seconds, project, test in slowest:
+        print(f'{seconds:8.3f} с  {project}  {test}')
+    print(f'\nВсего: {time.perf_counter() - started:.1f} с')
+    sys.exit(max(shard.returncode for shard in shards))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+"""
+Замеры производительности YaNews.
+
+Каждый модуль запускается из каталога проекта:
+``python -m benchmarks.<имя модуля> --help``.
+"""
+import os
+import statistics
+import time
+
+
+def setup_django(database=None):
+    """
+    Настраивает Django для запуска вне manage.py.
+
+    database — путь к отдельному файлу SQLite, чтобы замеры
+    не трогали рабочую базу проекта.
+    """
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yanews.settings')
+    if database:
+        os.environ['DJANGO_DATABASE_FILE'] = str(database)
+    import django
+    from django.conf import settings
+
+    if database:
+        settings.DATABASES['default'].setdefault('OPTIONS', {})['timeout'] = 60
+    django.setup()
+
+
+def measure(func, repeat=5):
+    """Лучшее и медианное время выполнения func в секундах."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings), statistics.median(timings)
+
+
+def print_table(header, rows):
+    widths = [
+        max(len(str(value)) for value in column)
+        for column in zip(header, *rows)
+    ]
+    for row in (header, *rows):
+        print('  '.join(
+            str(value).rjust(width) for value, width in zip(row, widths)
+        ))
@@ -0,0 +1,169 @@
+"""
+Синхронные и асинхронные NewsList/NewsDetail под ASGI.
+
+ASGI-приложение вызывается в том же процессе, как это делает
+uvicorn: много клиентов одновременно, каждый медленно принимает
+ответ (--client-delay). --query-latency добавляет задержку к каждому
+SQL-запросу, как у базы на другой машине. Каждый режим замеряется
+в отдельном процессе на одной и той же заполненной базе.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks import print_table, setup_django
+
+MODES = {'sync': '0', 'async': '1'}
+
+
+def add_query_latency(seconds):
+    from django.db.backends.signals import connection_created
+
+    def slow_execute(execute, sql, params, many, context):
+        time.sleep(seconds)
+        return execute(sql, params, many, context)
+
+    def install(sender, connection, **kwargs):
+        # Обёртка соединения переживает переподключения: не дублируем.
+        if slow_execute not in connection.execute_wrappers:
+            connection.execute_wrappers.append(slow_execute)
+
+    connection_created.connect(install, weak=False)
+
+
+async def request(application, path, cookie, client_delay):
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+        'method': 'GET', 'scheme': 'http', 'path': path,
+        'raw_path': path.encode(), 'query_string': b'', 'root_path': '',
+        'headers': [(b'host', b'127.0.0.1'), (b'cookie', cookie.encode())],
+        'client': ('127.0.0.1', 50000), 'server': ('127.0.0.1', 80),
+    }
+    status = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            status.append(message['status'])
+        elif client_delay:
+            await asyncio.sleep(client_delay)
+
+    await application(scope, receive, send)
+    return status[0]
+
+
+async def load(application, routes, cookie, args):
+    latencies = {name: [] for name in routes}
+    errors = {name: 0 for name in routes}
+    deadline = time.perf_counter() + args.duration
+
+    async def client(number):
+        rng = random.Random(number)
+        while time.perf_counter() < deadline:
+            name = rng.choice(list(routes))
+            start = time.perf_counter()
+            status = await request(
+                application, routes[name](rng), cookie,
+                args.client_delay / 1000
+            )
+            latencies[name].append(time.perf_counter() - start)
+            errors[name] += status >= 400
+
+    await asyncio.gather(*(client(n) for n in range(args.clients)))
+    return latencies, errors
+
+
+def worker(args):
+    """Замер одного режима: печатает JSON с итогами по маршрутам."""
+    setup_django()
+    if args.query_latency:
+        add_query_latency(args.query_latency / 1000)
+    from django.contrib.auth import get_user_model
+    from django.core.asgi import get_asgi_application
+    from django.urls import reverse
+
+    from benchmarks.harness import login_cookie
+    from news.models import News
+
+    application = get_asgi_application()
+    news_ids = list(News.objects.values_list('pk', flat=True)[:200])
+    cookie = login_cookie(get_user_model().objects.order_by('pk').first())
+    routes = {
+        'news:home': lambda rng: reverse('news:home'),
+        'news:detail': lambda rng: reverse(
+            'news:detail', args=(rng.choice(news_ids),)
+        ),
+    }
+    started = time.perf_counter()
+    latencies, errors = asyncio.run(load(application, routes, cookie, args))
+    elapsed = time.perf_counter() - started
+    result = {}
+    for name, samples in latencies.items():
+        ordered = sorted(samples)
+        result[name] = {
+            'rps': len(ordered) / elapsed,
+            'p50_ms': statistics.median(ordered) * 1000,
+            'p95_ms': ordered[int(len(ordered) * 0.95)] * 1000,
+            'errors': errors[name],
+        }
+    print(json.dumps(result))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--clients', type=int, default=50)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument(
+        '--client-delay', type=float, default=20,
+        help='Мс, за которые клиент принимает тело ответа.'
+    )
+    parser.add_argument(
+        '--query-latency', type=float, default=2,
+        help='Мс задержки на каждый SQL-запрос.'
+    )
+    parser.add_argument('--worker', action='store_true', help='Служебный.')
+    args = parser.parse_args()
+    if args.worker:
+        worker(args)
+        return
+
+    rows = []
+    with tempfile.TemporaryDirectory() as directory:
+        database = os.path.join(directory, 'asgi.sqlite3')
+        env = dict(os.environ, DJANGO_DATABASE_FILE=database)
+        subprocess.run(
+            [sys.executable, '-m', 'benchmarks.seed', '--database', database,
+             '--news', '2000', '--comments', '50000', '--users', '50'],
+            env=env, check=True, capture_output=True,
+        )
+        for mode, flag in MODES.items():
+            output = subprocess.run(
+                [sys.executable, '-m', 'benchmarks.asgi_views', '--worker',
+                 *sys.argv[1:]],
+                env=dict(env, NEWS_ASYNC_VIEWS=flag),
+                capture_output=True, text=True, check=True,
+            ).stdout
+            for name, result in json.loads(
+                    output.strip().splitlines()[-1]
+            ).items():
+                rows.append((
+                    mode, name, round(result['rps'], 1),
+                    round(result['p50_ms'], 1), round(result['p95_ms'], 1),
+                    result['errors'],
+                ))
+    print_table(
+        ('режим', 'маршрут', 'rps', 'p50, мс', 'p95, мс', 'ошибки'), rows
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""Сравнение автомата BadWordsMatcher с проверкой слов по одному."""
+import argparse
+import random
+
+from benchmarks import measure, print_table
+from news.moderation import BadWordsMatcher
+
+ALPHABET = 'абвгдеёжзийклмнопрстуфхцчшщъыьэюя'
+
+
+def random_word(rng, min_length=4, max_length=12):
+    length = rng.randint(min_length, max_length)
+    return ''.join(rng.choice(ALPHABET) for _ in range(length))
+
+
+def loop_search(words, text):
+    """Прежняя реализация CommentForm.clean_text."""
+    lowered_text = text.lower()
+    for word in words:
+        if word in lowered_text:
+            return word
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        '--words', type=int, nargs='+', default=[100, 10_000, 50_000]
+    )
+    parser.add_argument(
+        '--text-length', type=int, nargs='+', default=[1_000, 100_000]
+    )
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    rows = []
+    for words_count in args.words:
+        words = [random_word(rng) for _ in range(words_count)]
+        build, _ = measure(lambda: BadWordsMatcher(words), repeat=1)
+        matcher = BadWordsMatcher(words)
+        for text_length in args.text_length:
+            # Чистый текст — худший случай: нужно проверить всё.
+            text = ' '.join(
+                random_word(rng, 2, 3) for _ in range(text_length // 3)
+            )[:text_length]
+            loop, _ = measure(lambda: loop_search(words, text), args.repeat)
+            automaton, _ = measure(
+                lambda: matcher.search(text), args.repeat
+            )
+            rows.append((
+                words_count, text_length, f'{build * 1000:.1f}',
+                f'{loop * 1000:.2f}', f'{automaton * 1000:.2f}',
+                f'{loop / automaton:.1f}x',
+            ))
+    print_table(
+        ('слов', 'символов', 'сборка, мс', 'цикл, мс', 'автомат, мс',
+         'ускорение'),
+        rows,
+    )
+
+
+if __name__ == '__main__':
+    main()
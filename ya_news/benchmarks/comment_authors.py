@@ -0,0 +1,119 @@
+"""
+Авторы комментариев на странице новости: запросы, время и память.
+
+Обсуждение из множества комментариев, написанных несколькими
+пользователями. Комментарии читаются и рендерятся шаблоном
+news/includes/comment_list.html в режимах:
+
+- prefetch: prefetch_related('author'), полные строки пользователей
+  отдельным запросом;
+- join: select_related('author'), полный пользователь в каждой строке
+  и свой объект User на каждый комментарий;
+- компактно: with_authors и AuthorMap — в строке только id и имя,
+  один объект на автора.
+
+Память — по tracemalloc: сколько занимает прочитанный список
+комментариев и пик вместе с рендерингом.
+"""
+import argparse
+import os
+import tempfile
+import tracemalloc
+
+from benchmarks import measure, print_table, setup_django
+
+MODES = ('prefetch', 'join', 'компактно')
+
+
+def prepare(comments_count, users_count):
+    from django.contrib.auth import get_user_model
+    from django.contrib.auth.hashers import make_password
+    from django.core.management import call_command
+
+    from news.models import Comment, News
+
+    call_command('migrate', verbosity=0)
+    User = get_user_model()
+    password = make_password('password')
+    User.objects.bulk_create(
+        User(username=f'Пользователь {index}', password=password,
+             email=f'user{index}@example.com')
+        for index in range(users_count)
+    )
+    users = list(User.objects.all())
+    news = News.objects.create(title='Обсуждение', text='Текст')
+    Comment.objects.bulk_create(
+        Comment(news=news, author=users[index % users_count],
+                text=f'Комментарий {index}')
+        for index in range(comments_count)
+    )
+    return news
+
+
+def load(mode, news):
+    from news.authors import AuthorMap, with_authors
+    from news.models import Comment
+
+    queryset = Comment.objects.filter(news=news).order_by('created', 'id')
+    if mode == 'prefetch':
+        return list(queryset.prefetch_related('author'))
+    if mode == 'join':
+        return list(queryset.select_related('author'))
+    return list(AuthorMap().share(with_authors(queryset)))
+
+
+def memory(func):
+    """Прирост памяти после func и пик во время неё, в МБ."""
+    tracemalloc.start()
+    try:
+        result = func()
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, current / 2 ** 20, peak / 2 ** 20
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--comments', type=int, default=20_000)
+    parser.add_argument('--users', type=int, default=5)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        setup_django(os.path.join(directory, 'authors.sqlite3'))
+        from django.db import connection
+        from django.template import engines
+        from django.test.utils import CaptureQueriesContext
+
+        news = prepare(args.comments, args.users)
+        template = engines['lean'].get_template(
+            'news/includes/comment_list.html'
+        )
+        rows = []
+        for mode in MODES:
+            with CaptureQueriesContext(connection) as queries:
+                comments = load(mode, news)
+            authors = len({id(comment.author) for comment in comments})
+            del comments
+            _, loaded, _ = memory(lambda: load(mode, news))
+            _, _, peak = memory(lambda: template.render(
+                {'comments': load(mode, news)}
+            ))
+            best, median = measure(lambda: template.render(
+                {'comments': load(mode, news)}
+            ), args.repeat)
+            rows.append((
+                mode, len(queries), authors, round(loaded, 1),
+                round(peak, 1), round(best * 1000, 1),
+                round(median * 1000, 1),
+            ))
+    print(f'Комментариев: {args.comments}, авторов: {args.users}')
+    print_table((
+        'режим', 'запросов', 'объектов User', 'список, МБ', 'пик, МБ',
+        'лучшее, мс', 'медиана, мс',
+    ), rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,159 @@
+"""
+Шквал комментариев к одной новости: сколько их база принимает в секунду.
+
+Авторы — потоки одного процесса, каждый со своим соединением,
+отправляют форму NewsComment тестовым клиентом Django, пока не выйдет
+время. Режимы:
+
+- сразу: comment.save() в каждом POST, как без очереди;
+- очередь, commit: COMMENT_WRITE_BEHIND, ответ после записи пачки;
+- очередь, memory: COMMENT_WRITE_BEHIND, ответ сразу.
+
+Ограничение частоты на время замера снято. Записанными считаются
+комментарии в базе после дописывания очереди; время включает и его.
+Каждый режим замеряется в отдельном процессе на своей базе.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http import HTTPStatus
+
+from benchmarks import print_table
+
+MODES = {
+    'сразу': {'COMMENT_WRITE_BEHIND': '0'},
+    'очередь, commit': {
+        'COMMENT_WRITE_BEHIND': '1', 'COMMENT_QUEUE_DURABILITY': 'commit'
+    },
+    'очередь, memory': {
+        'COMMENT_WRITE_BEHIND': '1', 'COMMENT_QUEUE_DURABILITY': 'memory'
+    },
+}
+
+
+def prepare(posters):
+    from django.contrib.auth import get_user_model
+    from django.core.management import call_command
+
+    from news.models import News
+
+    call_command('migrate', verbosity=0)
+    User = get_user_model()
+    User.objects.bulk_create(
+        User(username=f'Автор {index}') for index in range(posters)
+    )
+    return News.objects.create(title='Горячая новость', text='Текст')
+
+
+def worker(args):
+    """Замер одного режима: печатает JSON с итогами."""
+    from benchmarks import setup_django
+
+    setup_django()
+    from django.conf import settings
+    from django.contrib.auth import get_user_model
+    from django.db import OperationalError, close_old_connections
+    from django.test import Client
+    from django.urls import reverse
+
+    from news import writer
+    from news.models import Comment
+
+    settings.DEBUG = False
+    settings.COMMENT_RATE_PER_USER = None
+    settings.COMMENT_RATE_PER_NEWS = None
+    news = prepare(args.posters)
+    url = reverse('news:detail', args=(news.pk,))
+    clients = []
+    for user in get_user_model().objects.all():
+        client = Client(HTTP_HOST='127.0.0.1')
+        client.force_login(user)
+        clients.append(client)
+    close_old_connections()
+
+    started = time.perf_counter()
+    deadline = started + args.duration
+    latencies = []
+    errors = []
+
+    def post(client, index):
+        number = 0
+        while time.perf_counter() < deadline:
+            number += 1
+            before = time.perf_counter()
+            try:
+                response = client.post(
+                    url, {'text': f'Комментарий {index}.{number}'}
+                )
+                if response.status_code != HTTPStatus.FOUND:
+                    errors.append(response.status_code)
+            except OperationalError:
+                errors.append(None)
+            latencies.append(time.perf_counter() - before)
+
+    threads = [
+        threading.Thread(target=post, args=(client, index))
+        for index, client in enumerate(clients)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    writer.comment_queue.flush()
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    print(json.dumps({
+        'written': Comment.objects.count(),
+        'seconds': elapsed,
+        'p50_ms': statistics.median(latencies) * 1000,
+        'p95_ms': latencies[int(len(latencies) * 0.95)] * 1000,
+        'errors': len(errors),
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--posters', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--profile', default='production')
+    parser.add_argument('--worker', action='store_true', help='Служебный.')
+    args = parser.parse_args()
+    if args.worker:
+        worker(args)
+        return
+
+    rows = []
+    with tempfile.TemporaryDirectory() as directory:
+        for number, (mode, env) in enumerate(MODES.items()):
+            output = subprocess.run(
+                [sys.executable, '-m', 'benchmarks.comment_writes',
+                 '--worker', '--posters', str(args.posters),
+                 '--duration', str(args.duration)],
+                env=dict(
+                    os.environ, **env, DB_PROFILE=args.profile,
+                    DJANGO_DATABASE_FILE=os.path.join(
+                        directory, f'writes{number}.sqlite3'
+                    ),
+                ),
+                capture_output=True, text=True, check=True,
+            ).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            rows.append((
+                mode, round(result['written'] / result['seconds']),
+                round(result['p50_ms'], 1), round(result['p95_ms'], 1),
+                result['errors'],
+            ))
+    print(f'Авторов: {args.posters}, профиль базы: {args.profile}')
+    print_table(
+        ('режим', 'комментариев/с', 'p50, мс', 'p95, мс', 'ошибок'), rows
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,139 @@
+"""
+Чтение и запись комментариев одновременно: профили базы development
+и production.
+
+Каждый профиль замеряется в отдельном процессе на своей копии базы.
+Читатели открывают новость с комментариями, писатели добавляют
+комментарии через ORM с сигналами, как NewsComment.form_valid.
+После каждой операции соединения обрабатываются так же, как в конце
+HTTP-запроса (close_old_connections).
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from benchmarks import print_table
+
+PROFILES = ('development', 'production')
+
+
+def reader(news_ids, rng):
+    from news.models import News
+
+    news = News.objects.get(pk=rng.choice(news_ids))
+    list(news.comment_set.select_related('author')[:50])
+
+
+def writer(news_ids, author, rng):
+    from news.models import Comment
+
+    Comment.objects.create(
+        news_id=rng.choice(news_ids), author=author, text='Комментарий'
+    )
+
+
+def prepare(news_count):
+    from django.contrib.auth import get_user_model
+    from django.core.management import call_command
+
+    from news.models import News
+
+    call_command('migrate', verbosity=0)
+    author = get_user_model().objects.create(username='Автор')
+    News.objects.bulk_create(
+        News(title=f'Новость {index}', text='Текст')
+        for index in range(news_count)
+    )
+    return list(News.objects.values_list('pk', flat=True)), author
+
+
+def worker(args):
+    """Замер одного профиля: печатает JSON с числом операций."""
+    from benchmarks import setup_django
+
+    setup_django()
+    from django.db import OperationalError, close_old_connections
+
+    news_ids, author = prepare(args.news)
+    deadline = time.perf_counter() + args.duration
+    counts = {'reads': 0, 'writes': 0, 'errors': 0}
+    lock = threading.Lock()
+
+    def run(operation, key, seed):
+        rng = random.Random(seed)
+        done = errors = 0
+        while time.perf_counter() < deadline:
+            try:
+                operation(rng)
+                done += 1
+            except OperationalError:
+                errors += 1
+            close_old_connections()
+        with lock:
+            counts[key] += done
+            counts['errors'] += errors
+
+    threads = [
+        threading.Thread(target=run, args=(
+            lambda rng: reader(news_ids, rng), 'reads', index
+        ))
+        for index in range(args.readers)
+    ] + [
+        threading.Thread(target=run, args=(
+            lambda rng: writer(news_ids, author, rng), 'writes', -index - 1
+        ))
+        for index in range(args.writers)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    print(json.dumps(counts))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--writers', type=int, default=2)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--news', type=int, default=1000)
+    parser.add_argument('--worker', action='store_true', help='Служебный.')
+    args = parser.parse_args()
+    if args.worker:
+        worker(args)
+        return
+
+    rows = []
+    with tempfile.TemporaryDirectory() as directory:
+        for profile in PROFILES:
+            output = subprocess.run(
+                [sys.executable, '-m', 'benchmarks.db_profile', '--worker',
+                 '--readers', str(args.readers),
+                 '--writers', str(args.writers),
+                 '--duration', str(args.duration), '--news', str(args.news)],
+                env=dict(
+                    os.environ, DB_PROFILE=profile,
+                    DJANGO_DATABASE_FILE=os.path.join(
+                        directory, f'{profile}.sqlite3'
+                    ),
+                ),
+                capture_output=True, text=True, check=True,
+            ).stdout
+            counts = json.loads(output.strip().splitlines()[-1])
+            rows.append((
+                profile,
+                round(counts['reads'] / args.duration),
+                round(counts['writes'] / args.duration),
+                counts['errors'],
+            ))
+    print_table(('профиль', 'чтений/с', 'записей/с', 'ошибок'), rows)
+
+
+if __name__ == '__main__':
+    main()
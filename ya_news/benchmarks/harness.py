@@ -0,0 +1,164 @@
+"""
+Нагрузочный прогон маршрутов через WSGI-приложение проекта.
+
+Клиенты — потоки того же процесса: каждый вызывает application
+напрямую, как это делал бы WSGI-сервер, и дочитывает ответ до конца.
+"""
+import io
+import json
+import random
+import statistics
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from wsgiref.util import setup_testing_defaults
+
+Route = namedtuple('Route', ('name', 'make_path', 'cookie'))
+QUANTILES = (50, 95, 99)
+
+
+def login_cookie(user):
+    """Cookie с сессией, в которой пользователь уже вошёл."""
+    from django.conf import settings
+    from django.contrib.auth import (
+        BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+    )
+    from django.contrib.sessions.backends.db import SessionStore
+
+    session = SessionStore()
+    session[SESSION_KEY] = str(user.pk)
+    session[BACKEND_SESSION_KEY] = 'django.contrib.auth.backends.ModelBackend'
+    session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+    session.create()
+    return f'{settings.SESSION_COOKIE_NAME}={session.session_key}'
+
+
+def call(application, path, cookie=None):
+    """Выполняет GET и возвращает код ответа."""
+    path, _, query = path.partition('?')
+    environ = {
+        'PATH_INFO': path,
+        'QUERY_STRING': query,
+        'REQUEST_METHOD': 'GET',
+        'wsgi.input': io.BytesIO(),
+    }
+    if cookie:
+        environ['HTTP_COOKIE'] = cookie
+    setup_testing_defaults(environ)
+    statuses = []
+
+    def start_response(status, headers, exc_info=None):
+        statuses.append(status)
+
+    body = application(environ, start_response)
+    try:
+        for _ in body:
+            pass
+    finally:
+        if hasattr(body, 'close'):
+            body.close()
+    return int(statuses[0].split()[0])
+
+
+def percentile(ordered, rank):
+    return ordered[min(int(len(ordered) * rank / 100), len(ordered) - 1)]
+
+
+def run_route(application, route, concurrency, duration, seed):
+    """
+    Нагружает маршрут concurrency клиентами в течение duration секунд.
+
+    Возвращает число запросов в секунду, ошибки и перцентили
+    задержки в миллисекундах.
+    """
+    from django.db import connections
+
+    deadline = time.perf_counter() + duration
+    lock = threading.Lock()
+    latencies, errors = [], []
+
+    def client(number):
+        rng = random.Random(seed * 1000 + number)
+        own_latencies, own_errors = [], 0
+        try:
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                status = call(application, route.make_path(rng), route.cookie)
+                own_latencies.append(time.perf_counter() - start)
+                own_errors += status >= 400
+        finally:
+            connections.close_all()
+        with lock:
+            latencies.extend(own_latencies)
+            errors.append(own_errors)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        for future in [pool.submit(client, n) for n in range(concurrency)]:
+            future.result()
+    elapsed = time.perf_counter() - started
+    ordered = sorted(latency * 1000 for latency in latencies)
+    result = {
+        'requests': len(ordered),
+        'errors': sum(errors),
+        'rps': round(len(ordered) / elapsed, 1),
+        'mean_ms': round(statistics.fmean(ordered), 2) if ordered else None,
+    }
+    for rank in QUANTILES:
+        result[f'p{rank}_ms'] = (
+            round(percentile(ordered, rank), 2) if ordered else None
+        )
+    return result
+
+
+def run(application, routes, concurrency, duration, seed=0):
+    return {
+        route.name: run_route(application, route, concurrency, duration, seed)
+        for route in routes
+    }
+
+
+def compare(results, baseline):
+    """Строки таблицы с изменением rps и p95 относительно базового прогона."""
+    rows = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        row = [name, result['rps'], result['p50_ms'], result['p95_ms'],
+               result['p99_ms'], result['errors']]
+        if base and base['rps'] and base['p95_ms']:
+            row.append(f'{(result["rps"] / base["rps"] - 1) * 100:+.1f}%')
+            row.append(
+                f'{(result["p95_ms"] / base["p95_ms"] - 1) * 100:+.1f}%'
+            )
+        else:
+            row.extend(('—', '—'))
+        rows.append(row)
+    return rows
+
+
+def over_p95(results, limit_ms):
+    """Маршруты, у которых p95 задержки выше limit_ms."""
+    return [
+        name for name, result in results.items()
+        if result['p95_ms'] is not None and result['p95_ms'] > limit_ms
+    ]
+
+
+HEADER = ('маршрут', 'rps', 'p50, мс', 'p95, мс', 'p99, мс', 'ошибки',
+          'rps к базе', 'p95 к базе')
+
+
+def save(path, meta, results):
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(
+            {'meta': meta, 'results': results}, file,
+            ensure_ascii=False, indent=2
+        )
+
+
+def load_baseline(path):
+    if not path:
+        return {}
+    with open(path, encoding='utf-8') as file:
+        return json.load(file)['results']
@@ -0,0 +1,105 @@
+"""
+Нагрузочный прогон маршрутов YaNews.
+
+База заполняется заранее: ``python -m benchmarks.seed``. Результаты
+сохраняются в JSON (--output) и сравниваются с прошлым прогоном
+(--baseline).
+
+С --max-p95 прогон завершается с ошибкой, если p95 какого-либо
+маршрута превысил порог: проверка времени ответа живёт здесь,
+а не в модульных тестах.
+"""
+import argparse
+import platform
+from urllib.parse import urlencode
+
+from benchmarks import print_table, setup_django
+from benchmarks.harness import (
+    HEADER, Route, compare, load_baseline, login_cookie, over_p95, run,
+    save
+)
+from benchmarks.seed import DEFAULT_DATABASE, WORDS
+
+HOT_NEWS = 1000
+HOT_SHARE = 0.8
+
+
+def make_routes():
+    from django.contrib.auth import get_user_model
+    from django.db.models import Max
+    from django.urls import reverse
+
+    from news.models import News
+
+    hot = list(News.objects.order_by('-comment_count').values_list(
+        'pk', flat=True
+    )[:HOT_NEWS])
+    last = News.objects.aggregate(last=Max('pk'))['last']
+    if not hot:
+        raise SystemExit('База пуста: сначала python -m benchmarks.seed.')
+    cookie = login_cookie(get_user_model().objects.order_by('pk').first())
+
+    def detail(rng):
+        """Чаще читают популярные новости, реже — любые."""
+        if rng.random() < HOT_SHARE:
+            pk = rng.choice(hot)
+        else:
+            pk = rng.randint(1, last)
+        return reverse('news:detail', args=(pk,))
+
+    home = reverse('news:home')
+    search = reverse('news:search')
+    return [
+        Route('news:home', lambda rng: home, None),
+        Route('news:home (вход)', lambda rng: home, cookie),
+        Route('news:detail', detail, None),
+        Route('news:detail (вход)', detail, cookie),
+        Route(
+            'news:search',
+            lambda rng: f'{search}?{urlencode({"q": rng.choice(WORDS)})}',
+            None
+        ),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--database', default=DEFAULT_DATABASE)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument(
+        '--duration', type=float, default=10,
+        help='Секунд нагрузки на каждый маршрут.'
+    )
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='Куда сохранить JSON с итогами.')
+    parser.add_argument('--baseline', help='JSON прошлого прогона.')
+    parser.add_argument(
+        '--max-p95', type=float,
+        help='Порог p95 в миллисекундах для каждого маршрута.'
+    )
+    args = parser.parse_args()
+
+    setup_django(args.database)
+    from django.core.wsgi import get_wsgi_application
+
+    application = get_wsgi_application()
+    results = run(
+        application, make_routes(), args.concurrency, args.duration,
+        args.seed
+    )
+    print_table(HEADER, compare(results, load_baseline(args.baseline)))
+    if args.output:
+        save(args.output, {
+            'project': 'yanews', 'concurrency': args.concurrency,
+            'duration': args.duration, 'python': platform.python_version(),
+        }, results)
+    if args.max_p95 is not None:
+        slow = over_p95(results, args.max_p95)
+        if slow:
+            raise SystemExit(
+                f'p95 выше {args.max_p95} мс: {", ".join(slow)}.'
+            )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""
+Превью новостей на главной: сколько байт читается из базы и время.
+
+Новости с длинными текстами; страница главной читается из базы
+и рендерится в режимах:
+
+- truncatewords: полные строки News и {{ news.text|truncatewords:15 }}
+  в шаблоне, как было до News.preview;
+- preview: News.objects.defer('text') и готовое {{ news.preview }};
+- лента: строки FeedEntry, как читает главную NewsList.
+
+Байты — сумма длин значений в строках, которые вернул запрос
+страницы (текст в UTF-8).
+"""
+import argparse
+import os
+import tempfile
+
+from benchmarks import measure, print_table, setup_django
+
+ITEM = (
+    '{% for news in object_list %}<h3>{{ news.title }}</h3>'
+    '<small>{{ news.date }}</small><div>{{ PREVIEW }}</div>{% endfor %}'
+)
+# Режим: (выражение превью в шаблоне, набор строк страницы).
+MODES = {
+    'truncatewords': ('news.text|truncatewords:15', 'news'),
+    'preview': ('news.preview', 'deferred'),
+    'лента': ('news.preview', 'feed'),
+}
+
+
+def prepare(count, words):
+    from django.core.management import call_command
+
+    from news import feed
+    from news.models import News, make_preview
+
+    call_command('migrate', verbosity=0)
+    text = ' '.join(['Слово'] * words)
+    News.objects.bulk_create(
+        News(title=f'Новость {index}', text=text, preview=make_preview(text))
+        for index in range(count)
+    )
+    feed.rebuild()
+
+
+def querysets(size):
+    from news.feed import FEED_ORDERINGS, feed_entries
+    from news.models import FeedEntry, News
+
+    ordering = FEED_ORDERINGS[FeedEntry.LATEST]
+    return {
+        'news': News.objects.order_by('-date', 'pk')[:size],
+        'deferred': News.objects.defer('text').order_by('-date', 'pk')[:size],
+        'feed': feed_entries(FeedEntry.LATEST).order_by(*ordering)[:size],
+    }
+
+
+def fetched_bytes(queryset):
+    """Сколько байт в строках, которые база вернула на запрос."""
+    from django.db import connection
+
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return sum(
+            len(str(value).encode()) for row in cursor.fetchall()
+            for value in row if value is not None
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--news', type=int, default=1000)
+    parser.add_argument('--words', type=int, default=2000)
+    parser.add_argument('--renders', type=int, default=50)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        setup_django(os.path.join(directory, 'previews.sqlite3'))
+        from django.conf import settings
+        from django.template import engines
+
+        prepare(args.news, args.words)
+        pages = querysets(settings.NEWS_COUNT_ON_HOME_PAGE)
+        rows = []
+        for mode, (preview, source) in MODES.items():
+            template = engines['lean'].from_string(
+                ITEM.replace('PREVIEW', preview)
+            )
+            queryset = pages[source]
+
+            def render():
+                for _ in range(args.renders):
+                    template.render({'object_list': queryset.all()})
+
+            best, median = measure(render, args.repeat)
+            rows.append((
+                mode, fetched_bytes(queryset),
+                round(best / args.renders * 1000, 3),
+                round(median / args.renders * 1000, 3),
+            ))
+    print(f'Новостей: {args.news}, слов в тексте: {args.words}')
+    print_table(('режим', 'байт', 'лучшее, мс', 'медиана, мс'), rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,164 @@
+"""
+Генератор данных YaNews для нагрузочных замеров.
+
+Комментарии распределены по новостям по закону Ципфа: у немногих
+новостей тысячи комментариев, у большинства — единицы. Строки
+вставляются пачками в обход ORM, поэтому миллион комментариев
+занимает десятки секунд, а не часы.
+"""
+import argparse
+import itertools
+import os
+import random
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+from benchmarks import setup_django
+
+DEFAULT_DATABASE = os.path.join(tempfile.gettempdir(), 'yanews_load.sqlite3')
+BATCH = 10_000
+WORDS = (
+    'новость', 'город', 'погода', 'выборы', 'спорт', 'футбол', 'хоккей',
+    'музей', 'театр', 'концерт', 'школа', 'университет', 'наука', 'космос',
+    'ракета', 'поезд', 'метро', 'дорога', 'мост', 'парк', 'зима', 'лето',
+    'дождь', 'снег', 'праздник', 'выставка', 'рынок', 'цены', 'рубль',
+    'завод', 'урожай', 'больница', 'врачи', 'учёные', 'открытие', 'рекорд',
+    'чемпионат', 'сборная', 'фестиваль', 'библиотека', 'ёлка', 'жители',
+)
+
+
+def sentence(rng, min_words, max_words):
+    words = rng.choices(WORDS, k=rng.randint(min_words, max_words))
+    return ' '.join(words).capitalize() + '.'
+
+
+def insert(model, fields, rows):
+    """Вставка кортежей пачками, без сигналов и auto_now_add."""
+    from django.db import connection
+
+    quote = connection.ops.quote_name
+    columns = [model._meta.get_field(field).column for field in fields]
+    sql = 'INSERT INTO {} ({}) VALUES ({})'.format(
+        quote(model._meta.db_table),
+        ', '.join(quote(column) for column in columns),
+        ', '.join(['%s'] * len(columns)),
+    )
+    rows = iter(rows)
+    with connection.cursor() as cursor:
+        while True:
+            batch = list(itertools.islice(rows, BATCH))
+            if not batch:
+                return
+            cursor.executemany(sql, batch)
+
+
+def zipf(count, skew):
+    """Накопленные веса рангов 1..count для random.choices."""
+    return list(itertools.accumulate(
+        1 / rank ** skew for rank in range(1, count + 1)
+    ))
+
+
+def create_users(count):
+    """Пользователи с одинаковым паролем password."""
+    from django.contrib.auth import get_user_model
+    from django.contrib.auth.hashers import make_password
+
+    user_model = get_user_model()
+    password = make_password('password')
+    user_model.objects.bulk_create(
+        (user_model(username=f'user{index}', password=password)
+         for index in range(count)),
+        batch_size=BATCH,
+    )
+    return list(user_model.objects.order_by('pk').values_list(
+        'pk', flat=True
+    ))
+
+
+def seed(news_count, comments_count, users_count, skew, rng):
+    """Заполняет пустую базу, возвращает число созданных строк."""
+    from django.db import connection, transaction
+
+    from news.models import Comment, News, make_preview
+
+    ops = connection.ops
+    now = datetime.now(timezone.utc)
+    today = now.date()
+    with transaction.atomic():
+        user_ids = create_users(users_count)
+        # Ранги популярности перемешаны, чтобы горячие новости
+        # не шли подряд по id и по дате.
+        ranks = list(range(1, news_count + 1))
+        rng.shuffle(ranks)
+        counts = Counter(rng.choices(
+            ranks, cum_weights=zipf(news_count, skew), k=comments_count
+        ))
+        stamp = ops.adapt_datetimefield_value(now)
+        insert(News, (
+            'id', 'title', 'text', 'preview', 'date', 'comment_count',
+            'updated_at',
+        ), (
+            (pk, title, text, make_preview(text),
+             ops.adapt_datefield_value(today - timedelta(
+                 days=rng.randrange(365)
+             )),
+             counts[pk], stamp)
+            for pk in range(1, news_count + 1)
+            # Заголовок раньше текста: тот же --seed даёт те же данные.
+            for title, text in (
+                (sentence(rng, 2, 6)[:50], sentence(rng, 30, 120)),
+            )
+        ))
+        insert(Comment, (
+            'news', 'author', 'text', 'created', 'updated_at', 'flagged'
+        ), (
+            (pk, rng.choice(user_ids), sentence(rng, 3, 40), created,
+             created, False)
+            for pk, count in counts.items() for _ in range(count)
+            for created in (ops.adapt_datetimefield_value(now - timedelta(
+                seconds=rng.randrange(365 * 24 * 3600)
+            )),)
+        ))
+    return {
+        'users': users_count, 'news': news_count,
+        'comments': comments_count,
+        'max_comments_per_news': max(counts.values(), default=0),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--database', default=DEFAULT_DATABASE)
+    parser.add_argument('--news', type=int, default=100_000)
+    parser.add_argument('--comments', type=int, default=1_000_000)
+    parser.add_argument('--users', type=int, default=1_000)
+    parser.add_argument('--skew', type=float, default=1.1)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument(
+        '--search-index', action='store_true',
+        help='Построить поисковый индекс после заполнения.'
+    )
+    args = parser.parse_args()
+
+    setup_django(args.database)
+    from django.core.management import call_command
+
+    started = time.perf_counter()
+    call_command('migrate', verbosity=0)
+    call_command('flush', interactive=False, verbosity=0)
+    created = seed(
+        args.news, args.comments, args.users, args.skew,
+        random.Random(args.seed)
+    )
+    call_command('rebuild_feed')
+    if args.search_index:
+        call_command('rebuild_search_index')
+    created['seconds'] = round(time.perf_counter() - started, 1)
+    print(created)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,152 @@
+"""
+NewsDetail с длинным обсуждением: время до первого байта и память.
+
+Режимы:
+
+- страницами: текущий NewsDetail, COMMENTS_COUNT_ON_DETAIL_PAGE
+  комментариев на странице;
+- целиком: тот же NewsDetail со всеми комментариями на одной
+  странице, ответ собирается в памяти целиком;
+- поток: NewsDetailStream (NEWS_STREAMING_DETAIL), все комментарии
+  пачками по COMMENTS_STREAM_CHUNK.
+
+Каждый режим замеряется в отдельном процессе: пиковый RSS процесса
+только растёт. Перед замером процесс один раз открывает короткую
+новость, чтобы загрузить код и шаблоны.
+"""
+import argparse
+import io
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from wsgiref.util import setup_testing_defaults
+
+from benchmarks import print_table, setup_django
+
+MODES = ('страницами', 'целиком', 'поток')
+BATCH = 10_000
+
+
+def prepare(comments_count):
+    from django.contrib.auth import get_user_model
+    from django.core.management import call_command
+
+    from news.models import Comment, News
+
+    call_command('migrate', verbosity=0)
+    author = get_user_model().objects.create(username='Автор')
+    short = News.objects.create(title='Короткая', text='Текст')
+    long = News.objects.create(title='Длинная', text='Текст')
+    Comment.objects.create(news=short, author=author, text='Комментарий')
+    for start in range(0, comments_count, BATCH):
+        Comment.objects.bulk_create(
+            Comment(news=long, author=author,
+                    text=f'Комментарий {index}. ' * 5)
+            for index in range(start, min(start + BATCH, comments_count))
+        )
+    News.objects.filter(pk=long.pk).update(comment_count=comments_count)
+
+
+def get(application, path):
+    """Время до первого куска тела, полное время и размер ответа."""
+    environ = {
+        'PATH_INFO': path,
+        'REQUEST_METHOD': 'GET',
+        'wsgi.input': io.BytesIO(),
+        'HTTP_HOST': '127.0.0.1',
+    }
+    setup_testing_defaults(environ)
+    started = time.perf_counter()
+    body = application(environ, lambda status, headers, exc_info=None: None)
+    first_byte = None
+    size = 0
+    try:
+        for chunk in body:
+            if first_byte is None:
+                first_byte = time.perf_counter() - started
+            size += len(chunk)
+    finally:
+        body.close()
+    return first_byte, time.perf_counter() - started, size
+
+
+def max_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def worker(mode):
+    """Замер одного режима: печатает JSON с итогами."""
+    setup_django()
+    from django.conf import settings
+    from django.core.wsgi import get_wsgi_application
+    from django.urls import reverse
+
+    from news.models import News
+
+    settings.DEBUG = False
+    if mode == 'целиком':
+        settings.COMMENTS_COUNT_ON_DETAIL_PAGE = 10 ** 9
+    settings.NEWS_STREAMING_DETAIL = mode == 'поток'
+    application = get_wsgi_application()
+    short, long = News.objects.order_by('pk').values_list('pk', flat=True)
+    get(application, reverse('news:detail', args=(short,)))
+    before = max_rss_mb()
+    first_byte, total, size = get(
+        application, reverse('news:detail', args=(long,))
+    )
+    print(json.dumps({
+        'ttfb_ms': first_byte * 1000,
+        'total_ms': total * 1000,
+        'size_kb': size / 1024,
+        'rss_mb': max_rss_mb() - before,
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--comments', type=int, default=20_000)
+    parser.add_argument('--worker', choices=MODES, help='Служебный.')
+    parser.add_argument('--prepare', action='store_true', help='Служебный.')
+    args = parser.parse_args()
+    if args.prepare:
+        setup_django()
+        prepare(args.comments)
+        return
+    if args.worker:
+        worker(args.worker)
+        return
+
+    rows = []
+    with tempfile.TemporaryDirectory() as directory:
+        env = dict(
+            os.environ,
+            DJANGO_DATABASE_FILE=os.path.join(directory, 'stream.sqlite3')
+        )
+        command = [sys.executable, '-m', 'benchmarks.stream_detail']
+        subprocess.run(
+            [*command, '--prepare', '--comments', str(args.comments)],
+            env=env, check=True,
+        )
+        for mode in MODES:
+            output = subprocess.run(
+                [*command, '--worker', mode],
+                env=env, capture_output=True, text=True, check=True,
+            ).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            rows.append((
+                mode, round(result['ttfb_ms'], 1),
+                round(result['total_ms'], 1), round(result['size_kb']),
+                round(result['rss_mb'], 1),
+            ))
+    print(f'Комментариев в обсуждении: {args.comments}')
+    print_table(
+        ('режим', 'TTFB, мс', 'всего, мс', 'КБ', 'прирост RSS, МБ'), rows
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,145 @@
+"""
+Время рендеринга news/home.html и news/detail.html.
+
+Данные читаются из базы один раз, замеряется только рендеринг
+страницы для анонимного пользователя в режимах:
+
+- без кеша: шаблоны разбираются заново при каждом рендеринге
+  (так было при DEBUG = True);
+- кеш: скомпилированные шаблоны хранятся в памяти (cached.Loader);
+- lean: кеш и движок без лишних контекст-процессоров;
+- шапка: вдобавок готовая анонимная шапка ({% prerendered %}).
+"""
+import argparse
+import os
+import tempfile
+
+from benchmarks import measure, print_table, setup_django
+
+LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+# Режим: (кешировать шаблоны, движок из TEMPLATES, готовая шапка).
+MODES = {
+    'без кеша': (False, 'django', False),
+    'кеш': (True, 'django', False),
+    'lean': (True, 'lean', False),
+    'шапка': (True, 'lean', True),
+}
+
+
+def make_engine(name, cached):
+    """Движок как в TEMPLATES, но с загрузчиками нужного режима."""
+    from django.conf import settings
+    from django.template.backends.django import DjangoTemplates
+
+    params = next(
+        entry for entry in settings.TEMPLATES
+        if entry.get('NAME', 'django') == name
+    )
+    loaders = [('django.template.loaders.cached.Loader', LOADERS)]
+    return DjangoTemplates({
+        'NAME': name,
+        'DIRS': params['DIRS'],
+        'APP_DIRS': False,
+        'OPTIONS': dict(
+            params['OPTIONS'], loaders=loaders if cached else LOADERS
+        ),
+    })
+
+
+def prepare():
+    from django.contrib.auth import get_user_model
+    from django.core.management import call_command
+
+    from news import feed
+    from news.models import Comment, News, make_preview
+
+    call_command('migrate', verbosity=0)
+    author = get_user_model().objects.create(username='Автор')
+    text = 'Текст новости. ' * 20
+    News.objects.bulk_create(
+        News(title=f'Новость {index}', text=text, preview=make_preview(text))
+        for index in range(20)
+    )
+    feed.rebuild()
+    news = News.objects.first()
+    Comment.objects.bulk_create(
+        Comment(news=news, author=author, text=f'Комментарий {index}')
+        for index in range(30)
+    )
+    return news
+
+
+def contexts(news):
+    """Контекст каждой страницы, как его собирают представления."""
+    from django.conf import settings
+
+    from news.cache import news_version
+    from news.feed import FEED_ORDERINGS, feed_entries
+    from news.models import FeedEntry
+    from news.pagination import KeysetPaginator, get_page_or_404
+    from news.views import render_comments
+
+    page = get_page_or_404(KeysetPaginator(
+        feed_entries(FeedEntry.LATEST), FEED_ORDERINGS[FeedEntry.LATEST],
+        settings.NEWS_COUNT_ON_HOME_PAGE
+    ), None)
+    page.object_list = list(page.object_list)
+    version = news_version(news.pk)
+    return {
+        'news/home.html': {
+            'object_list': page.object_list,
+            'page_obj': page,
+            'is_paginated': page.has_other_pages(),
+        },
+        'news/detail.html': {
+            'news': news,
+            'object': news,
+            'news_version': version,
+            'news_cache_timeout': settings.NEWS_CACHE_TIMEOUT,
+            'comments_html': render_comments(news.pk, version, '', None),
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--renders', type=int, default=200)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        setup_django(os.path.join(directory, 'templates.sqlite3'))
+        from django.conf import settings
+        from django.contrib.auth.models import AnonymousUser
+        from django.test import RequestFactory
+
+        request = RequestFactory().get('/')
+        request.user = AnonymousUser()
+        request.session = {}
+        pages = contexts(prepare())
+        rows = []
+        for template_name, context in pages.items():
+            for mode, (cached, engine_name, header) in MODES.items():
+                settings.TEMPLATE_CACHE = header
+                template = make_engine(engine_name, cached).get_template(
+                    template_name
+                )
+
+                def render():
+                    for _ in range(args.renders):
+                        template.render(context, request)
+
+                best, median = measure(render, args.repeat)
+                rows.append((
+                    template_name, mode,
+                    round(best / args.renders * 1000, 3),
+                    round(median / args.renders * 1000, 3),
+                ))
+    print_table(('шаблон', 'режим', 'лучшее, мс', 'медиана, мс'), rows)
+
+
+if __name__ == '__main__':
+    main()
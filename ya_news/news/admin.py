@@ -10,6 +10,25 @@ class CommentInline(admin.StackedInline):
 
 @admin.register(News)
 class NewsAdmin(admin.ModelAdmin):
+    list_display = ('title', 'date', 'comment_count')
     inlines = [
         CommentInline,
     ]
+
+
+@admin.register(Comment)
+class CommentAdmin(admin.ModelAdmin):
+    list_display = ('__str__', 'news', 'author', 'created', 'flagged')
+    list_filter = ('flagged',)
+
+    def get_readonly_fields(self, request, obj=None):
+        """
+        Новость у сохранённого комментария не меняется.
+
+        Сигналы пересчитывают счётчик, ленты и кеш только у новости
+        нового или удалённого комментария; перенос между новостями
+        оставил бы обе с неверными данными.
+        """
+        if obj is not None:
+            return ('news',)
+        return ()
@@ -0,0 +1,191 @@
+"""
+Асинхронные NewsList и NewsDetail для работы под ASGI.
+
+В Django 3.2 нет асинхронного ORM, а синхронные представления под
+ASGI выполняются по очереди в одном общем потоке. Здесь запросы
+уходят в пул потоков через sync_to_async(thread_sensitive=False):
+цикл событий не ждёт базу, а запросы новости и комментариев
+выполняются одновременно. Подключаются настройкой NEWS_ASYNC_VIEWS.
+"""
+import asyncio
+from functools import partial
+from http import HTTPStatus
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.core.handlers.asgi import ASGIRequest
+from django.db import close_old_connections
+from django.http import HttpResponseNotAllowed
+from django.shortcuts import render
+
+from . import conditional
+from .authors import get_authors
+from .cache import feed_version, news_version, page_key
+from .forms import CommentForm
+from .models import FeedEntry
+from .feed import FEED_ORDERINGS, feed_entries
+from .pagination import KeysetPaginator, get_page_or_404
+from .views import NewsComment, get_viewer_id, render_comments
+
+
+def _pooled(func, *args):
+    """Функция для пула потоков, освобождающая соединение, как запрос."""
+    def task():
+        try:
+            return func(*args)
+        finally:
+            close_old_connections()
+    return sync_to_async(task, thread_sensitive=False)
+
+
+async def gather(request, *calls):
+    """
+    Выполняет вызовы (функция, аргументы...) одновременно в пуле потоков.
+
+    Вне ASGI (WSGI, тестовый клиент) представление и так занимает
+    поток запроса, а его транзакцию другие соединения не видят,
+    поэтому тогда вызовы идут по очереди в этом потоке.
+    """
+    if not isinstance(request, ASGIRequest):
+        return [await sync_to_async(func)(*args) for func, *args in calls]
+    return await asyncio.gather(*(_pooled(*call)() for call in calls))
+
+
+def _is_authenticated(request):
+    """
+    Загружает ленивый request.user в потоке.
+
+    В цикле событий его первая загрузка пошла бы в базу и упала
+    с SynchronousOnlyOperation; после неё request.user уже готов.
+    """
+    return request.user.is_authenticated
+
+
+def _cached_page(request, get_versions):
+    """Ключ страницы и готовый ответ из кеша для анонимного GET."""
+    if request.user.is_authenticated:
+        return None, None
+    key = page_key(request, *get_versions())
+    return key, cache.get(key)
+
+
+def _not_modified(request, *validators):
+    """Ответ 304 на условный запрос, как у conditional_page."""
+    return conditional.not_modified(
+        request, *conditional.validators(request, *validators)
+    )
+
+
+def _render(request, template_name, context, key, validators):
+    """Страница с ETag и Last-Modified; в кеш она уходит вместе с ними."""
+    response = render(request, template_name, context, using='lean')
+    if response.status_code == HTTPStatus.OK:
+        conditional.set_validators(
+            response, *conditional.validators(request, *validators)
+        )
+        if key:
+            cache.set(key, response, settings.NEWS_CACHE_TIMEOUT)
+    return response
+
+
+def _news_page(request, feed, cursor):
+    paginator = KeysetPaginator(
+        feed_entries(feed), FEED_ORDERINGS[feed],
+        settings.NEWS_COUNT_ON_HOME_PAGE
+    )
+    page = get_page_or_404(paginator, cursor)
+    conditional.remember_feed_page(request, page)
+    return page
+
+
+def _news(request, pk):
+    return conditional.get_news_or_404(request, pk)
+
+
+def _comments(request, news_id, cursor):
+    version = news_version(news_id)
+    html = render_comments(
+        news_id, version, cursor, get_viewer_id(news_id, request.user),
+        get_authors(request),
+    )
+    return version, html
+
+
+async def news_list(request, feed=FeedEntry.LATEST):
+    """Асинхронный NewsList: та же страница и тот же ключ кеша."""
+    if request.method != 'GET':
+        return HttpResponseNotAllowed(['GET'])
+    validators = (
+        conditional.feed_etag, conditional.feed_last_modified, feed
+    )
+    if conditional.is_conditional(request):
+        response, = await gather(
+            request, (_not_modified, request, *validators)
+        )
+        if response is not None:
+            return response
+    (key, cached), = await gather(request, (_cached_page, request, lambda: (
+        feed_version(),
+    )))
+    if cached is not None:
+        return cached
+    page, = await gather(
+        request, (_news_page, request, feed, request.GET.get('cursor'))
+    )
+    response, = await gather(request, (_render, request, 'news/home.html', {
+        'object_list': page.object_list,
+        'page_obj': page,
+        'is_paginated': page.has_other_pages(),
+    }, key, validators))
+    return response
+
+
+async def news_detail(request, pk):
+    """
+    Асинхронный NewsDetail.
+
+    Новость и блок комментариев читаются одновременно,
+    отправка комментария остаётся за NewsComment.
+    """
+    if request.method == 'POST':
+        # В пуле, а не в общем потоке синхронного кода: с очередью
+        # комментариев POST ждёт записи пачки и не должен держать
+        # остальные запросы.
+        response, = await gather(
+            request, (partial(NewsComment.as_view(), pk=pk), request)
+        )
+        return response
+    if request.method != 'GET':
+        return HttpResponseNotAllowed(['GET', 'POST'])
+    is_authenticated, = await gather(request, (_is_authenticated, request))
+    validators = (conditional.news_etag, conditional.news_last_modified, pk)
+    if conditional.is_conditional(request):
+        response, = await gather(
+            request, (_not_modified, request, *validators)
+        )
+        if response is not None:
+            return response
+    (key, cached), = await gather(request, (_cached_page, request, lambda: (
+        news_version(pk),
+    )))
+    if cached is not None:
+        return cached
+    news, (version, comments_html) = await gather(
+        request,
+        (_news, request, pk),
+        (_comments, request, pk, request.GET.get('cursor', '')),
+    )
+    context = {
+        'news': news,
+        'object': news,
+        'news_version': version,
+        'news_cache_timeout': settings.NEWS_CACHE_TIMEOUT,
+        'comments_html': comments_html,
+    }
+    if is_authenticated:
+        context['form'] = CommentForm()
+    response, = await gather(request, (
+        _render, request, 'news/detail.html', context, key, validators
+    ))
+    return response
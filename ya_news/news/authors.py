@@ -0,0 +1,42 @@
+"""
+Авторы комментариев для страницы новости.
+
+Странице от автора нужны только id и имя, поэтому комментарии
+читаются вместе с этими двумя полями пользователя, без хеша пароля
+и прочих колонок. Пользователи хранятся в карте запроса: у каждого
+автора один объект на весь запрос, сколько бы комментариев он
+ни написал, и это тот же объект, что request.user в шапке.
+"""
+AUTHORS_ATTRIBUTE = '_comment_authors'
+COMMENT_FIELDS = ('news', 'author', 'text', 'created')
+
+
+def with_authors(queryset):
+    """Комментарии с компактными авторами в том же запросе."""
+    return queryset.select_related('author').only(
+        *COMMENT_FIELDS, 'author__username'
+    )
+
+
+class AuthorMap:
+    """Карта пользователей запроса: id -> единственный объект."""
+
+    def __init__(self, *users):
+        self.users = {user.pk: user for user in users if user.is_authenticated}
+
+    def share(self, comments):
+        """Подменяет автора каждого комментария объектом из карты."""
+        for comment in comments:
+            comment.author = self.users.setdefault(
+                comment.author_id, comment.author
+            )
+            yield comment
+
+
+def get_authors(request):
+    """Карта авторов запроса; в ней сразу есть текущий пользователь."""
+    authors = getattr(request, AUTHORS_ATTRIBUTE, None)
+    if authors is None:
+        authors = AuthorMap(request.user)
+        setattr(request, AUTHORS_ATTRIBUTE, authors)
+    return authors
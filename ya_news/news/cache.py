@@ -0,0 +1,119 @@
+import hashlib
+import math
+import time
+from http import HTTPStatus
+
+from django.conf import settings
+from django.core.cache import cache
+
+from yanews import replicas
+
+FEED_VERSION_KEY = 'news:version:feed'
+NEWS_VERSION_KEY = 'news:version:{pk}'
+BUMPED_KEY = '{key}:bumped'
+# Параметры запроса, от которых зависят кешируемые страницы.
+PAGE_PARAMS = ('cursor',)
+
+
+def make_key(name, *parts):
+    """Ключ кеша из имени фрагмента и значений, от которых он зависит."""
+    digest = hashlib.md5(
+        ':'.join(str(part) for part in parts).encode()
+    ).hexdigest()
+    return f'news:{name}:{digest}'
+
+
+def page_key(request, *versions):
+    """
+    Ключ страницы: путь, значения PAGE_PARAMS и версии данных.
+
+    Остальные параметры запроса страницу не меняют, и произвольная
+    строка запроса не заводит новых записей в кеше.
+    """
+    return make_key('page', request.path, *(
+        request.GET.get(name, '') for name in PAGE_PARAMS
+    ), *versions)
+
+
+def get_version(key):
+    """
+    Текущая версия данных.
+
+    Начальная версия берётся из времени, а не с единицы: если ключ
+    версии вытеснят из кеша, старые фрагменты не станут снова актуальными.
+    """
+    if settings.DATABASE_REPLICAS:
+        bumped = BUMPED_KEY.format(key=key)
+        values = cache.get_many((key, bumped))
+        if bumped in values:
+            # Реплики могли ещё не получить запись, поднявшую версию:
+            # то, что ляжет в кеш под ней, читаем с primary.
+            replicas.read_from_primary()
+        version = values.get(key)
+    else:
+        version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(key):
+    """
+    Новая версия данных.
+
+    С репликами ещё и метка на время, за которое свежая реплика
+    гарантированно содержит запись: REPLICA_MAX_LAG и проверку
+    свежести, закешированную на HEALTH_TTL, с запасом в секунду.
+    """
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), None)
+    if settings.DATABASE_REPLICAS:
+        cache.set(
+            BUMPED_KEY.format(key=key), True,
+            math.ceil(settings.REPLICA_MAX_LAG + replicas.HEALTH_TTL) + 1,
+        )
+
+
+def feed_version():
+    return get_version(FEED_VERSION_KEY)
+
+
+def news_version(pk):
+    return get_version(NEWS_VERSION_KEY.format(pk=pk))
+
+
+def invalidate_news(pk):
+    """Сбрасывает кеш новости и ленты, где видно число комментариев."""
+    bump_version(NEWS_VERSION_KEY.format(pk=pk))
+    bump_version(FEED_VERSION_KEY)
+
+
+class CachedPageMixin:
+    """
+    Отдаёт анонимным пользователям страницу целиком из кеша.
+
+    Ключ страницы включает версии данных, от которых она зависит,
+    так что после записи новости или комментария ключ меняется сам.
+    """
+
+    def get_cache_versions(self):
+        return (feed_version(),)
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method != 'GET' or request.user.is_authenticated:
+            return super().dispatch(request, *args, **kwargs)
+        key = page_key(request, *self.get_cache_versions())
+        response = cache.get(key)
+        if response is not None:
+            return response
+        response = super().dispatch(request, *args, **kwargs)
+        if response.status_code == HTTPStatus.OK:
+            response.add_post_render_callback(
+                lambda rendered: cache.set(
+                    key, rendered, settings.NEWS_CACHE_TIMEOUT
+                )
+            )
+        return response
@@ -0,0 +1,197 @@
+"""
+Условные GET-запросы к ленте и странице новости.
+
+ETag и Last-Modified считаются из updated_at новости (для ленты —
+из её строк FeedEntry): он сдвигается при правке новости и при
+новых и удалённых комментариях. Страница для этого
+не рендерится, тексты комментариев не читаются: на условный запрос
+с совпавшим валидатором ответ 304 уходит после одного запроса по
+индексу. Обычный запрос лишних запросов не делает: валидаторы
+берутся из уже прочитанных представлением строк, а страница из
+кеша отдаётся с заголовками, сохранёнными вместе с ней.
+"""
+import hashlib
+from calendar import timegm
+from functools import wraps
+from http import HTTPStatus
+
+from django.conf import settings
+from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from .feed import FEED_ORDERINGS, feed_entries
+from .models import FeedEntry, News
+from .pagination import InvalidCursor, KeysetPaginator
+
+NEWS_ATTRIBUTE = '_conditional_news'
+FEED_ATTRIBUTE = '_conditional_feed'
+SAFE_METHODS = ('GET', 'HEAD')
+
+
+def make_etag(*parts):
+    return hashlib.md5(
+        ':'.join(str(part) for part in parts).encode()
+    ).hexdigest()
+
+
+def viewer(request):
+    """
+    Часть ETag, зависящая от пользователя.
+
+    Авторизованному страница показывает его имя и форму с CSRF-токеном,
+    поэтому его ETag зависит ещё и от пользователя и CSRF-cookie.
+    """
+    user = request.user
+    if not user.is_authenticated:
+        return ''
+    csrf_cookie = request.COOKIES.get(settings.CSRF_COOKIE_NAME, '')
+    return f'{user.pk}:{user.get_username()}:{csrf_cookie}'
+
+
+def get_news_or_404(request, pk):
+    """Новость для валидаторов и представления, одна на запрос."""
+    news = getattr(request, NEWS_ATTRIBUTE, None)
+    if news is None or news.pk != pk:
+        news = get_object_or_404(News, pk=pk)
+        setattr(request, NEWS_ATTRIBUTE, news)
+    return news
+
+
+def news_etag(request, pk):
+    return make_etag(
+        'news', request.get_full_path(),
+        get_news_or_404(request, pk).updated_at.isoformat(),
+        viewer(request),
+    )
+
+
+def news_last_modified(request, pk):
+    """Last-Modified только для анонимов: их страница общая."""
+    if request.user.is_authenticated:
+        return None
+    return get_news_or_404(request, pk).updated_at
+
+
+def remember_feed_page(request, page):
+    """Валидаторы ленты из страницы, которую уже собрало представление."""
+    setattr(request, FEED_ATTRIBUTE, (
+        [(entry.news_id, entry.updated_at) for entry in page.object_list],
+        page.has_next(),
+        page.has_previous(),
+    ))
+
+
+def feed_page(request, feed=FeedEntry.LATEST):
+    """
+    Строки (id новости, updated_at) страницы ленты и флаги соседних страниц.
+
+    При неверном курсоре — None: представление само ответит 404.
+    """
+    if not hasattr(request, FEED_ATTRIBUTE):
+        paginator = KeysetPaginator(
+            feed_entries(feed), FEED_ORDERINGS[feed],
+            settings.NEWS_COUNT_ON_HOME_PAGE
+        )
+        try:
+            page = paginator.page_values(
+                request.GET.get('cursor'), 'news_id', 'updated_at'
+            )
+        except InvalidCursor:
+            page = None
+        setattr(request, FEED_ATTRIBUTE, page)
+    return getattr(request, FEED_ATTRIBUTE)
+
+
+def feed_etag(request, feed=FeedEntry.LATEST):
+    page = feed_page(request, feed)
+    if page is None:
+        return None
+    rows, has_next, has_previous = page
+    return make_etag(
+        'feed', request.get_full_path(), viewer(request),
+        has_next, has_previous,
+        *(f'{pk}@{updated_at.isoformat()}' for pk, updated_at in rows)
+    )
+
+
+def feed_last_modified(request, feed=FeedEntry.LATEST):
+    """
+    Самая свежая правка новостей страницы, только для анонимов.
+
+    Удаление новости Last-Modified не сдвигает, его замечает ETag.
+    """
+    page = feed_page(request, feed)
+    if page is None or not page[0] or request.user.is_authenticated:
+        return None
+    return max(updated_at for _, updated_at in page[0])
+
+
+def is_conditional(request):
+    return request.method in SAFE_METHODS and (
+        'HTTP_IF_NONE_MATCH' in request.META
+        or 'HTTP_IF_MODIFIED_SINCE' in request.META
+    )
+
+
+def validators(request, etag_func, last_modified_func, *args, **kwargs):
+    """Валидаторы: ETag в кавычках и Last-Modified в секундах."""
+    etag = etag_func(request, *args, **kwargs)
+    last_modified = last_modified_func(request, *args, **kwargs)
+    return (
+        quote_etag(etag) if etag is not None else None,
+        timegm(last_modified.utctimetuple()) if last_modified else None,
+    )
+
+
+def not_modified(request, etag, last_modified):
+    """Ответ 304 (или 412) с валидаторами, если он подходит, иначе None."""
+    response = get_conditional_response(
+        request, etag=etag, last_modified=last_modified
+    )
+    if response is not None:
+        set_validators(response, etag, last_modified)
+    return response
+
+
+def set_validators(response, etag, last_modified):
+    if last_modified and not response.has_header('Last-Modified'):
+        response.headers['Last-Modified'] = http_date(last_modified)
+    if etag:
+        response.headers.setdefault('ETag', etag)
+    return response
+
+
+def conditional_page(etag_func, last_modified_func):
+    """
+    Как condition из Django, но валидаторы считаются, только когда нужны.
+
+    Для условного запроса — до представления, чтобы ответить 304.
+    Иначе — после него, из прочитанных им строк, и только если
+    у ответа ещё нет ETag (страница из кеша хранит свой).
+    """
+    def decorator(view):
+        @wraps(view)
+        def inner(request, *args, **kwargs):
+            if is_conditional(request):
+                response = not_modified(request, *validators(
+                    request, etag_func, last_modified_func, *args, **kwargs
+                ))
+                if response is not None:
+                    return response
+            response = view(request, *args, **kwargs)
+            if (
+                request.method in SAFE_METHODS
+                and response.status_code == HTTPStatus.OK
+                and not response.has_header('ETag')
+            ):
+                set_validators(response, *validators(
+                    request, etag_func, last_modified_func, *args, **kwargs
+                ))
+            return response
+        return inner
+    return decorator
+
+
+news_condition = conditional_page(news_etag, news_last_modified)
+feed_condition = conditional_page(feed_etag, feed_last_modified)
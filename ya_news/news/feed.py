@@ -0,0 +1,169 @@
+"""
+Материализованные ленты главной страницы.
+
+Главная читает готовые строки FeedEntry одним проходом по индексу
+ленты: заголовок, превью, дата и число комментариев уже лежат
+в строке. Превью берётся из News.preview, поэтому и сборка лент
+не читает полный текст новостей. Строки обновляются по месту,
+когда пишутся новости и комментарии:
+
+- запись новости обновляет её строки во всех лентах;
+- удаление новости удаляет их каскадом;
+- новый или удалённый комментарий переносит в строки счётчик
+  и updated_at из новости.
+
+Ленты:
+
+- latest: все новости, свежие первыми;
+- discussed: новости за последние FEED_DISCUSSED_DAYS дней, самые
+  обсуждаемые первыми. Вышедшие из окна строки в выдачу не попадают,
+  удаляет их rebuild_feed --prune.
+
+Если ленты разошлись с новостями (данные правили в обход ORM),
+это покажет check_feed, а исправит rebuild_feed; устаревшие превью
+самих новостей пересчитает backfill_previews.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+
+from .models import FeedEntry, News, make_preview
+
+FEED_ORDERINGS = {
+    FeedEntry.LATEST: ('-date', 'news_id'),
+    FeedEntry.DISCUSSED: ('-comment_count', '-date', 'news_id'),
+}
+ENTRY_FIELDS = ('title', 'preview', 'date', 'comment_count', 'updated_at')
+
+
+def discussed_since():
+    """Первый день окна ленты discussed."""
+    return timezone.localdate() - timedelta(days=settings.FEED_DISCUSSED_DAYS)
+
+
+def entry_rows(news):
+    """Строки лент для новости: словари полей FeedEntry."""
+    date = News._meta.get_field('date').to_python(news.date)
+    values = {
+        'news_id': news.pk,
+        'title': news.title,
+        'preview': news.preview,
+        'date': date,
+        'comment_count': news.comment_count,
+        'updated_at': news.updated_at,
+    }
+    feeds = [FeedEntry.LATEST]
+    if date >= discussed_since():
+        feeds.append(FeedEntry.DISCUSSED)
+    return [dict(values, feed=feed) for feed in feeds]
+
+
+def feed_entries(feed):
+    """Строки ленты feed, которые видны на главной."""
+    entries = FeedEntry.objects.filter(feed=feed)
+    if feed == FeedEntry.DISCUSSED:
+        entries = entries.filter(date__gte=discussed_since())
+    return entries
+
+
+def refresh_news(news, created=False):
+    """Строки новости во всех лентах после её записи."""
+    rows = entry_rows(news)
+    if created:
+        FeedEntry.objects.bulk_create(FeedEntry(**row) for row in rows)
+        return
+    entries = FeedEntry.objects.filter(news_id=news.pk)
+    entries.exclude(feed__in=[row['feed'] for row in rows]).delete()
+    values = {name: rows[0][name] for name in ENTRY_FIELDS}
+    # Счётчик — из строки новости: его меняют и параллельные комментарии.
+    values['comment_count'] = Subquery(
+        News.objects.filter(pk=news.pk).values('comment_count')
+    )
+    if entries.update(**values) < len(rows):
+        FeedEntry.objects.bulk_create(
+            (FeedEntry(**row) for row in rows), ignore_conflicts=True
+        )
+
+
+def sync_counts(news_ids=None):
+    """
+    Счётчик комментариев и updated_at строк — из их новостей.
+
+    Значения копируются, а не увеличиваются на месте: строки ленты
+    не могут накопить расхождение со счётчиком новости.
+    """
+    news = News.objects.filter(pk=OuterRef('news_id'))
+    entries = FeedEntry.objects.all()
+    if news_ids is not None:
+        entries = entries.filter(news_id__in=news_ids)
+    entries.update(
+        comment_count=Subquery(news.values('comment_count')),
+        updated_at=Subquery(news.values('updated_at')),
+    )
+
+
+def prune():
+    """Удаляет строки discussed, вышедшие из окна; их число."""
+    deleted, _ = FeedEntry.objects.filter(
+        feed=FeedEntry.DISCUSSED, date__lt=discussed_since()
+    ).delete()
+    return deleted
+
+
+def rebuild(batch_size=1000):
+    """
+    Заново собирает все ленты; число строк в каждой.
+
+    Одна транзакция: читатели до её конца видят старые ленты.
+    """
+    counts = dict.fromkeys(FEED_ORDERINGS, 0)
+    with transaction.atomic():
+        FeedEntry.objects.all().delete()
+        last_pk = 0
+        while True:
+            batch = list(
+                News.objects.defer('text').filter(pk__gt=last_pk)
+                .order_by('pk')[:batch_size]
+            )
+            if not batch:
+                break
+            entries = [
+                FeedEntry(**row) for news in batch for row in entry_rows(news)
+            ]
+            FeedEntry.objects.bulk_create(entries)
+            for entry in entries:
+                counts[entry.feed] += 1
+            last_pk = batch[-1].pk
+    return counts
+
+
+def check():
+    """
+    Расхождения лент с новостями: список (лента, id новости, причина).
+
+    Строки discussed вне окна не считаются: в выдачу они не попадают.
+    Превью сверяется с make_preview(text), а не с News.preview:
+    так видны и превью, не посчитанные при записи в обход ORM.
+    """
+    expected = {}
+    for news in News.objects.order_by('pk').iterator():
+        for row in entry_rows(news):
+            row['preview'] = make_preview(news.text)
+            expected[row['feed'], row['news_id']] = tuple(
+                row[name] for name in ENTRY_FIELDS
+            )
+    problems = []
+    since = discussed_since()
+    for entry in FeedEntry.objects.order_by('feed', 'news_id').iterator():
+        key = (entry.feed, entry.news_id)
+        row = expected.pop(key, None)
+        if row is None:
+            if entry.feed != FeedEntry.DISCUSSED or entry.date >= since:
+                problems.append((*key, 'лишняя строка'))
+        elif row != tuple(getattr(entry, name) for name in ENTRY_FIELDS):
+            problems.append((*key, 'устаревшие данные'))
+    problems.extend((*key, 'нет строки') for key in expected)
+    return problems
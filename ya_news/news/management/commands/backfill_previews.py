@@ -0,0 +1,57 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+
+from news.cache import FEED_VERSION_KEY, bump_version
+from news.models import FeedEntry, News, make_preview
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает превью новостей пачками: после вставки в обход '
+        'ORM или смены длины превью.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        checked = changed = 0
+        last_pk = 0
+        while True:
+            rows = list(
+                News.objects.filter(pk__gt=last_pk).order_by('pk')
+                .values_list('pk', 'text', 'preview')[:options['batch_size']]
+            )
+            if not rows:
+                break
+            now = timezone.now()
+            stale = [
+                News(pk=pk, preview=fresh, updated_at=now)
+                for pk, text, preview in rows
+                for fresh in (make_preview(text),)
+                if fresh != preview
+            ]
+            if stale:
+                self.update(stale)
+            checked += len(rows)
+            changed += len(stale)
+            last_pk = rows[-1][0]
+        if changed:
+            bump_version(FEED_VERSION_KEY)
+        self.stdout.write(
+            f'Проверено новостей: {checked}, обновлено: {changed}'
+        )
+
+    @transaction.atomic
+    def update(self, stale):
+        """Новые превью пачки, и в новостях, и в строках лент."""
+        News.objects.bulk_update(stale, ('preview', 'updated_at'))
+        news = News.objects.filter(pk=OuterRef('news_id'))
+        FeedEntry.objects.filter(
+            news_id__in=[item.pk for item in stale]
+        ).update(
+            preview=Subquery(news.values('preview')),
+            updated_at=Subquery(news.values('updated_at')),
+        )
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from news import feed
+
+
+class Command(BaseCommand):
+    help = 'Сверяет материализованные ленты с новостями.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--limit', type=int, default=20,
+            help='Сколько расхождений вывести.'
+        )
+
+    def handle(self, *args, **options):
+        problems = feed.check()
+        for name, news_id, reason in problems[:options['limit']]:
+            self.stdout.write(f'{name}: новость {news_id} — {reason}')
+        if problems:
+            raise CommandError(
+                f'Расхождений: {len(problems)}. '
+                'Исправить: python manage.py backfill_previews '
+                'и python manage.py rebuild_feed.'
+            )
+        self.stdout.write('Ленты совпадают с новостями.')
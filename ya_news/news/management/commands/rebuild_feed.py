@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from news import feed
+
+
+class Command(BaseCommand):
+    help = 'Перестраивает материализованные ленты главной страницы.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--prune', action='store_true',
+            help='Только удалить строки «Обсуждаемого», вышедшие из окна.'
+        )
+
+    def handle(self, *args, **options):
+        if options['prune']:
+            self.stdout.write(f'Удалено строк: {feed.prune()}')
+            return
+        counts = feed.rebuild(options['batch_size'])
+        for name, count in counts.items():
+            self.stdout.write(f'{name}: {count}')
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from news.models import Comment, News
+from news.search import get_backend, make_document
+
+
+class Command(BaseCommand):
+    help = 'Перестраивает поисковый индекс новостей и комментариев.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        backend = get_backend()
+        backend.clear()
+        for model, queryset in (
+            (News, News.objects.all()),
+            (Comment, Comment.objects.visible()),
+        ):
+            indexed = 0
+            last_pk = 0
+            while True:
+                batch = list(
+                    queryset.filter(pk__gt=last_pk).order_by('pk')
+                    [:options['batch_size']]
+                )
+                if not batch:
+                    break
+                with transaction.atomic():
+                    backend.add([make_document(obj) for obj in batch])
+                indexed += len(batch)
+                last_pk = batch[-1].pk
+            self.stdout.write(
+                f'{model._meta.verbose_name_plural}: {indexed}'
+            )
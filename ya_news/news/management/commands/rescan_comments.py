@@ -0,0 +1,162 @@
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from news import feed
+from news.cache import NEWS_VERSION_KEY, bump_version
+from news.forms import bad_words
+from news.models import Comment, News, SearchEntry
+from news.moderation import BadWordsMatcher
+from news.search import get_backend, make_document
+
+_matcher = None
+
+
+def init_worker(words):
+    global _matcher
+    _matcher = BadWordsMatcher(words)
+
+
+def scan(rows):
+    """Номера комментариев, в которых нашлись запрещённые слова."""
+    return {pk for pk, text in rows if _matcher.search(text)}
+
+
+class InlineResult:
+    """Результат проверки без пула процессов, с интерфейсом Future."""
+
+    def __init__(self, value):
+        self.value = value
+
+    def result(self):
+        return self.value
+
+
+class Command(BaseCommand):
+    help = (
+        'Перепроверяет сохранённые комментарии по списку запрещённых слов '
+        'и помечает нарушителей флагом flagged: такие комментарии '
+        'скрыты со страниц и из поиска.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count(),
+            help='Число процессов для проверки текста, 1 — без пула.'
+        )
+        parser.add_argument(
+            '--checkpoint',
+            help='Файл с номером последнего проверенного комментария.'
+        )
+
+    def handle(self, *args, **options):
+        self.batch_size = options['batch_size']
+        self.checkpoint = options['checkpoint'] and Path(options['checkpoint'])
+        words = bad_words.matcher.words
+        workers = options['workers']
+        self.checked = self.changed = 0
+        self.started = time.monotonic()
+        if workers > 1:
+            with ProcessPoolExecutor(
+                workers, initializer=init_worker, initargs=(words,)
+            ) as pool:
+                self.run(pool.submit, workers * 2)
+        else:
+            init_worker(words)
+            self.run(lambda func, rows: InlineResult(func(rows)), 1)
+        if self.checkpoint:
+            self.checkpoint.unlink(missing_ok=True)
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово: проверено {self.checked}, изменено {self.changed}.'
+        ))
+
+    def run(self, submit, max_pending):
+        """
+        Проверяет комментарии пачками по возрастанию pk.
+
+        В работе одновременно не больше max_pending пачек,
+        поэтому память не зависит от размера таблицы.
+        """
+        pending = deque()
+        for batch in self.batches():
+            rows = [(pk, text) for pk, _, text, _ in batch]
+            pending.append((batch, submit(scan, rows)))
+            if len(pending) >= max_pending:
+                self.save(*pending.popleft())
+        while pending:
+            self.save(*pending.popleft())
+
+    def batches(self):
+        last_pk = self.read_checkpoint()
+        while True:
+            batch = list(
+                Comment.objects.filter(pk__gt=last_pk).order_by('pk')
+                .values_list('pk', 'news_id', 'text', 'flagged')
+                [:self.batch_size]
+            )
+            if not batch:
+                return
+            yield batch
+            last_pk = batch[-1][0]
+
+    def save(self, batch, future):
+        offending = future.result()
+        changed = [
+            Comment(pk=pk, news_id=news_id, text=text, flagged=pk in offending)
+            for pk, news_id, text, flagged in batch
+            if flagged != (pk in offending)
+        ]
+        if changed:
+            news_ids = self.update(changed)
+            for news_id in news_ids:
+                bump_version(NEWS_VERSION_KEY.format(pk=news_id))
+        self.write_checkpoint(batch[-1][0])
+        self.checked += len(batch)
+        self.changed += len(changed)
+        rate = self.checked / (time.monotonic() - self.started)
+        self.stdout.write(
+            f'Проверено {self.checked}, изменено {self.changed}, '
+            f'{rate:.0f} строк/с'
+        )
+
+    @transaction.atomic
+    def update(self, changed):
+        """
+        Новые флаги пачки; id затронутых новостей.
+
+        bulk_update не шлёт сигналов, поэтому индекс поиска, updated_at
+        новостей и строки лент обновляются здесь.
+        """
+        Comment.objects.bulk_update(changed, ('flagged',))
+        backend = get_backend()
+        for comment in changed:
+            backend.remove(SearchEntry.COMMENT, comment.pk)
+        visible = [
+            make_document(comment) for comment in changed
+            if not comment.flagged
+        ]
+        if visible:
+            backend.add(visible)
+        news_ids = {comment.news_id for comment in changed}
+        News.objects.filter(pk__in=news_ids).update(updated_at=timezone.now())
+        feed.sync_counts(news_ids)
+        return news_ids
+
+    def read_checkpoint(self):
+        if self.checkpoint and self.checkpoint.exists():
+            return int(self.checkpoint.read_text())
+        return 0
+
+    def write_checkpoint(self, pk):
+        if not self.checkpoint:
+            return
+        temporary = self.checkpoint.with_suffix('.tmp')
+        temporary.write_text(str(pk))
+        os.replace(temporary, self.checkpoint)
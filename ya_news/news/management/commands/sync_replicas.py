@@ -0,0 +1,40 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from yanews import replicas
+
+
+class Command(BaseCommand):
+    help = (
+        'Копирует базу primary в файлы реплик из DATABASE_REPLICAS. '
+        'С --interval работает непрерывно.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', type=float, default=0,
+            help='Пауза между копированиями в секундах, 0 — один раз.'
+        )
+
+    def handle(self, *args, **options):
+        if not settings.DATABASE_REPLICAS:
+            raise CommandError(
+                'Реплики не настроены: запустите с DB_PROFILE=replicas.'
+            )
+        source = str(connections.databases['default']['NAME'])
+        signatures = {}
+        while True:
+            for alias in settings.DATABASE_REPLICAS:
+                signature = replicas.copy_database(
+                    source, replicas.replica_path(alias),
+                    signatures.get(alias)
+                )
+                if signature != signatures.get(alias):
+                    self.stdout.write(f'{alias}: скопирована')
+                signatures[alias] = signature
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,18 @@
+# Generated by Django 3.2.15 on 2026-10-18 12:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0003_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='flagged',
+            field=models.BooleanField(default=False),
+        ),
+    ]
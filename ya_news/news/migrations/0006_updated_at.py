@@ -0,0 +1,32 @@
+# Generated by Django 3.2.15 on 2026-10-18 13:20
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def fill_comment_updated_at(apps, schema_editor):
+    Comment = apps.get_model('news', 'Comment')
+    Comment.objects.update(updated_at=F('created'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0005_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='news',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.RunPython(
+            fill_comment_updated_at, migrations.RunPython.noop
+        ),
+    ]
@@ -0,0 +1,74 @@
+# Generated by Django 3.2.15 on 2026-10-18 13:41
+
+from datetime import timedelta
+
+from django.db import migrations, models
+from django.utils import timezone
+from django.utils.text import Truncator
+import django.db.models.deletion
+
+# Значения на момент миграции: код приложения и настройки могут
+# измениться, а миграция должна собирать ленты так же, как в день её
+# выпуска.
+DISCUSSED_DAYS = 1
+PREVIEW_WORDS = 15
+
+
+def fill_feed(apps, schema_editor):
+    """Ленты как у news.feed.rebuild на момент этой миграции."""
+    News = apps.get_model('news', 'News')
+    FeedEntry = apps.get_model('news', 'FeedEntry')
+    since = timezone.localdate() - timedelta(days=DISCUSSED_DAYS)
+    entries = []
+    for news in News.objects.order_by('pk').iterator():
+        feeds = ['latest', 'discussed'] if news.date >= since else ['latest']
+        preview = Truncator(news.text).words(PREVIEW_WORDS, truncate=' …')
+        entries.extend(
+            FeedEntry(
+                feed=feed, news_id=news.pk, title=news.title,
+                preview=preview, date=news.date,
+                comment_count=news.comment_count,
+                updated_at=news.updated_at,
+            )
+            for feed in feeds
+        )
+        if len(entries) >= 1000:
+            FeedEntry.objects.bulk_create(entries)
+            entries = []
+    FeedEntry.objects.bulk_create(entries)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0006_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('feed', models.CharField(choices=[('latest', 'Свежие'), ('discussed', 'Обсуждаемые')], max_length=9)),
+                ('title', models.CharField(max_length=50)),
+                ('preview', models.TextField()),
+                ('date', models.DateField()),
+                ('comment_count', models.PositiveIntegerField()),
+                ('updated_at', models.DateTimeField()),
+                ('news', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='news.news')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='feedentry',
+            index=models.Index(fields=['feed', '-date', 'news'], name='feed_latest_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='feedentry',
+            index=models.Index(fields=['feed', '-comment_count', '-date', 'news'], name='feed_discussed_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='feedentry',
+            constraint=models.UniqueConstraint(fields=('feed', 'news'), name='feed_entry_unique'),
+        ),
+        migrations.RunPython(fill_feed, migrations.RunPython.noop),
+    ]
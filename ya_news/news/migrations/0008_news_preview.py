@@ -0,0 +1,39 @@
+# Generated by Django 3.2.15 on 2026-10-18 13:44
+
+from django.db import migrations, models
+from django.utils.text import Truncator
+
+BATCH = 1000
+
+
+def fill_previews(apps, schema_editor):
+    """Превью для новостей, записанных до появления поля."""
+    News = apps.get_model('news', 'News')
+    last_pk = 0
+    while True:
+        batch = list(
+            News.objects.filter(pk__gt=last_pk).order_by('pk')
+            .only('text')[:BATCH]
+        )
+        if not batch:
+            return
+        for news in batch:
+            news.preview = Truncator(news.text).words(15, truncate=' …')
+        News.objects.bulk_update(batch, ('preview',))
+        last_pk = batch[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0007_feed_entry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='news',
+            name='preview',
+            field=models.TextField(default='', editable=False),
+        ),
+        migrations.RunPython(fill_previews, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 3.2.15 on 2026-10-18 14:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0008_news_preview'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='searchentry',
+            index=models.Index(fields=['term', '-weight'], name='search_term_weight_idx'),
+        ),
+    ]
@@ -0,0 +1,102 @@
+# Generated by Django 3.2.15 on 2026-10-18 15:10
+
+import re
+from collections import Counter
+
+from django.db import migrations
+
+BATCH = 1000
+# Разбор текста и веса — как в news.search на момент миграции.
+WORD_RE = re.compile(r'\w+')
+TERM_LENGTH = 64
+TITLE_WEIGHT = 5
+FTS_TABLE = 'news_search'
+
+
+def tokenize(text):
+    return [word[:TERM_LENGTH] for word in WORD_RE.findall(text.lower())]
+
+
+def batches(queryset, *fields):
+    last_pk = 0
+    while True:
+        rows = list(
+            queryset.filter(pk__gt=last_pk).order_by('pk')
+            .values_list('pk', *fields)[:BATCH]
+        )
+        if not rows:
+            return
+        yield rows
+        last_pk = rows[-1][0]
+
+
+def documents(apps):
+    """Пачки (вид, pk, id новости, заголовок, текст), без отмеченных."""
+    News = apps.get_model('news', 'News')
+    Comment = apps.get_model('news', 'Comment')
+    for rows in batches(News.objects.all(), 'title', 'text'):
+        yield [('news', pk, pk, title, text) for pk, title, text in rows]
+    comments = Comment.objects.filter(flagged=False)
+    for rows in batches(comments, 'news_id', 'text'):
+        yield [
+            ('comment', pk, news_id, '', text) for pk, news_id, text in rows
+        ]
+
+
+def has_fts_table(connection):
+    return (
+        connection.vendor == 'sqlite'
+        and FTS_TABLE in connection.introspection.table_names()
+    )
+
+
+def fill_search_index(apps, schema_editor):
+    """
+    Индекс для новостей и комментариев, записанных до 0005.
+
+    Заполняется то, чем пользуется NEWS_SEARCH_BACKEND = 'auto':
+    FTS5, если её таблица есть, иначе обратный индекс. Индекс
+    собирается заново: новые записи попадали в него и после 0005.
+    При другом бэкенде нужен rebuild_search_index.
+    """
+    connection = schema_editor.connection
+    if has_fts_table(connection):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+            for batch in documents(apps):
+                cursor.executemany(
+                    f'INSERT INTO {FTS_TABLE} '
+                    '(rowid, title, body, news_id) VALUES (%s, %s, %s, %s)',
+                    [
+                        (pk * 2 + (kind == 'comment'), title, body, news_id)
+                        for kind, pk, news_id, title, body in batch
+                    ]
+                )
+        return
+    SearchEntry = apps.get_model('news', 'SearchEntry')
+    SearchEntry.objects.all().delete()
+    for batch in documents(apps):
+        entries = []
+        for kind, pk, news_id, title, body in batch:
+            weights = Counter(tokenize(body))
+            for term in tokenize(title):
+                weights[term] += TITLE_WEIGHT
+            entries.extend(
+                SearchEntry(
+                    term=term, kind=kind, object_id=pk, news_id=news_id,
+                    weight=weight
+                )
+                for term, weight in weights.items()
+            )
+        SearchEntry.objects.bulk_create(entries, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0009_search_term_weight_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_search_index, migrations.RunPython.noop),
+    ]
@@ -2,21 +2,69 @@ from datetime import datetime
 
 from django.conf import settings
 from django.db import models
+from django.utils.text import Truncator
+
+PREVIEW_WORDS = 15
+
+
+def make_preview(text):
+    """Начало текста, как у фильтра truncatewords:15."""
+    return Truncator(text).words(PREVIEW_WORDS, truncate=' …')
 
 
 class News(models.Model):
     title = models.CharField(max_length=50)
     text = models.TextField()
+    # Начало текста для ленты: считается при записи, чтобы списки
+    # новостей не читали полный текст (defer('text')).
+    preview = models.TextField(default='', editable=False)
     date = models.DateField(default=datetime.today)
+    comment_count = models.PositiveIntegerField(default=0, editable=False)
+    # Сдвигается при любом изменении новости и её комментариев.
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ('-date',)
+        indexes = (
+            models.Index(fields=('-date', 'id'), name='news_date_id_idx'),
+        )
         verbose_name_plural = 'Новости'
         verbose_name = 'Новость'
 
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        """
+        Вместе с текстом сохраняется и превью, его считает pre_save.
+
+        comment_count ведут сигналы комментариев: при записи уже
+        сохранённой новости он не пишется, а перечитывается из базы,
+        чтобы экземпляр, загруженный до нового комментария, не вернул
+        старое значение ни в новость, ни в ленты.
+        """
+        update_fields = kwargs.get('update_fields')
+        deferred = self.get_deferred_fields()
+        if update_fields is not None and 'text' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'preview'}
+        if not self._state.adding and not kwargs.get('force_insert'):
+            self.refresh_from_db(fields=['comment_count'])
+            if update_fields is None:
+                kwargs['update_fields'] = [
+                    field.name for field in self._meta.concrete_fields
+                    if not field.primary_key
+                    and field.attname not in deferred
+                    and field.name != 'comment_count'
+                ]
+        super().save(*args, **kwargs)
+
+
+class CommentQuerySet(models.QuerySet):
+
+    def visible(self):
+        """Комментарии для читателей, без отмеченных rescan_comments."""
+        return self.filter(flagged=False)
+
 
 class Comment(models.Model):
     news = models.ForeignKey(
@@ -29,9 +77,98 @@ class Comment(models.Model):
     )
     text = models.TextField()
     created = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    # Отмечен rescan_comments: скрыт со страниц и из поиска, виден
+    # в админке, где флаг можно снять.
+    flagged = models.BooleanField(default=False)
+
+    objects = CommentQuerySet.as_manager()
 
     class Meta:
         ordering = ('created',)
+        indexes = (
+            models.Index(
+                fields=('news', 'created', 'id'),
+                name='comment_news_created_id_idx'
+            ),
+        )
 
     def __str__(self):
         return self.text[:50]
+
+
+class SearchEntry(models.Model):
+    """
+    Запись обратного индекса для поиска без FTS5.
+
+    Слово term встречается weight раз (с учётом веса поля)
+    в новости или комментарии object_id.
+    """
+    NEWS = 'news'
+    COMMENT = 'comment'
+    KINDS = ((NEWS, 'Новость'), (COMMENT, 'Комментарий'))
+
+    term = models.CharField(max_length=64)
+    kind = models.CharField(max_length=7, choices=KINDS)
+    object_id = models.PositiveBigIntegerField()
+    news = models.ForeignKey(
+        News,
+        on_delete=models.CASCADE,
+        related_name='+',
+    )
+    weight = models.PositiveIntegerField()
+
+    class Meta:
+        indexes = (
+            models.Index(
+                fields=('term', 'kind', 'object_id'),
+                name='search_term_idx'
+            ),
+            models.Index(
+                fields=('kind', 'object_id'), name='search_object_idx'
+            ),
+            models.Index(
+                fields=('term', '-weight'), name='search_term_weight_idx'
+            ),
+        )
+
+
+class FeedEntry(models.Model):
+    """
+    Строка материализованной ленты главной страницы.
+
+    Хранит всё, что главная выводит о новости, и обновляется
+    при записи новостей и комментариев (см. news.feed). У новости
+    по строке в каждой ленте, куда она попадает.
+    """
+    LATEST = 'latest'
+    DISCUSSED = 'discussed'
+    FEEDS = ((LATEST, 'Свежие'), (DISCUSSED, 'Обсуждаемые'))
+
+    feed = models.CharField(max_length=9, choices=FEEDS)
+    news = models.ForeignKey(
+        News,
+        on_delete=models.CASCADE,
+        related_name='+',
+    )
+    title = models.CharField(max_length=50)
+    preview = models.TextField()
+    date = models.DateField()
+    comment_count = models.PositiveIntegerField()
+    updated_at = models.DateTimeField()
+
+    class Meta:
+        constraints = (
+            models.UniqueConstraint(
+                fields=('feed', 'news'), name='feed_entry_unique'
+            ),
+        )
+        indexes = (
+            models.Index(
+                fields=('feed', '-date', 'news'), name='feed_latest_idx'
+            ),
+            models.Index(
+                fields=('feed', '-comment_count', '-date', 'news'),
+                name='feed_discussed_idx'
+            ),
+        )
@@ -0,0 +1,119 @@
+import os
+import threading
+from collections import deque, namedtuple
+
+from django.conf import settings
+
+Match = namedtuple('Match', ('word', 'start'))
+
+
+class BadWordsMatcher:
+    """
+    Автомат Ахо — Корасик по списку запрещённых слов.
+
+    Список компилируется один раз, после чего текст любой длины
+    проверяется за один проход независимо от количества слов.
+    """
+
+    def __init__(self, words):
+        self.words = tuple(sorted({
+            word.strip().lower() for word in words if word.strip()
+        }))
+        self._goto = [{}]
+        self._output = [()]
+        for index, word in enumerate(self.words):
+            self._add(word, index)
+        self._fail = self._link()
+
+    def _add(self, word, index):
+        state = 0
+        for char in word:
+            if char not in self._goto[state]:
+                self._goto.append({})
+                self._output.append(())
+                self._goto[state][char] = len(self._goto) - 1
+            state = self._goto[state][char]
+        self._output[state] += (index,)
+
+    def _link(self):
+        """Строит ссылки неудач обходом бора в ширину."""
+        fail = [0] * len(self._goto)
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, child in self._goto[state].items():
+                queue.append(child)
+                fallback = fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = fail[fallback]
+                fail[child] = self._goto[fallback].get(char, 0)
+                self._output[child] += self._output[fail[child]]
+        return fail
+
+    def finditer(self, text):
+        """Все вхождения слов: само слово и позиция начала в тексте."""
+        goto, fail, output = self._goto, self._fail, self._output
+        state = 0
+        for position, char in enumerate(text.lower()):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for index in output[state]:
+                word = self.words[index]
+                yield Match(word, position - len(word) + 1)
+
+    def find_all(self, text):
+        return list(self.finditer(text))
+
+    def search(self, text):
+        """Первое найденное вхождение или None."""
+        return next(self.finditer(text), None)
+
+
+class BadWordsList:
+    """
+    Встроенный список слов, дополненный словами из файла.
+
+    Файл задаётся настройкой BAD_WORDS_FILE: по слову в строке,
+    строки с # пропускаются. При изменении файла автомат
+    перестраивается при следующей проверке, без перезапуска процесса.
+    """
+
+    def __init__(self, words):
+        self.builtin_words = tuple(words)
+        self._version = None
+        self._matcher = None
+        self._lock = threading.Lock()
+
+    def _file_version(self, path):
+        if not path:
+            return None
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return (path, None)
+        return (path, stat.st_mtime_ns, stat.st_size)
+
+    def _read(self, path):
+        try:
+            with open(path, encoding='utf-8') as file:
+                return [
+                    line for line in file.read().splitlines()
+                    if not line.lstrip().startswith('#')
+                ]
+        except FileNotFoundError:
+            return []
+
+    @property
+    def matcher(self):
+        path = settings.BAD_WORDS_FILE
+        version = self._file_version(path)
+        if self._matcher is None or version != self._version:
+            with self._lock:
+                if self._matcher is None or version != self._version:
+                    words = self.builtin_words
+                    if path:
+                        words += tuple(self._read(path))
+                    self._matcher = BadWordsMatcher(words)
+                    self._version = version
+        return self._matcher
@@ -0,0 +1,198 @@
+import base64
+import binascii
+import json
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import InvalidPage
+from django.db.models import Q
+from django.http import Http404
+
+NEXT = 'n'
+PREVIOUS = 'p'
+
+
+class InvalidCursor(InvalidPage):
+    pass
+
+
+class KeysetPage:
+    """Страница, полученная по ключу последней просмотренной записи."""
+
+    def __init__(self, paginator, object_list, has_next, has_previous):
+        self.paginator = paginator
+        self.object_list = object_list
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    @property
+    def next_cursor(self):
+        if not self._has_next:
+            return None
+        return self.paginator.encode(NEXT, self.object_list[len(self) - 1])
+
+    @property
+    def previous_cursor(self):
+        if not self._has_previous:
+            return None
+        return self.paginator.encode(PREVIOUS, self.object_list[0])
+
+
+class KeysetPaginator:
+    """
+    Постраничный вывод по ключу сортировки вместо OFFSET.
+
+    Страница выбирается условием «строго после ключа» по составному
+    индексу, поэтому дальние страницы стоят столько же, сколько первая.
+    Ключ передаётся клиенту непрозрачным курсором.
+    """
+
+    def __init__(self, queryset, ordering, per_page):
+        self.ordering = tuple(ordering)
+        self.fields = tuple(name.lstrip('-') for name in self.ordering)
+        self.queryset = queryset.order_by(*self.ordering)
+        self.per_page = per_page
+
+    def page(self, cursor=None):
+        if not cursor:
+            return self._page_after(None)
+        direction, key = self.decode(cursor)
+        if direction == NEXT:
+            return self._page_after(key)
+        return self._page_before(key)
+
+    def encode(self, direction, obj):
+        values = [getattr(obj, name) for name in self.fields]
+        raw = json.dumps([
+            direction,
+            [value.isoformat() if hasattr(value, 'isoformat') else value
+             for value in values]
+        ])
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+    def decode(self, cursor):
+        try:
+            raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+            direction, values = json.loads(raw)
+            if direction not in (NEXT, PREVIOUS):
+                raise ValueError(direction)
+            if len(values) != len(self.fields):
+                raise ValueError(values)
+            opts = self.queryset.model._meta
+            key = tuple(
+                opts.get_field(name).to_python(value)
+                for name, value in zip(self.fields, values)
+            )
+        except (binascii.Error, TypeError, ValueError, ValidationError):
+            raise InvalidCursor('Неверный курсор страницы.')
+        if None in key:
+            raise InvalidCursor('Неверный курсор страницы.')
+        return direction, key
+
+    def _after(self, key, reverse=False):
+        """Условие «строка идёт после ключа» в порядке сортировки."""
+        condition = Q()
+        for index, name in enumerate(self.ordering):
+            descending = name.startswith('-') != reverse
+            lookup = f'{self.fields[index]}__{"lt" if descending else "gt"}'
+            condition |= Q(
+                **dict(zip(self.fields[:index], key[:index])),
+                **{lookup: key[index]}
+            )
+        return condition
+
+    def _evaluated(self, rows):
+        """
+        Queryset страницы с уже прочитанными строками.
+
+        Страница читается с одной лишней строкой — по ней видно, есть ли
+        следующая, — а в шаблоны уходит queryset: count() и перебор
+        берут строки из его кеша без новых запросов.
+        """
+        object_list = self.queryset.all()
+        object_list._result_cache = rows
+        return object_list
+
+    def _page_after(self, key):
+        queryset = self.queryset
+        if key is not None:
+            queryset = queryset.filter(self._after(key))
+        rows = list(queryset[:self.per_page + 1])
+        has_next = len(rows) > self.per_page
+        return KeysetPage(
+            self, self._evaluated(rows[:self.per_page]), has_next,
+            key is not None
+        )
+
+    def _reverse_ordering(self):
+        return tuple(
+            name[1:] if name.startswith('-') else f'-{name}'
+            for name in self.ordering
+        )
+
+    def page_values(self, cursor, *fields):
+        """
+        Значения fields у строк страницы cursor и флаги соседних страниц.
+
+        Один запрос по индексу сортировки: по нему видно любое изменение
+        страницы, а саму страницу собирать не нужно.
+        """
+        direction, key = self.decode(cursor) if cursor else (NEXT, None)
+        queryset = self.queryset
+        if direction == PREVIOUS:
+            queryset = queryset.filter(
+                self._after(key, reverse=True)
+            ).order_by(*self._reverse_ordering())
+        elif key is not None:
+            queryset = queryset.filter(self._after(key))
+        rows = list(queryset.values_list(*fields)[:self.per_page + 1])
+        more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if direction == PREVIOUS:
+            return rows[::-1], True, more
+        return rows, more, key is not None
+
+    def _page_before(self, key):
+        previous = self.queryset.filter(
+            self._after(key, reverse=True)
+        ).order_by(*self._reverse_ordering())
+        rows = list(previous[:self.per_page + 1])
+        has_previous = len(rows) > self.per_page
+        return KeysetPage(
+            self, self._evaluated(rows[:self.per_page][::-1]), True,
+            has_previous
+        )
+
+
+def get_page_or_404(paginator, cursor):
+    try:
+        return paginator.page(cursor)
+    except InvalidCursor as error:
+        raise Http404(str(error))
+
+
+class KeysetPaginationMixin:
+    """Подключает KeysetPaginator к ListView."""
+    keyset_ordering = None
+    cursor_kwarg = 'cursor'
+
+    def paginate_queryset(self, queryset, page_size):
+        paginator = KeysetPaginator(queryset, self.keyset_ordering, page_size)
+        page = get_page_or_404(
+            paginator, self.request.GET.get(self.cursor_kwarg)
+        )
+        return paginator, page, page.object_list, page.has_other_pages()
@@ -0,0 +1,13 @@
+"""Адреса проекта с асинхронными представлениями, как при NEWS_ASYNC_VIEWS."""
+from django.urls import include, path
+
+from news.urls import app_name, news_patterns
+from yanews.urls import urlpatterns as project_patterns
+
+urlpatterns = [
+    path('', include((news_patterns(use_async=True), app_name))),
+    *(
+        pattern for pattern in project_patterns
+        if getattr(pattern, 'namespace', None) != app_name
+    ),
+]
@@ -0,0 +1,23 @@
+"""
+Бюджеты SQL-запросов по имени URL.
+
+Число запросов указано для авторизованного пользователя: сессия
+и пользователь добавляют по запросу, у анонима их нет. Суффикс
+:post — отправка формы: в бюджет входят и запросы сигналов
+(счётчики новости и ленты, поисковый индекс).
+"""
+from yanews.query_budget import Budget
+
+BUDGETS = {
+    'news:home': Budget(queries=3),
+    'news:detail': Budget(queries=5),
+    'news:edit': Budget(queries=3),
+    'news:delete': Budget(queries=3),
+    'news:detail:post': Budget(queries=8),
+    'news:edit:post': Budget(queries=7),
+    'news:delete:post': Budget(queries=7),
+    'news:search': Budget(queries=2),
+    'users:login': Budget(queries=0),
+    'users:logout': Budget(queries=4),
+    'users:signup': Budget(queries=0),
+}
@@ -2,10 +2,15 @@ from datetime import timedelta
 
 import pytest
 from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.test.client import Client
 from django.utils import timezone
 
-from news.models import Comment, News
+from news import feed
+from news.models import Comment, News, make_preview
+from news.pytest_tests.budgets import BUDGETS
+from yanews.query_budget import QueryBudget
 
 
 @pytest.fixture(autouse=True)
@@ -13,14 +18,31 @@ def enable_db_access(db):
     pass
 
 
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+
+
+@pytest.fixture(scope='session')
+def users(django_db_setup, django_db_blocker):
+    """Автор и читатель создаются один раз за сессию, как в setUpTestData."""
+    with django_db_blocker.unblock():
+        user_model = get_user_model()
+        author, _ = user_model.objects.get_or_create(username='Лев Толстой')
+        reader, _ = user_model.objects.get_or_create(
+            username='Читатель простой'
+        )
+    return author, reader
+
+
 @pytest.fixture
-def author(django_user_model):
-    return django_user_model.objects.create(username='Лев Толстой')
+def author(users):
+    return users[0]
 
 
 @pytest.fixture
-def reader(django_user_model):
-    return django_user_model.objects.create(username='Читатель простой')
+def reader(users):
+    return users[1]
 
 
 @pytest.fixture
@@ -52,11 +74,13 @@ def ten_news():
         News(
             title=f'Новость {index}',
             text='Просто текст.',
+            preview=make_preview('Просто текст.'),
             date=today - timedelta(days=index)
         )
         for index in range(settings.NEWS_COUNT_ON_HOME_PAGE + 1)
     ]
     News.objects.bulk_create(all_news)
+    feed.rebuild()
 
 
 @pytest.fixture
@@ -79,3 +103,11 @@ def ten_comments(news, author):
         )
         comment.created = now + timedelta(days=index)
         comment.save()
+
+
+@pytest.fixture
+def query_budget():
+    """Проверка бюджета запросов по имени URL из BUDGETS."""
+    def check(name):
+        return QueryBudget(name, BUDGETS)
+    return check
@@ -1,7 +1,29 @@
+from http import HTTPStatus
+from importlib import import_module
+from io import StringIO
+
+import pytest
+from asgiref.sync import async_to_sync
 from django.conf import settings
+from django.core.cache import cache
+from django.contrib.auth.models import AnonymousUser
+from django.core.management import call_command
+from django.http import Http404
+from django.template import engines
+from django.template.loader import render_to_string
+from django.test import AsyncClient
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils.text import Truncator
 
+from news import async_views
+from news.authors import AuthorMap, with_authors
 from news.forms import CommentForm
+from news.models import Comment, News
+from news.search import get_backend, search
+from yanews import templating
 
 
 HOME_URL = reverse('news:home')
@@ -22,6 +44,28 @@ def test_news_order(client, ten_news):
     assert all_dates == sorted_dates
 
 
+def test_home_reads_only_feed(client, ten_news):
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(HOME_URL)
+    assert queries and not any(
+        'news_news' in query['sql'] for query in queries
+    )
+    entry = response.context['object_list'][0]
+    news = News.objects.get(pk=entry.news_id)
+    assert entry.preview == Truncator(news.text).words(15, truncate=' …')
+    assert entry.preview in response.content.decode()
+
+
+def test_discussed_feed(client, author, ten_news):
+    today, yesterday = News.objects.order_by('-date')[:2]
+    for _ in range(2):
+        Comment.objects.create(news=yesterday, author=author, text='Текст')
+    response = client.get(reverse('news:discussed'))
+    assert [
+        entry.news_id for entry in response.context['object_list']
+    ] == [yesterday.pk, today.pk]
+
+
 def test_comments_order(client, news, ten_comments):
     url = reverse('news:detail', args=(news.id,))
     response = client.get(url)
@@ -44,3 +88,336 @@ def test_authorized_client_has_form(author_client, news):
     response = author_client.get(url)
     assert 'form' in response.context
     assert isinstance(response.context['form'], CommentForm)
+
+
+def test_home_page_doesnt_load_comments(
+        client, ten_news, django_assert_num_queries
+):
+    with django_assert_num_queries(1):
+        client.get(HOME_URL)
+
+
+def test_news_pages(client, ten_news):
+    first_page = client.get(HOME_URL).context['page_obj']
+    response = client.get(HOME_URL, {'cursor': first_page.next_cursor})
+    second_page = response.context['page_obj']
+    assert not second_page.has_next()
+    assert second_page.object_list.count() == 1
+    assert second_page.object_list[0].date < first_page.object_list[9].date
+
+    response = client.get(HOME_URL, {'cursor': second_page.previous_cursor})
+    assert (
+        list(response.context['object_list'])
+        == list(first_page.object_list)
+    )
+
+
+def test_comments_pages(client, news, ten_comments, settings):
+    settings.COMMENTS_COUNT_ON_DETAIL_PAGE = 4
+    url = reverse('news:detail', args=(news.id,))
+    seen = []
+    cursor = ''
+    while cursor is not None:
+        page = client.get(url, {'cursor': cursor}).context['comments_page']
+        seen.extend(page.object_list)
+        cursor = page.next_cursor
+    assert seen == list(news.comment_set.order_by('created', 'id'))
+
+
+def test_invalid_cursor(client):
+    response = client.get(HOME_URL, {'cursor': 'не-курсор'})
+    assert response.status_code == HTTPStatus.NOT_FOUND
+
+
+def test_anonymous_detail_page_is_cached(
+        client, news, comment, django_assert_num_queries
+):
+    url = reverse('news:detail', args=(news.id,))
+    client.get(url)
+    with django_assert_num_queries(0):
+        response = client.get(url)
+    assert comment.text in response.content.decode()
+
+
+def test_page_cache_ignores_unused_params(
+        client, news, django_assert_num_queries
+):
+    url = reverse('news:detail', args=(news.id,))
+    client.get(url, {'utm_source': 'mail'})
+    with django_assert_num_queries(0):
+        client.get(url, {'utm_source': 'news', 'x': '1'})
+    with django_assert_num_queries(1):
+        client.get(url, {'cursor': 'не-курсор'})
+
+
+def test_header_cache_key_follows_template(
+        author_client, news, monkeypatch, settings
+):
+    settings.TEMPLATE_CACHE = True
+    author_client.get(HOME_URL)
+    monkeypatch.setitem(templating._versions, 'includes/header.html', 'new')
+    cache_keys = set(cache._cache)
+    author_client.get(HOME_URL)
+    assert any('template.cache.header' in key
+               for key in set(cache._cache) - cache_keys)
+
+
+def test_edit_links_only_for_comment_author(
+        author_client, reader_client, news, comment
+):
+    url = reverse('news:detail', args=(news.id,))
+    edit_url = reverse('news:edit', args=(comment.id,))
+    assert edit_url not in reader_client.get(url).content.decode()
+    assert edit_url in author_client.get(url).content.decode()
+    assert edit_url not in reader_client.get(url).content.decode()
+
+
+def test_comment_authors_are_compact_and_shared(
+        news, author, reader, django_assert_num_queries
+):
+    Comment.objects.bulk_create(
+        Comment(news=news, author=user, text='Текст')
+        for user in (author, reader) * 3
+    )
+    queryset = with_authors(Comment.objects.filter(news=news))
+    assert 'password' not in str(queryset.query)
+    with django_assert_num_queries(1):
+        comments = list(AuthorMap(author).share(queryset))
+        names = {str(comment.author) for comment in comments}
+    assert names == {author.username, reader.username}
+    assert len({id(comment.author) for comment in comments}) == 2
+    assert all(
+        comment.author is author
+        for comment in comments if comment.author_id == author.pk
+    )
+
+
+@pytest.mark.parametrize('backend', ('fts5', 'inverted'))
+def test_search_ranks_and_highlights(client, author, settings, backend):
+    settings.NEWS_SEARCH_BACKEND = backend
+    news = News.objects.create(title='Сенсация в науке', text='Учёные...')
+    comment = Comment.objects.create(
+        news=news, author=author, text='Вот это сенсация!'
+    )
+    News.objects.create(title='Другое', text='Ничего интересного')
+    url = reverse('news:search')
+
+    results = client.get(url, {'q': 'СЕНСАЦИЯ'}).context['results']
+    assert [(hit.kind, hit.pk) for hit, _ in results] == [
+        ('news', news.pk), ('comment', comment.pk)
+    ]
+    assert '<mark>Сенсация</mark>' in results[0][0].snippet
+
+    comment.delete()
+    results = client.get(url, {'q': 'сенсация науке'}).context['results']
+    assert [(hit.kind, hit.pk) for hit, _ in results] == [('news', news.pk)]
+
+
+def test_inverted_search_ranks_only_candidates(client, settings):
+    settings.NEWS_SEARCH_BACKEND = 'inverted'
+    settings.SEARCH_CANDIDATES = 1
+    in_title = News.objects.create(title='Сенсация', text='Сенсация дня')
+    News.objects.create(title='Другое', text='Сенсация дня')
+    results = client.get(
+        reverse('news:search'), {'q': 'сенсация дня'}
+    ).context['results']
+    assert [found for _, found in results] == [in_title]
+
+
+def test_search_finds_loaded_fixture():
+    call_command('loaddata', 'news.json', verbosity=0)
+    news = News.objects.get(title__startswith='Новости мобильной')
+    assert news.pk in {hit.pk for hit in search('мобильной разработки')}
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.parametrize('backend', ('fts5', 'inverted'))
+def test_migration_fills_search_index(settings, monkeypatch, backend):
+    migration = import_module('news.migrations.0010_fill_search_index')
+    if backend == 'inverted':
+        monkeypatch.setattr(
+            migration, 'has_fts_table', lambda connection: False
+        )
+    settings.NEWS_SEARCH_BACKEND = backend
+    MigrationExecutor(connection).migrate(
+        [('news', '0009_search_term_weight_idx')]
+    )
+    news = News.objects.create(title='Сенсация', text='Учёные...')
+    get_backend().clear()
+    assert search('сенсация') == []
+
+    MigrationExecutor(connection).migrate(
+        [('news', '0010_fill_search_index')]
+    )
+    assert [hit.pk for hit in search('сенсация')] == [news.pk]
+
+
+def test_rebuild_search_index(client, news, settings):
+    settings.NEWS_SEARCH_BACKEND = 'inverted'
+    call_command('rebuild_search_index', stdout=StringIO())
+    results = client.get(
+        reverse('news:search'), {'q': news.title}
+    ).context['results']
+    assert [found for _, found in results] == [news]
+
+
+@pytest.fixture
+def async_get(rf):
+    """GET к асинхронному представлению от имени пользователя."""
+    def get(view, user, path='/', **kwargs):
+        request = rf.get(path)
+        request.user = user
+        request.session = {}
+        return async_to_sync(view)(request, **kwargs)
+    return get
+
+
+def test_async_views_match_sync(async_get, ten_news, news, ten_comments):
+    response = async_get(async_views.news_list, AnonymousUser())
+    assert response.status_code == HTTPStatus.OK
+    titles = list(News.objects.values_list('title', flat=True)[
+        :settings.NEWS_COUNT_ON_HOME_PAGE
+    ])
+    for title in titles:
+        assert title in response.content.decode()
+
+    comment = news.comment_set.first()
+    response = async_get(async_views.news_detail, comment.author, pk=news.pk)
+    content = response.content.decode()
+    assert news.title in content
+    assert reverse('news:edit', args=(comment.pk,)) in content
+
+
+def test_async_detail_missing_news(async_get):
+    with pytest.raises(Http404):
+        async_get(async_views.news_detail, AnonymousUser(), pk=0)
+
+
+@pytest.mark.urls('news.pytest_tests.asgi_urls')
+@pytest.mark.django_db(transaction=True)
+def test_async_views_through_asgi_handler(
+        django_user_model, news, monkeypatch
+):
+    # Запросы в пуле потоков идут через свои соединения и видят только
+    # зафиксированные данные, поэтому тест транзакционный.
+    pooled = []
+    pooled_call = async_views._pooled
+    monkeypatch.setattr(async_views, '_pooled', (
+        lambda func, *args: pooled.append(func) or pooled_call(func, *args)
+    ))
+    client = AsyncClient()
+    client.force_login(django_user_model.objects.create(username='Гость'))
+
+    async def get(url):
+        return await client.get(url)
+
+    url = reverse('news:detail', args=(news.pk,))
+    response = async_to_sync(get)(url)
+    assert response.status_code == HTTPStatus.OK
+    content = response.content.decode()
+    assert news.title in content
+    assert 'name="text"' in content
+    assert async_views._comments in pooled
+    response = async_to_sync(get)(HOME_URL)
+    assert news.title in response.content.decode()
+
+
+def test_hot_pages_use_lean_engine(client, news):
+    for url in (HOME_URL, reverse('news:detail', args=(news.pk,))):
+        response = client.get(url)
+        assert 'user' in response.context
+        assert 'messages' not in response.context
+
+
+def test_prerendered_header(client, rf, settings):
+    settings.TEMPLATE_CACHE = True
+    engine = engines['django'].engine
+    header = templating.prerender(engine, 'includes/header.html')
+    assert templating.prerender(engine, 'includes/header.html') is header
+    request = rf.get('/')
+    request.user = AnonymousUser()
+    assert header == render_to_string('includes/header.html', request=request)
+    assert header in client.get(HOME_URL).content.decode()
+
+
+@pytest.mark.parametrize('name, news_object', (
+    ('news:home', None),
+    ('news:detail', pytest.lazy_fixture('news')),
+))
+def test_not_modified_after_one_query(
+        client, ten_news, name, news_object, django_assert_num_queries
+):
+    url = reverse(name, args=(news_object.id,) if news_object else ())
+    response = client.get(url)
+    assert response['Last-Modified']
+    with django_assert_num_queries(1):
+        response = client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+
+
+def test_validators_follow_changes(client, news, author):
+    url = reverse('news:detail', args=(news.id,))
+    etag = client.get(url)['ETag']
+    assert client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == (
+        HTTPStatus.NOT_MODIFIED
+    )
+    Comment.objects.create(news=news, author=author, text='Новый')
+    response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == HTTPStatus.OK
+    assert response['ETag'] != etag
+
+    home_etag = client.get(HOME_URL)['ETag']
+    news.title = 'Новый заголовок'
+    news.save()
+    assert client.get(
+        HOME_URL, HTTP_IF_NONE_MATCH=home_etag
+    ).status_code == HTTPStatus.OK
+
+
+def test_validators_depend_on_viewer(client, author_client, news):
+    url = reverse('news:detail', args=(news.id,))
+    anonymous = client.get(url)
+    authorized = author_client.get(url)
+    assert anonymous['ETag'] != authorized['ETag']
+    assert not authorized.has_header('Last-Modified')
+
+
+def test_async_views_send_same_validators(async_get, client, news):
+    url = reverse('news:detail', args=(news.id,))
+    response = async_get(
+        async_views.news_detail, AnonymousUser(), path=url, pk=news.pk
+    )
+    cache.clear()
+    assert response['ETag'] == client.get(url)['ETag']
+
+
+@pytest.fixture
+def streaming(settings):
+    if settings.NEWS_ASYNC_VIEWS:
+        pytest.skip('Асинхронный NewsDetail не отдаёт страницу потоком.')
+    settings.NEWS_STREAMING_DETAIL = True
+    settings.COMMENTS_STREAM_CHUNK = 3
+
+
+def test_streaming_detail_sends_comments_in_chunks(
+        streaming, author_client, news, ten_comments
+):
+    response = author_client.get(reverse('news:detail', args=(news.id,)))
+    assert response.streaming
+    chunks = [chunk.decode() for chunk in response.streaming_content]
+    # Начало страницы, четыре пачки комментариев, конец страницы.
+    assert len(chunks) == 6
+    assert news.title in chunks[0]
+    assert 'csrfmiddlewaretoken' in chunks[-1]
+    page = ''.join(chunks)
+    comments = list(news.comment_set.order_by('created'))
+    positions = [page.index(comment.text) for comment in comments]
+    assert positions == sorted(positions)
+    assert reverse('news:edit', args=(comments[0].id,)) in page
+
+
+def test_streaming_detail_without_comments(streaming, client, news):
+    response = client.get(reverse('news:detail', args=(news.id,)))
+    page = b''.join(response.streaming_content).decode()
+    assert 'Здесь никто ничего не написал' in page
+    assert response.has_header('ETag')
@@ -1,10 +1,29 @@
+import json
+import os
+import sqlite3
+import time
+from datetime import timedelta
 from http import HTTPStatus
+from io import StringIO
 
+import pytest
 from pytest_django.asserts import assertFormError, assertRedirects
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import OperationalError, connections
+from django.db.utils import ConnectionHandler
 from django.urls import reverse
+from django.utils import timezone
 
-from news.forms import BAD_WORDS, WARNING
-from news.models import Comment
+from news.cache import invalidate_news, news_version
+from news.forms import BAD_WORDS, WARNING, CommentForm
+from news.models import Comment, FeedEntry, News, make_preview
+from news import feed, writer
+from news.moderation import BadWordsMatcher, Match
+from news.search import search
+from yanews import replicas
+from yanews.routers import ReplicaRouter
 
 
 NEW_COMMENT_TEXT = 'Обновлённый комментарий'
@@ -106,3 +125,512 @@ def test_user_cant_use_bad_words(author_client, news):
     )
     comments_count = Comment.objects.count()
     assert comments_count == expected_comment_count
+
+
+def test_comment_count_follows_comments(author_client, news):
+    url = reverse('news:detail', args=(news.id,))
+    author_client.post(url, data=comment_form_data)
+    news.refresh_from_db()
+    assert news.comment_count == 1
+
+    comment = Comment.objects.get()
+    author_client.delete(reverse('news:delete', args=(comment.id,)))
+    news.refresh_from_db()
+    assert news.comment_count == 0
+
+
+def test_admin_cant_move_comment_to_other_news(admin_client, comment):
+    other = News.objects.create(title='Другая новость', text='Текст')
+    url = reverse('admin:news_comment_change', args=(comment.pk,))
+    response = admin_client.post(url, {
+        'news': other.pk,
+        'author': comment.author_id,
+        'text': 'Исправленный комментарий',
+    })
+    assert response.status_code == HTTPStatus.FOUND
+    comment.refresh_from_db()
+    assert comment.text == 'Исправленный комментарий'
+    assert comment.news_id != other.pk
+    other.refresh_from_db()
+    assert other.comment_count == 0
+
+
+def test_stale_news_save_keeps_comment_count(author, news):
+    stale = News.objects.get(pk=news.pk)
+    Comment.objects.create(news=news, author=author, text='Текст')
+    stale.title = 'Новый заголовок'
+    stale.save()
+    assert stale.comment_count == 1
+    assert News.objects.get(pk=news.pk).comment_count == 1
+    assert feed.check() == []
+
+
+def test_comment_changes_move_news_updated_at(author_client, news):
+    url = reverse('news:detail', args=(news.id,))
+    stamps = [News.objects.get(pk=news.pk).updated_at]
+    author_client.post(url, data=comment_form_data)
+    comment = Comment.objects.get()
+    stamps.append(News.objects.get(pk=news.pk).updated_at)
+    author_client.post(
+        reverse('news:edit', args=(comment.id,)),
+        data={'text': 'Исправленный комментарий'}
+    )
+    comment.refresh_from_db()
+    stamps.append(News.objects.get(pk=news.pk).updated_at)
+    assert stamps[-1] == comment.updated_at
+    author_client.delete(reverse('news:delete', args=(comment.id,)))
+    stamps.append(News.objects.get(pk=news.pk).updated_at)
+    assert stamps == sorted(set(stamps))
+
+
+def test_loaddata_fills_timestamps(author, tmp_path):
+    call_command('loaddata', 'news.json', verbosity=0)
+    assert News.objects.count() == 19
+    assert not News.objects.filter(updated_at__isnull=True).exists()
+
+    comments = tmp_path / 'comments.json'
+    comments.write_text(json.dumps([{
+        'model': 'news.comment',
+        'fields': {
+            'news': News.objects.first().pk,
+            'author': author.pk,
+            'text': 'Текст',
+        },
+    }]))
+    call_command('loaddata', comments, verbosity=0)
+    comment = Comment.objects.get()
+    assert comment.created and comment.updated_at
+
+
+def test_loaddata_fills_previews():
+    call_command('loaddata', 'news.json', verbosity=0)
+    for text, preview in News.objects.values_list('text', 'preview'):
+        assert preview == make_preview(text)
+
+
+@pytest.mark.parametrize(
+    'name, target',
+    (
+        ('news:detail', pytest.lazy_fixture('news')),
+        ('news:edit', pytest.lazy_fixture('comment')),
+        ('news:delete', pytest.lazy_fixture('comment')),
+    )
+)
+def test_comment_write_query_budget(
+        query_budget, author_client, news, name, target
+):
+    url = reverse(name, args=(target.id,))
+    with query_budget(f'{name}:post') as recorder:
+        response = author_client.post(url, data=comment_form_data)
+    assertRedirects(
+        response, reverse('news:detail', args=(news.id,)) + '#comments'
+    )
+    statements = [
+        sql.split()[0] for _, sql in recorder.queries
+        if '"news_comment"' in sql or sql.startswith('SELECT "news_news"')
+    ]
+    assert statements == ['SELECT', {
+        'news:detail': 'INSERT', 'news:edit': 'UPDATE', 'news:delete': 'DELETE'
+    }[name]]
+
+
+def test_feed_follows_news_and_comments(author, news):
+    def entries():
+        return {
+            entry.feed: entry
+            for entry in FeedEntry.objects.filter(news=news)
+        }
+
+    assert set(entries()) == {FeedEntry.LATEST, FeedEntry.DISCUSSED}
+    comment = Comment.objects.create(news=news, author=author, text='Текст')
+    assert entries()[FeedEntry.DISCUSSED].comment_count == 1
+    news.title = 'Новый заголовок'
+    news.text = 'Слово ' * 20
+    news.save()
+    assert entries()[FeedEntry.LATEST].title == 'Новый заголовок'
+    assert entries()[FeedEntry.LATEST].preview.endswith('…')
+    comment.delete()
+    assert entries()[FeedEntry.LATEST].comment_count == 0
+    assert feed.check() == []
+    news.date = timezone.localdate() - timedelta(days=5)
+    news.save()
+    assert set(entries()) == {FeedEntry.LATEST}
+    news.delete()
+    assert not entries()
+
+
+def test_feed_matches_loaded_fixture():
+    call_command('loaddata', 'news.json', verbosity=0)
+    assert FeedEntry.objects.filter(feed=FeedEntry.LATEST).count() == 19
+    assert feed.check() == []
+    assert not FeedEntry.objects.filter(preview='').exists()
+
+
+def test_check_and_rebuild_feed(settings, news, ten_news):
+    call_command('check_feed', stdout=StringIO())
+    FeedEntry.objects.filter(news=news).update(title='Старый заголовок')
+    FeedEntry.objects.exclude(news=news).filter(
+        feed=FeedEntry.LATEST
+    ).first().delete()
+    with pytest.raises(CommandError, match='Расхождений: 3'):
+        call_command('check_feed', stdout=StringIO())
+    call_command('rebuild_feed', stdout=StringIO())
+    call_command('check_feed', stdout=StringIO())
+
+    settings.FEED_DISCUSSED_DAYS = 0
+    call_command('check_feed', stdout=StringIO())
+    output = StringIO()
+    call_command('rebuild_feed', '--prune', stdout=output)
+    assert output.getvalue() == 'Удалено строк: 1\n'
+
+
+def test_news_save_updates_preview(news, django_assert_max_num_queries):
+    news.text = 'Слово ' * 20
+    news.save(update_fields=['text'])
+    news.refresh_from_db()
+    assert news.preview == make_preview(news.text)
+    listed = News.objects.defer('text').get(pk=news.pk)
+    listed.title = 'Новый заголовок'
+    with django_assert_max_num_queries(10) as queries:
+        listed.save()
+    update = next(
+        query['sql'] for query in queries.captured_queries
+        if query['sql'].startswith('UPDATE "news_news"')
+    )
+    assert '"text"' not in update
+    listed.refresh_from_db()
+    assert listed.preview == make_preview(news.text)
+    assert listed.text == news.text
+
+
+def test_backfill_previews_command(news, ten_news):
+    total = News.objects.update(preview='')
+    FeedEntry.objects.update(preview='')
+    assert len(feed.check()) == FeedEntry.objects.count()
+    output = StringIO()
+    call_command('backfill_previews', '--batch-size', '3', stdout=output)
+    assert output.getvalue() == (
+        f'Проверено новостей: {total}, обновлено: {total}\n'
+    )
+    news.refresh_from_db()
+    assert news.preview == make_preview(news.text)
+    assert feed.check() == []
+    output = StringIO()
+    call_command('backfill_previews', stdout=output)
+    assert output.getvalue() == f'Проверено новостей: {total}, обновлено: 0\n'
+
+
+def test_recount_comments_command(news, ten_comments):
+    News.objects.update(comment_count=0)
+    call_command('recount_comments', stdout=StringIO())
+    news.refresh_from_db()
+    assert news.comment_count == Comment.objects.filter(news=news).count()
+
+
+def test_new_comment_resets_page_cache(client, author_client, news):
+    home_url = reverse('news:home')
+    url = reverse('news:detail', args=(news.id,))
+    client.get(home_url)
+    client.get(url)
+    author_client.post(url, data=comment_form_data)
+    assert NEW_COMMENT_TEXT in client.get(url).content.decode()
+    assert 'Комментариев: 1' in client.get(home_url).content.decode()
+
+
+@pytest.mark.parametrize('scope', ('USER', 'NEWS'))
+def test_comment_rate_limit(
+        settings, author_client, reader_client, news, scope
+):
+    settings.COMMENT_RATE_PER_USER = None
+    settings.COMMENT_RATE_PER_NEWS = None
+    setattr(settings, f'COMMENT_RATE_PER_{scope}', (2, 0.1))
+    url = reverse('news:detail', args=(news.id,))
+    for _ in range(2):
+        response = author_client.post(url, data=comment_form_data)
+        assert response.status_code == HTTPStatus.FOUND
+    response = author_client.post(url, data=comment_form_data)
+    assert response.status_code == HTTPStatus.TOO_MANY_REQUESTS
+    assert response['Retry-After'] == '10'
+    response = reader_client.post(url, data=comment_form_data)
+    assert (response.status_code == HTTPStatus.FOUND) == (scope == 'USER')
+    assert Comment.objects.count() == 2 + (scope == 'USER')
+
+
+def test_missing_news_does_not_take_comment_token(
+        settings, author_client, news
+):
+    settings.COMMENT_RATE_PER_USER = (1, 0.1)
+    url = reverse('news:detail', args=(news.id + 1,))
+    response = author_client.post(url, data=comment_form_data)
+    assert response.status_code == HTTPStatus.NOT_FOUND
+    url = reverse('news:detail', args=(news.id,))
+    response = author_client.post(url, data=comment_form_data)
+    assert response.status_code == HTTPStatus.FOUND
+
+
+@pytest.fixture
+def comment_queue(settings, monkeypatch):
+    settings.COMMENT_RATE_PER_USER = None
+    settings.COMMENT_WRITE_BEHIND = True
+    queue = writer.CommentQueue(background=False)
+    monkeypatch.setattr(writer, 'comment_queue', queue)
+    return queue
+
+
+@pytest.mark.parametrize('ordering', ('written', 'accepted'))
+def test_write_behind_queue(
+        settings, comment_queue, client, author_client, news, ordering
+):
+    settings.COMMENT_QUEUE_DURABILITY = 'memory'
+    settings.COMMENT_QUEUE_ORDERING = ordering
+    url = reverse('news:detail', args=(news.id,))
+    client.get(url)
+    texts = [f'Комментарий в очереди {index}' for index in range(3)]
+    for text in texts:
+        response = author_client.post(url, data={'text': text})
+        assertRedirects(response, url + '#comments')
+    assert not Comment.objects.exists()
+    assert len(comment_queue.pending) == 3
+
+    flushed = timezone.now()
+    comment_queue.flush()
+    comments = list(Comment.objects.order_by('created', 'id'))
+    assert [comment.text for comment in comments] == texts
+    assert all(
+        (comment.created < flushed) == (ordering == 'accepted')
+        for comment in comments
+    )
+    news.refresh_from_db()
+    assert news.comment_count == 3
+    assert news.updated_at == comments[-1].updated_at
+    assert {hit.pk for hit in search('очереди')} == {
+        comment.pk for comment in comments
+    }
+    assert texts[0] in client.get(url).content.decode()
+
+
+def test_write_behind_waits_for_commit(
+        settings, comment_queue, author_client, news
+):
+    settings.COMMENT_QUEUE_DURABILITY = 'commit'
+    author_client.post(
+        reverse('news:detail', args=(news.id,)), data=comment_form_data
+    )
+    assert not comment_queue.pending
+    assert Comment.objects.get().text == NEW_COMMENT_TEXT
+
+
+def test_write_behind_cache_error_keeps_batch(
+        settings, comment_queue, author_client, news, monkeypatch
+):
+    settings.COMMENT_QUEUE_DURABILITY = 'memory'
+    url = reverse('news:detail', args=(news.id,))
+    for _ in range(2):
+        author_client.post(url, data=comment_form_data)
+
+    def broken_cache(pk):
+        raise ConnectionError
+
+    monkeypatch.setattr(writer, 'invalidate_news', broken_cache)
+    comment_queue.flush()
+    assert Comment.objects.count() == 2
+
+
+def test_write_behind_times_out_without_writer(
+        settings, comment_queue, author_client, news, monkeypatch
+):
+    settings.COMMENT_QUEUE_DURABILITY = 'commit'
+    settings.COMMENT_QUEUE_TIMEOUT = 0.05
+    comment_queue.background = True
+    monkeypatch.setattr(comment_queue, '_run', lambda: None)
+    response = author_client.post(
+        reverse('news:detail', args=(news.id,)), data=comment_form_data
+    )
+    assert response.status_code == HTTPStatus.SERVICE_UNAVAILABLE
+    assert not comment_queue.pending
+    comment_queue.flush()
+    assert not Comment.objects.exists()
+
+
+def test_matcher_finds_overlapping_words():
+    matcher = BadWordsMatcher(('кот', 'котик', 'тик'))
+    assert matcher.find_all('Котики') == [
+        Match('кот', 0), Match('котик', 0), Match('тик', 2)
+    ]
+
+
+def test_bad_words_file_is_reloaded(settings, tmp_path):
+    words_file = tmp_path / 'bad_words.txt'
+    words_file.write_text('# Проверка\nбяка\n', encoding='utf-8')
+    settings.BAD_WORDS_FILE = str(words_file)
+    assert not CommentForm(data={'text': 'Ну и бяка'}).is_valid()
+
+    words_file.write_text('злюка\n', encoding='utf-8')
+    assert CommentForm(data={'text': 'Ну и бяка'}).is_valid()
+    assert not CommentForm(data={'text': 'Ну и злюка'}).is_valid()
+    assert not CommentForm(data={'text': BAD_WORDS[0]}).is_valid()
+
+
+@pytest.mark.parametrize('workers', (1, 2))
+def test_rescan_comments_flags_bad_words(news, author, workers):
+    clean, rude = Comment.objects.bulk_create([
+        Comment(news=news, author=author, text='Хорошая новость'),
+        Comment(news=news, author=author, text=f'Ты {BAD_WORDS[1]}!'),
+    ])
+    call_command(
+        'rescan_comments', workers=workers, batch_size=1, stdout=StringIO()
+    )
+    assert list(
+        Comment.objects.filter(flagged=True).values_list('text', flat=True)
+    ) == [f'Ты {BAD_WORDS[1]}!']
+
+
+def test_rescan_comments_hides_flagged(client, news, author):
+    rude = Comment.objects.create(
+        news=news, author=author, text=f'Ты {BAD_WORDS[1]}!'
+    )
+    url = reverse('news:detail', args=(news.id,))
+    assert rude.text in client.get(url).content.decode()
+    assert [hit.pk for hit in search(BAD_WORDS[1])] == [rude.pk]
+    updated_at = News.objects.get(pk=news.pk).updated_at
+
+    call_command('rescan_comments', workers=1, stdout=StringIO())
+    assert rude.text not in client.get(url).content.decode()
+    assert search(BAD_WORDS[1]) == []
+    assert News.objects.get(pk=news.pk).updated_at > updated_at
+    assert feed.check() == []
+
+    rude.refresh_from_db()
+    rude.flagged = False
+    rude.save()
+    assert rude.text in client.get(url).content.decode()
+
+
+def test_rescan_comments_resumes_from_checkpoint(news, author, tmp_path):
+    first, second = (
+        Comment.objects.create(
+            news=news, author=author, text=f'{BAD_WORDS[0]} {index}'
+        )
+        for index in range(2)
+    )
+    checkpoint = tmp_path / 'rescan.checkpoint'
+    checkpoint.write_text(str(first.pk))
+    call_command(
+        'rescan_comments', workers=1, checkpoint=str(checkpoint),
+        stdout=StringIO()
+    )
+    first.refresh_from_db()
+    second.refresh_from_db()
+    assert (first.flagged, second.flagged) == (False, True)
+    assert not checkpoint.exists()
+
+
+def test_production_sqlite_backend(tmp_path):
+    database = str(tmp_path / 'db.sqlite3')
+    handler = ConnectionHandler({
+        'default': {
+            'ENGINE': 'yanews.sqlite',
+            'NAME': database,
+            'CONN_MAX_AGE': 600,
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {'pragmas': {
+                'journal_mode': 'WAL', **settings.SQLITE_PRAGMAS
+            }},
+        },
+        'readonly': {
+            'ENGINE': 'yanews.sqlite',
+            'NAME': f'file:{database}?mode=ro',
+            'OPTIONS': {'pragmas': {'query_only': 'ON'}},
+        },
+    })
+    default, readonly = handler['default'], handler['readonly']
+    try:
+        with default.cursor() as cursor:
+            cursor.execute('CREATE TABLE item (id INTEGER PRIMARY KEY)')
+            cursor.execute('PRAGMA journal_mode')
+            assert cursor.fetchone()[0] == 'wal'
+        with readonly.cursor() as cursor:
+            cursor.execute('SELECT count(*) FROM item')
+            with pytest.raises(OperationalError):
+                cursor.execute('INSERT INTO item DEFAULT VALUES')
+
+        raw = default.connection
+        default.close_if_unusable_or_obsolete()
+        assert default.connection is raw
+        raw.close()
+        default.close_if_unusable_or_obsolete()
+        assert default.connection is None
+    finally:
+        handler.close_all()
+
+
+@pytest.fixture
+def replica(settings, tmp_path, monkeypatch):
+    """Реплика replica1 — файл во временном каталоге."""
+    path = tmp_path / 'replica1.sqlite3'
+    settings.DATABASE_REPLICAS = ['replica1']
+    monkeypatch.setattr(replicas, 'replica_path', lambda alias: str(path))
+    replicas.reset_health()
+    yield path
+    replicas.reset_health()
+
+
+def test_replica_router_fails_over_to_primary(replica, monkeypatch):
+    monkeypatch.setattr(connections['default'], 'in_atomic_block', False)
+    router = ReplicaRouter()
+    assert router.db_for_read(News) is None
+
+    source = replica.with_name('primary.sqlite3')
+    with sqlite3.connect(source) as primary:
+        primary.execute('CREATE TABLE item (id INTEGER PRIMARY KEY)')
+    signature = replicas.copy_database(str(source), str(replica))
+    replicas.reset_health()
+    assert router.db_for_read(News) is None
+    with replicas.request_state():
+        assert router.db_for_read(News) == 'replica1'
+
+    stale = time.time() - settings.REPLICA_MAX_LAG - 1
+    os.utime(replica, (stale, stale))
+    replicas.reset_health()
+    with replicas.request_state():
+        assert router.db_for_read(News) is None
+
+    assert replicas.copy_database(
+        str(source), str(replica), signature
+    ) == signature
+    replicas.reset_health()
+    with replicas.request_state():
+        assert router.db_for_read(News) == 'replica1'
+
+
+def test_fresh_cache_version_is_filled_from_primary(
+        replica, monkeypatch, news
+):
+    monkeypatch.setattr(connections['default'], 'in_atomic_block', False)
+    replica.touch()
+    cache.clear()
+    router = ReplicaRouter()
+    with replicas.request_state():
+        news_version(news.pk)
+        assert router.db_for_read(News) == 'replica1'
+    invalidate_news(news.pk)
+    with replicas.request_state():
+        news_version(news.pk)
+        assert router.db_for_read(News) is None
+
+
+@pytest.mark.parametrize(
+    'name, method, target',
+    (
+        ('news:detail', 'post', pytest.lazy_fixture('news')),
+        ('news:edit', 'post', pytest.lazy_fixture('comment')),
+        ('news:delete', 'post', pytest.lazy_fixture('comment')),
+        ('news:detail', 'get', pytest.lazy_fixture('news')),
+    )
+)
+def test_writes_pin_user_to_primary(
+        replica, author_client, name, method, target
+):
+    url = reverse(name, args=(target.id,))
+    response = getattr(author_client, method)(url, data=comment_form_data)
+    assert (replicas.STICKY_COOKIE in response.cookies) == (method == 'post')
@@ -5,6 +5,8 @@ from pytest_django.asserts import assertRedirects
 
 from django.urls import reverse
 
+from yanews.query_budget import Budget, QueryBudget
+
 
 @pytest.mark.parametrize(
     'name, note_object',
@@ -63,3 +65,77 @@ def test_home_page(client):
     url = reverse('news:home')
     response = client.get(url)
     assert response.status_code == HTTPStatus.OK
+
+
+@pytest.fixture
+def metrics(settings):
+    from yanews.metrics import registry
+
+    settings.METRICS_ENABLED = True
+    registry.clear()
+    yield registry
+    registry.clear()
+
+
+def test_metrics_recorded_per_url_name(client, metrics, news):
+    response = client.get(reverse('news:detail', args=(news.id,)))
+    assert 'db;dur=' in response['Server-Timing']
+    assert 'render;dur=' in response['Server-Timing']
+    count, _, quantiles = metrics.snapshot()[('sql_queries', 'news:detail')]
+    assert count == 1
+    assert quantiles[0.99] > 0
+
+    response = client.get(reverse('metrics'))
+    assert response.status_code == HTTPStatus.OK
+    assert (
+        'yanews_http_request_sql_queries_count{view="news:detail"} 1'
+        in response.content.decode()
+    )
+
+
+def test_metrics_disabled_by_default(client):
+    response = client.get(reverse('news:home'))
+    assert 'Server-Timing' not in response
+    response = client.get(reverse('metrics'))
+    assert response.status_code == HTTPStatus.NOT_FOUND
+
+
+def test_metrics_endpoint_is_local(client, metrics):
+    response = client.get(reverse('metrics'), REMOTE_ADDR='10.0.0.1')
+    assert response.status_code == HTTPStatus.NOT_FOUND
+
+
+@pytest.mark.usefixtures('ten_news', 'ten_comments')
+@pytest.mark.parametrize(
+    'name, args, user_client',
+    (
+        ('news:home', None, pytest.lazy_fixture('client')),
+        ('news:home', None, pytest.lazy_fixture('reader_client')),
+        ('news:detail', pytest.lazy_fixture('news'),
+         pytest.lazy_fixture('client')),
+        ('news:detail', pytest.lazy_fixture('news'),
+         pytest.lazy_fixture('author_client')),
+        ('news:edit', pytest.lazy_fixture('comment'),
+         pytest.lazy_fixture('author_client')),
+        ('news:delete', pytest.lazy_fixture('comment'),
+         pytest.lazy_fixture('author_client')),
+        ('news:search', None, pytest.lazy_fixture('client')),
+        ('users:login', None, pytest.lazy_fixture('client')),
+        ('users:logout', None, pytest.lazy_fixture('author_client')),
+        ('users:signup', None, pytest.lazy_fixture('client')),
+    )
+)
+def test_query_budget(query_budget, name, args, user_client):
+    url = reverse(name, args=args and (args.id,))
+    with query_budget(name):
+        response = user_client.get(url, {'q': 'Tекст'})
+    assert response.status_code == HTTPStatus.OK
+
+
+def test_query_budget_reports_call_sites(author_client, news):
+    budget = QueryBudget('news:detail', {'news:detail': Budget(0)})
+    with pytest.raises(AssertionError) as error:
+        with budget:
+            author_client.get(reverse('news:detail', args=(news.id,)))
+    assert 'news/views.py' in str(error.value)
+    assert 'FROM "news_news"' in str(error.value)
@@ -0,0 +1,299 @@
+import math
+import re
+from collections import Counter, namedtuple
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import (
+    Case, Count, F, FloatField, Max, Q, Sum, Value, When
+)
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import Comment, News, SearchEntry
+
+WORD_RE = re.compile(r'\w+')
+TITLE_WEIGHT = 5
+SNIPPET_WORDS = 16
+FTS_TABLE = 'news_search'
+
+Document = namedtuple('Document', ('kind', 'pk', 'news_id', 'title', 'body'))
+Hit = namedtuple('Hit', ('kind', 'pk', 'news_id', 'snippet', 'score'))
+
+
+def tokenize(text):
+    return [
+        word[:SearchEntry._meta.get_field('term').max_length]
+        for word in WORD_RE.findall(text.lower())
+    ]
+
+
+def make_document(instance):
+    if isinstance(instance, News):
+        return Document(
+            SearchEntry.NEWS, instance.pk, instance.pk,
+            instance.title, instance.text
+        )
+    return Document(
+        SearchEntry.COMMENT, instance.pk, instance.news_id, '', instance.text
+    )
+
+
+def highlight(text, terms):
+    """Фрагмент текста вокруг первого найденного слова с подсветкой."""
+    words = list(WORD_RE.finditer(text))
+    first = next(
+        (index for index, word in enumerate(words)
+         if word.group().lower() in terms),
+        0
+    )
+    window = words[max(first - SNIPPET_WORDS // 2, 0):][:SNIPPET_WORDS]
+    if not window:
+        return ''
+    parts = ['…'] if window[0].start() else []
+    position = window[0].start()
+    for word in window:
+        parts.append(escape(text[position:word.start()]))
+        if word.group().lower() in terms:
+            parts.append(f'<mark>{escape(word.group())}</mark>')
+        else:
+            parts.append(escape(word.group()))
+        position = word.end()
+    if position < len(text):
+        parts.append('…')
+    return mark_safe(''.join(parts))
+
+
+class InvertedIndexBackend:
+    """
+    Обратный индекс в обычной таблице, работает на любой базе.
+
+    Результаты ранжируются по TF-IDF, совпадение в заголовке
+    весит больше, чем в тексте. Ранжируются не больше SEARCH_CANDIDATES
+    документов, см. _candidates: на частых словах выдача приближённая.
+    Точное ранжирование на большой базе даёт только Fts5Backend.
+    """
+
+    def add(self, documents):
+        entries = []
+        for document in documents:
+            weights = Counter(tokenize(document.body))
+            for term in tokenize(document.title):
+                weights[term] += TITLE_WEIGHT
+            entries.extend(
+                SearchEntry(
+                    term=term, kind=document.kind, object_id=document.pk,
+                    news_id=document.news_id, weight=weight
+                )
+                for term, weight in weights.items()
+            )
+        SearchEntry.objects.bulk_create(entries, batch_size=500)
+
+    def remove(self, kind, pk):
+        SearchEntry.objects.filter(kind=kind, object_id=pk).delete()
+
+    def clear(self):
+        SearchEntry.objects.all().delete()
+
+    def search(self, query, limit):
+        terms = set(tokenize(query))
+        if not terms:
+            return []
+        frequencies = dict(
+            SearchEntry.objects.filter(term__in=terms).values_list(
+                'term'
+            ).annotate(total=Count('id')).order_by()
+        )
+        if len(frequencies) < len(terms):
+            return []
+        # Число документов оцениваем по наибольшим pk: так не нужно
+        # просматривать таблицы целиком.
+        documents = sum(
+            model.objects.aggregate(last=Max('pk'))['last'] or 0
+            for model in (News, Comment)
+        )
+        score = Sum(Case(
+            *(When(term=term, then=F('weight') * Value(
+                math.log(1 + documents / total)
+            )) for term, total in frequencies.items()),
+            output_field=FloatField(),
+        ))
+        entries = SearchEntry.objects.filter(term__in=terms)
+        rarest = min(frequencies, key=frequencies.get)
+        if frequencies[rarest] > settings.SEARCH_CANDIDATES:
+            entries = entries.filter(self._candidates(rarest))
+        rows = entries.values(
+            'kind', 'object_id', 'news_id'
+        ).annotate(
+            matched=Count('term', distinct=True), score=score
+        ).filter(matched=len(terms)).order_by('-score', 'object_id')[:limit]
+        return self._hits(rows, terms)
+
+    def _candidates(self, term):
+        """
+        Документы с наибольшим весом самого редкого слова запроса.
+
+        В найденном документе есть все слова запроса, значит, и самое
+        редкое. Берём SEARCH_CANDIDATES его записей по индексу
+        (term, -weight), и GROUP BY не проходит по всем записям
+        частых слов.
+        """
+        ids = {SearchEntry.NEWS: [], SearchEntry.COMMENT: []}
+        for kind, object_id in SearchEntry.objects.filter(
+            term=term
+        ).order_by('-weight').values_list(
+            'kind', 'object_id'
+        )[:settings.SEARCH_CANDIDATES]:
+            ids[kind].append(object_id)
+        return (
+            Q(kind=SearchEntry.NEWS, object_id__in=ids[SearchEntry.NEWS])
+            | Q(
+                kind=SearchEntry.COMMENT,
+                object_id__in=ids[SearchEntry.COMMENT]
+            )
+        )
+
+    def _hits(self, rows, terms):
+        rows = list(rows)
+        fields = {
+            (SearchEntry.NEWS, pk): (title, text) for pk, title, text in
+            News.objects.filter(pk__in=[
+                row['object_id'] for row in rows
+                if row['kind'] == SearchEntry.NEWS
+            ]).values_list('pk', 'title', 'text')
+        }
+        fields.update({
+            (SearchEntry.COMMENT, pk): (text,) for pk, text in
+            Comment.objects.filter(pk__in=[
+                row['object_id'] for row in rows
+                if row['kind'] == SearchEntry.COMMENT
+            ]).values_list('pk', 'text')
+        })
+        return [
+            Hit(
+                row['kind'], row['object_id'], row['news_id'],
+                self._snippet(
+                    fields.get((row['kind'], row['object_id']), ('',)), terms
+                ),
+                row['score']
+            )
+            for row in rows
+        ]
+
+    def _snippet(self, fields, terms):
+        """Подсвечиваем первое поле, в котором есть искомое слово."""
+        for text in fields:
+            if terms.intersection(tokenize(text)):
+                return highlight(text, terms)
+        return highlight(fields[-1], terms)
+
+
+class Fts5Backend:
+    """
+    Полнотекстовый индекс SQLite FTS5 с ранжированием BM25.
+
+    rowid записи кодирует вид документа: у новостей он чётный,
+    у комментариев нечётный, так что обновление идёт по ключу.
+    """
+
+    def _rowid(self, kind, pk):
+        return pk * 2 + (kind == SearchEntry.COMMENT)
+
+    def add(self, documents):
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {FTS_TABLE} '
+                '(rowid, title, body, news_id) VALUES (%s, %s, %s, %s)',
+                [
+                    (self._rowid(document.kind, document.pk),
+                     document.title, document.body, document.news_id)
+                    for document in documents
+                ]
+            )
+
+    def remove(self, kind, pk):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s',
+                (self._rowid(kind, pk),)
+            )
+
+    def clear(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+
+    def search(self, query, limit):
+        terms = tokenize(query)
+        if not terms:
+            return []
+        match = ' '.join('"{}"'.format(term) for term in terms)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid, news_id, '
+                f'snippet({FTS_TABLE}, -1, char(2), char(3), \'…\', '
+                f'{SNIPPET_WORDS}), '
+                f'bm25({FTS_TABLE}, {TITLE_WEIGHT}.0, 1.0) AS rank '
+                f'FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s '
+                'ORDER BY rank LIMIT %s',
+                (match, limit)
+            )
+            rows = cursor.fetchall()
+        return [
+            Hit(
+                SearchEntry.COMMENT if rowid % 2 else SearchEntry.NEWS,
+                rowid // 2, news_id,
+                mark_safe(
+                    escape(snippet).replace('\x02', '<mark>')
+                    .replace('\x03', '</mark>')
+                ),
+                -rank
+            )
+            for rowid, news_id, snippet, rank in rows
+        ]
+
+
+BACKENDS = {
+    'fts5': Fts5Backend(),
+    'inverted': InvertedIndexBackend(),
+}
+_fts_available = {}
+
+
+def fts_available():
+    """Есть ли в текущей базе таблица FTS5, созданная миграцией."""
+    name = connection.settings_dict['NAME']
+    if name not in _fts_available:
+        _fts_available[name] = (
+            connection.vendor == 'sqlite'
+            and FTS_TABLE in connection.introspection.table_names()
+        )
+    return _fts_available[name]
+
+
+def get_backend():
+    """Бэкенд из настройки NEWS_SEARCH_BACKEND: fts5, inverted или auto."""
+    name = settings.NEWS_SEARCH_BACKEND
+    if name == 'auto':
+        name = 'fts5' if fts_available() else 'inverted'
+    return BACKENDS[name]
+
+
+def index(instance):
+    """Отмеченные rescan_comments комментарии в индекс не попадают."""
+    backend = get_backend()
+    document = make_document(instance)
+    backend.remove(document.kind, document.pk)
+    if not getattr(instance, 'flagged', False):
+        backend.add([document])
+
+
+def unindex(instance):
+    document = make_document(instance)
+    get_backend().remove(document.kind, document.pk)
+
+
+def search(query, limit=None):
+    """Найденные новости и комментарии, лучшие совпадения первыми."""
+    return get_backend().search(
+        query, limit or settings.SEARCH_RESULTS_LIMIT
+    )
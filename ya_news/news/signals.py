@@ -0,0 +1,102 @@
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.utils import timezone
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import feed, search
+from .cache import invalidate_news
+from .models import Comment, News, make_preview
+
+
+@receiver(pre_save, sender=News)
+@receiver(pre_save, sender=Comment)
+def fill_raw_timestamps(sender, instance, raw, **kwargs):
+    """
+    Время записи для loaddata.
+
+    При raw-сохранении auto_now и auto_now_add не срабатывают,
+    а в фикстурах этих полей обычно нет.
+    """
+    if not raw:
+        return
+    now = timezone.now()
+    if instance.updated_at is None:
+        instance.updated_at = now
+    if sender is Comment and instance.created is None:
+        instance.created = now
+
+
+@receiver(pre_save, sender=News)
+def fill_preview(sender, instance, update_fields, **kwargs):
+    """
+    Превью из загруженного и сохраняемого текста.
+
+    Сигнал приходит и при raw-сохранении, поэтому у новостей
+    из фикстур превью тоже есть.
+    """
+    if 'text' not in instance.get_deferred_fields() and (
+            update_fields is None or 'text' in update_fields
+    ):
+        instance.preview = make_preview(instance.text)
+
+
+@receiver(post_save, sender=Comment)
+def increase_comment_count(sender, instance, created, raw, **kwargs):
+    """
+    Новый комментарий увеличивает счётчик у его новости.
+
+    Любое сохранение комментария сдвигает updated_at новости:
+    по нему считаются ETag и Last-Modified её страницы.
+    """
+    if raw:
+        return
+    changes = {'updated_at': instance.updated_at}
+    if created:
+        changes['comment_count'] = F('comment_count') + 1
+    News.objects.filter(pk=instance.news_id).update(**changes)
+    if created:
+        feed.sync_counts([instance.news_id])
+
+
+@receiver(post_delete, sender=Comment)
+def decrease_comment_count(sender, instance, **kwargs):
+    """Удалённый комментарий уменьшает счётчик у его новости."""
+    News.objects.filter(pk=instance.news_id).update(
+        comment_count=Greatest(F('comment_count') - 1, 0),
+        updated_at=timezone.now(),
+    )
+    feed.sync_counts([instance.news_id])
+
+
+@receiver(post_save, sender=News)
+def refresh_feed(sender, instance, created, **kwargs):
+    """
+    Строки новости в лентах главной; при удалении их убирает каскад.
+
+    При loaddata (raw) строки тоже пишутся: превью и updated_at
+    заполнены в pre_save, а comment_count берётся из фикстуры.
+    """
+    feed.refresh_news(instance, created)
+
+
+@receiver((post_save, post_delete), sender=News)
+def invalidate_news_cache(sender, instance, **kwargs):
+    invalidate_news(instance.pk)
+
+
+@receiver((post_save, post_delete), sender=Comment)
+def invalidate_comment_cache(sender, instance, **kwargs):
+    invalidate_news(instance.news_id)
+
+
+@receiver(post_save, sender=News)
+@receiver(post_save, sender=Comment)
+def update_search_index(sender, instance, **kwargs):
+    search.index(instance)
+
+
+@receiver(post_delete, sender=News)
+@receiver(post_delete, sender=Comment)
+def remove_from_search_index(sender, instance, **kwargs):
+    search.unindex(instance)
@@ -0,0 +1,60 @@
+"""
+Ограничение частоты комментариев: ведро токенов в кеше.
+
+У каждого пользователя и у каждой новости своё ведро из настроек
+COMMENT_RATE_PER_USER и COMMENT_RATE_PER_NEWS: (ёмкость, токенов
+в секунду). Комментарий принимается, только если токен есть в обоих
+вёдрах, и тогда забирается из обоих. Ведро хранится в кеше проекта,
+поэтому с memcached ограничение общее для всех процессов; чтение
+и запись ведра не атомарны, и при гонке может пройти лишний
+комментарий — для защиты базы от шквала этого достаточно.
+"""
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .cache import make_key
+
+
+def _refill(state, capacity, rate, now):
+    """Токенов в ведре к моменту now."""
+    if state is None:
+        return capacity
+    tokens, stamp = state
+    return min(capacity, tokens + (now - stamp) * rate)
+
+
+def take_comment_token(user_id, news_id):
+    """
+    Забирает токен на комментарий.
+
+    Возвращает 0, если комментарий можно принять, иначе — через
+    сколько секунд появится токен.
+    """
+    buckets = {
+        make_key('rate', 'user', user_id): settings.COMMENT_RATE_PER_USER,
+        make_key('rate', 'news', news_id): settings.COMMENT_RATE_PER_NEWS,
+    }
+    buckets = {key: rate for key, rate in buckets.items() if rate}
+    if not buckets:
+        return 0
+    now = time.time()
+    states = cache.get_many(buckets)
+    tokens = {
+        key: _refill(states.get(key), capacity, rate, now)
+        for key, (capacity, rate) in buckets.items()
+    }
+    waits = [
+        (1 - tokens[key]) / rate
+        for key, (_, rate) in buckets.items() if tokens[key] < 1
+    ]
+    if waits:
+        return max(1, math.ceil(max(waits)))
+    # Полное ведро хранить незачем: ключ живёт, пока ведро наполняется.
+    cache.set_many(
+        {key: (tokens[key] - 1, now) for key in buckets},
+        math.ceil(max(capacity / rate for capacity, rate in buckets.values())),
+    )
+    return 0
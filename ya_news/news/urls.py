@@ -1,16 +1,41 @@
+from django.conf import settings
 from django.urls import path
 
-from news import views
+from news import async_views, views
+from news.models import FeedEntry
 
 app_name = 'news'
 
-urlpatterns = [
-    path('', views.NewsList.as_view(), name='home'),
-    path('news/<int:pk>/', views.NewsDetailView.as_view(), name='detail'),
-    path(
-        'delete_comment/<int:pk>/',
-        views.CommentDelete.as_view(),
-        name='delete'
-    ),
-    path('edit_comment/<int:pk>/', views.CommentUpdate.as_view(), name='edit'),
-]
+
+def news_patterns(use_async):
+    """Адреса приложения; use_async — асинхронные лента и новость."""
+    if use_async:
+        news_list = async_views.news_list
+        news_detail = async_views.news_detail
+    else:
+        news_list = views.NewsList.as_view()
+        news_detail = views.NewsDetailView.as_view()
+    return [
+        path('', news_list, name='home'),
+        path(
+            'discussed/',
+            news_list,
+            {'feed': FeedEntry.DISCUSSED},
+            name='discussed'
+        ),
+        path('news/<int:pk>/', news_detail, name='detail'),
+        path(
+            'delete_comment/<int:pk>/',
+            views.CommentDelete.as_view(),
+            name='delete'
+        ),
+        path(
+            'edit_comment/<int:pk>/',
+            views.CommentUpdate.as_view(),
+            name='edit'
+        ),
+        path('search/', views.NewsSearch.as_view(), name='search'),
+    ]
+
+
+urlpatterns = news_patterns(settings.NEWS_ASYNC_VIEWS)
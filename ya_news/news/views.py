@@ -1,49 +1,229 @@
+from http import HTTPStatus
+
 from django.conf import settings
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.shortcuts import get_object_or_404
+from django.core.cache import cache
+from django.http import HttpResponse, StreamingHttpResponse
+from django.template import engines
+from django.template.loader import render_to_string
 from django.urls import reverse
+from django.utils.decorators import method_decorator
+from django.utils.safestring import mark_safe
 from django.views import generic
 
+from .authors import AuthorMap, get_authors, with_authors
+from .cache import CachedPageMixin, make_key, news_version
+from .conditional import (
+    feed_condition, get_news_or_404, news_condition, remember_feed_page
+)
 from .forms import CommentForm
-from .models import Comment, News
+from .models import Comment, FeedEntry, News
+from .feed import FEED_ORDERINGS, feed_entries
+from .pagination import (
+    KeysetPaginationMixin, KeysetPaginator, get_page_or_404
+)
+from . import writer
+from .search import search
+from .throttling import take_comment_token
 
 
-class NewsList(generic.ListView):
-    """Список новостей."""
-    model = News
+@method_decorator(feed_condition, name='dispatch')
+class NewsList(CachedPageMixin, KeysetPaginationMixin, generic.ListView):
+    """Список новостей из материализованной ленты (см. news.feed)."""
     template_name = 'news/home.html'
+    template_engine = 'lean'
+
+    @property
+    def feed(self):
+        return self.kwargs.get('feed', FeedEntry.LATEST)
+
+    @property
+    def keyset_ordering(self):
+        return FEED_ORDERINGS[self.feed]
 
     def get_queryset(self):
+        return feed_entries(self.feed)
+
+    def get_paginate_by(self, queryset):
         """
-        Выводим только несколько последних новостей.
+        Выводим новости страницами по несколько штук.
 
-        Их количество определяется в настройках проекта.
+        Их количество определяется в настройках проекта,
+        заголовок, начало текста и число комментариев
+        берутся из строки ленты.
         """
-        return self.model.objects.prefetch_related(
-            'comment_set'
-        )[:settings.NEWS_COUNT_ON_HOME_PAGE]
+        return settings.NEWS_COUNT_ON_HOME_PAGE
+
+    def paginate_queryset(self, queryset, page_size):
+        result = super().paginate_queryset(queryset, page_size)
+        remember_feed_page(self.request, result[1])
+        return result
+
+
+class NewsSearch(generic.TemplateView):
+    """Поиск по новостям и комментариям."""
+    template_name = 'news/search.html'
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        query = self.request.GET.get('q', '').strip()
+        hits = search(query) if query else []
+        news = News.objects.only('title').in_bulk(
+            {hit.news_id for hit in hits}
+        )
+        context['query'] = query
+        context['results'] = [
+            (hit, news[hit.news_id]) for hit in hits if hit.news_id in news
+        ]
+        return context
+
+
+def get_viewer_id(news_id, user):
+    """
+    Ключ пользователя, если он писал в этой новости, иначе None.
+
+    Ссылки на редактирование нужны только таким пользователям,
+    для остальных блок комментариев общий.
+    """
+    if user.is_authenticated and Comment.objects.filter(
+            news_id=news_id, author=user
+    ).exists():
+        return user.pk
+    return None
+
+
+def render_comments(news_id, version, cursor, viewer_id, authors=None):
+    """
+    Блок комментариев страницы cursor, кешируется целиком.
+
+    Авторы берутся из карты authors (по умолчанию — своей на вызов).
+    """
+    key = make_key('comments', news_id, version, cursor, viewer_id)
+    html = cache.get(key)
+    if html is None:
+        paginator = KeysetPaginator(
+            with_authors(Comment.objects.visible().filter(news_id=news_id)),
+            ('created', 'id'),
+            settings.COMMENTS_COUNT_ON_DETAIL_PAGE,
+        )
+        page = get_page_or_404(paginator, cursor)
+        page.object_list = list(
+            (authors or AuthorMap()).share(page.object_list)
+        )
+        html = render_to_string('news/includes/comments.html', {
+            'comments_page': page,
+            'viewer_id': viewer_id,
+        })
+        cache.set(key, html, settings.NEWS_CACHE_TIMEOUT)
+    return html
+
+
+class NewsCommentsMixin:
+    """Добавляет в контекст блок комментариев к новости."""
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['news_version'] = news_version(self.object.pk)
+        context['news_cache_timeout'] = settings.NEWS_CACHE_TIMEOUT
+        context['comments_html'] = render_comments(
+            self.object.pk, context['news_version'],
+            self.request.GET.get('cursor', ''),
+            get_viewer_id(self.object.pk, self.request.user),
+            get_authors(self.request),
+        )
+        return context
 
 
-class NewsDetail(generic.DetailView):
+@method_decorator(news_condition, name='dispatch')
+class NewsDetail(CachedPageMixin, NewsCommentsMixin, generic.DetailView):
     model = News
     template_name = 'news/detail.html'
+    template_engine = 'lean'
+
+    def get_cache_versions(self):
+        return (news_version(self.kwargs['pk']),)
 
     def get_object(self, queryset=None):
-        obj = get_object_or_404(
-            self.model.objects.prefetch_related('comment_set__author'),
-            pk=self.kwargs['pk']
-        )
-        return obj
+        return get_news_or_404(self.request, self.kwargs['pk'])
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        if self.request.user.is_authenticated:
+            context['form'] = CommentForm()
+        return context
+
+
+@method_decorator(news_condition, name='dispatch')
+class NewsDetailStream(generic.DetailView):
+    """
+    NewsDetail для длинных обсуждений: страница уходит по частям.
+
+    Сразу отправляется начало страницы с новостью, затем все
+    комментарии пачками по COMMENTS_STREAM_CHUNK из курсора базы,
+    затем конец страницы с формой. В памяти держится одна пачка,
+    сколько бы комментариев ни было у новости.
+    """
+    model = News
+    template_name = 'news/detail.html'
+    template_engine = 'lean'
+    comments_marker = '<!-- comments -->'
+
+    def get_object(self, queryset=None):
+        return get_news_or_404(self.request, self.kwargs['pk'])
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
+        context['news_version'] = news_version(self.object.pk)
+        context['news_cache_timeout'] = settings.NEWS_CACHE_TIMEOUT
+        context['comments_html'] = mark_safe(self.comments_marker)
         if self.request.user.is_authenticated:
             context['form'] = CommentForm()
         return context
 
+    def render_to_response(self, context, **response_kwargs):
+        page = super().render_to_response(context, **response_kwargs)
+        head, tail = page.render().content.decode().split(
+            self.comments_marker, 1
+        )
+        return StreamingHttpResponse(
+            self.stream(
+                head, tail, get_viewer_id(self.object.pk, self.request.user)
+            ),
+            content_type=page['Content-Type'],
+        )
+
+    def stream(self, head, tail, viewer_id):
+        yield head
+        engine = engines[self.template_engine]
+        comment_list = engine.get_template('news/includes/comment_list.html')
+        comments = get_authors(self.request).share(with_authors(
+            Comment.objects.visible().filter(news_id=self.object.pk)
+        ).order_by('created', 'id').iterator(
+            chunk_size=settings.COMMENTS_STREAM_CHUNK
+        ))
+        chunk = []
+        empty = True
+        for comment in comments:
+            chunk.append(comment)
+            if len(chunk) == settings.COMMENTS_STREAM_CHUNK:
+                yield comment_list.render(
+                    {'comments': chunk, 'viewer_id': viewer_id}
+                )
+                chunk, empty = [], False
+        if chunk:
+            yield comment_list.render(
+                {'comments': chunk, 'viewer_id': viewer_id}
+            )
+        elif empty:
+            yield engine.get_template(
+                'news/includes/no_comments.html'
+            ).render()
+        yield tail
+
 
 class NewsComment(
         LoginRequiredMixin,
+        NewsCommentsMixin,
         generic.detail.SingleObjectMixin,
         generic.FormView
 ):
@@ -52,25 +232,53 @@ class NewsComment(
     template_name = 'news/detail.html'
 
     def post(self, request, *args, **kwargs):
+        # Сначала новость: запрос к несуществующей не тратит токен
+        # и не заводит ведро в кеше.
         self.object = self.get_object()
+        retry_after = take_comment_token(request.user.pk, self.object.pk)
+        if retry_after:
+            response = HttpResponse(
+                'Слишком много комментариев, попробуйте позже.',
+                status=HTTPStatus.TOO_MANY_REQUESTS,
+            )
+            response['Retry-After'] = retry_after
+            return response
         return super().post(request, *args, **kwargs)
 
     def form_valid(self, form):
+        """С COMMENT_WRITE_BEHIND комментарий пишется через очередь."""
         comment = form.save(commit=False)
         comment.news = self.object
         comment.author = self.request.user
-        comment.save()
+        if settings.COMMENT_WRITE_BEHIND:
+            ticket = writer.comment_queue.put(comment)
+            if settings.COMMENT_QUEUE_DURABILITY == 'commit':
+                try:
+                    writer.comment_queue.wait(ticket)
+                except writer.QueueTimeout:
+                    response = HttpResponse(
+                        'Комментарий не записан, попробуйте ещё раз.',
+                        status=HTTPStatus.SERVICE_UNAVAILABLE,
+                    )
+                    response['Retry-After'] = 1
+                    return response
+        else:
+            comment.save()
         return super().form_valid(form)
 
     def get_success_url(self):
-        post = self.get_object()
-        return reverse('news:detail', kwargs={'pk': post.pk}) + '#comments'
+        return reverse(
+            'news:detail', kwargs={'pk': self.object.pk}
+        ) + '#comments'
 
 
 class NewsDetailView(generic.View):
 
     def get(self, request, *args, **kwargs):
-        view = NewsDetail.as_view()
+        if settings.NEWS_STREAMING_DETAIL:
+            view = NewsDetailStream.as_view()
+        else:
+            view = NewsDetail.as_view()
         return view(request, *args, **kwargs)
 
     def post(self, request, *args, **kwargs):
@@ -83,14 +291,21 @@ class CommentBase(LoginRequiredMixin):
     model = Comment
 
     def get_success_url(self):
-        comment = self.get_object()
+        """Адрес из уже прочитанного комментария, без новых запросов."""
         return reverse(
-            'news:detail', kwargs={'pk': comment.news.pk}
+            'news:detail', kwargs={'pk': self.object.news_id}
         ) + '#comments'
 
     def get_queryset(self):
-        """Пользователь может работать только со своими комментариями."""
-        return self.model.objects.filter(author=self.request.user)
+        """
+        Пользователь может работать только со своими комментариями.
+
+        Новость читается тем же запросом: её заголовок есть на страницах
+        правки и удаления.
+        """
+        return self.model.objects.filter(
+            author=self.request.user
+        ).select_related('news')
 
 
 class CommentUpdate(CommentBase, generic.UpdateView):
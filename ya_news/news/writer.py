@@ -0,0 +1,245 @@
+"""
+Запись комментариев пачками и очередь отложенной записи.
+
+SQLite пишет одним писателем: когда на популярную новость идёт шквал
+комментариев, каждый POST со своей транзакцией ждёт блокировку
+и свой fsync. С COMMENT_WRITE_BEHIND комментарии NewsComment
+складываются в очередь процесса, а отдельный поток пишет накопленное
+одной транзакцией: bulk_create и то, что для одиночного комментария
+делают сигналы, — счётчики и updated_at новостей и лент, поиск и кеш.
+
+Гарантии задаются настройками:
+
+- COMMENT_QUEUE_DURABILITY: 'commit' — ответ после фиксации пачки
+  с комментарием (групповая фиксация: после редиректа комментарий
+  уже на странице); 'memory' — ответ сразу, комментарий появится
+  после записи пачки, а при падении процесса до неё пропадёт.
+  При обычной остановке очередь дописывается (atexit). Ответ 'commit'
+  ждёт не дольше COMMENT_QUEUE_TIMEOUT: не взятый в запись комментарий
+  снимается с очереди, и клиент получает 503.
+- COMMENT_QUEUE_ORDERING: 'written' — created равно времени записи
+  пачки, порядок обсуждения совпадает с порядком появления в базе
+  и курсоры страниц не пропускают комментарии; 'accepted' — created
+  равно времени приёма POST (один UPDATE на пачку), но комментарий,
+  записанный позже соседнего процесса, может оказаться до курсора
+  читателя, уже пролиставшего это место.
+
+Очередь у каждого процесса своя, порядок соблюдается в её пределах.
+"""
+import atexit
+import logging
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.db import close_old_connections, connections, router, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import feed, search
+from .cache import invalidate_news
+from .models import Comment, News
+
+logger = logging.getLogger(__name__)
+
+
+def _assign_pks(comments, using):
+    """
+    Первичные ключи после bulk_create, если база их не вернула.
+
+    В SQLite Django 3.2 не получает id вставленных строк. Транзакция
+    уже держит блокировку записи, id растут (AUTOINCREMENT), поэтому
+    последние len(comments) id — наши и в порядке вставки.
+    """
+    if connections[using].features.can_return_rows_from_bulk_insert:
+        return
+    pks = Comment.objects.using(using).order_by('-pk').values_list(
+        'pk', flat=True
+    )[:len(comments)]
+    for comment, pk in zip(comments, reversed(pks)):
+        comment.pk = pk
+
+
+def save_comments(comments, accepted=None):
+    """
+    Записывает новые комментарии одной транзакцией.
+
+    accepted — время приёма каждого комментария для created;
+    без него created и updated_at ставит bulk_create.
+    """
+    using = router.db_for_write(Comment)
+    with transaction.atomic(using=using):
+        Comment.objects.using(using).bulk_create(comments)
+        _assign_pks(comments, using)
+        if accepted:
+            for comment, created in zip(comments, accepted):
+                comment.created = created
+            Comment.objects.using(using).bulk_update(comments, ('created',))
+        now = comments[-1].updated_at
+        counts = Counter(comment.news_id for comment in comments)
+        for news_id, count in counts.items():
+            News.objects.using(using).filter(pk=news_id).update(
+                comment_count=F('comment_count') + count, updated_at=now
+            )
+        feed.sync_counts(list(counts))
+        search.get_backend().add(
+            search.make_document(comment) for comment in comments
+        )
+    _invalidate(counts)
+
+
+def _invalidate(news_ids):
+    """
+    Сбрасывает кеш новостей после фиксации пачки.
+
+    Ошибка кеша только пишется в лог: комментарии уже в базе,
+    и повтор записи их бы задвоил. Страницы обновятся по таймауту.
+    """
+    for news_id in news_ids:
+        try:
+            invalidate_news(news_id)
+        except Exception:
+            logger.exception('Кеш новости %s не сброшен.', news_id)
+
+
+class QueueTimeout(Exception):
+    """Комментарий не записан за COMMENT_QUEUE_TIMEOUT секунд."""
+
+
+class Ticket:
+    """Комментарий в очереди; по нему ответ ждёт записи пачки."""
+
+    def __init__(self, comment):
+        self.comment = comment
+        self.accepted = timezone.now()
+        self.queued = time.monotonic()
+        self.error = None
+        self._written = threading.Event()
+
+    def done(self, error=None):
+        self.error = error
+        self._written.set()
+
+    def wait(self, timeout=None):
+        if not self._written.wait(timeout):
+            raise QueueTimeout
+        if self.error is not None:
+            raise self.error
+
+
+class CommentQueue:
+    """
+    Очередь комментариев процесса.
+
+    Поток записи берёт до COMMENT_QUEUE_BATCH комментариев, когда
+    их набралось столько или самый старый ждёт COMMENT_QUEUE_INTERVAL
+    секунд. Без фонового потока (background=False) очередь пишется
+    только flush(): так её проверяют тесты.
+    """
+
+    def __init__(self, background=True):
+        self.background = background
+        self.pending = []
+        self._condition = threading.Condition()
+        self._writing = threading.Lock()
+        self._thread = None
+
+    def put(self, comment):
+        ticket = Ticket(comment)
+        with self._condition:
+            self.pending.append(ticket)
+            if self.background and not (
+                    self._thread and self._thread.is_alive()
+            ):
+                # Первый комментарий или поток записи упал: новый поток.
+                self._thread = threading.Thread(
+                    target=self._run, name='comment-writer', daemon=True
+                )
+                self._thread.start()
+            self._condition.notify()
+        return ticket
+
+    def wait(self, ticket):
+        """
+        Ждёт записи пачки с комментарием; ошибку записи поднимает.
+
+        Если за COMMENT_QUEUE_TIMEOUT комментарий не взят в запись,
+        он убирается из очереди и поднимается QueueTimeout: такой
+        комментарий не появится, и его можно отправить снова.
+        Уже взятый в запись ждёт ещё столько же.
+        """
+        if not self.background:
+            self.flush()
+        timeout = settings.COMMENT_QUEUE_TIMEOUT
+        try:
+            ticket.wait(timeout)
+        except QueueTimeout:
+            with self._condition:
+                if ticket in self.pending:
+                    self.pending.remove(ticket)
+                    raise
+            ticket.wait(timeout)
+
+    def flush(self):
+        """Записывает всё, что есть в очереди, в текущем потоке."""
+        while self.write(settings.COMMENT_QUEUE_BATCH):
+            pass
+
+    def write(self, size):
+        """Записывает до size старейших комментариев; их число."""
+        with self._writing:
+            with self._condition:
+                batch = self.pending[:size]
+                del self.pending[:size]
+            if batch:
+                self._write(batch)
+        return len(batch)
+
+    def _write(self, batch):
+        accepted = None
+        if settings.COMMENT_QUEUE_ORDERING == 'accepted':
+            accepted = [ticket.accepted for ticket in batch]
+        try:
+            save_comments([ticket.comment for ticket in batch], accepted)
+        except Exception as error:
+            for ticket in batch:
+                ticket.comment.pk = None
+            if len(batch) > 1:
+                # Один плохой комментарий (скажем, к удалённой новости)
+                # не должен терять остальные: пишем их по одному.
+                for ticket in batch:
+                    self._write([ticket])
+                return
+            logger.exception('Комментарий не записан.')
+            batch[0].done(error)
+        else:
+            for ticket in batch:
+                ticket.done()
+
+    def _next_batch_size(self):
+        """Ждёт, пока пачка наберётся или состарится; её размер."""
+        with self._condition:
+            while True:
+                while not self.pending:
+                    self._condition.wait()
+                size = settings.COMMENT_QUEUE_BATCH
+                left = (
+                    self.pending[0].queued + settings.COMMENT_QUEUE_INTERVAL
+                    - time.monotonic()
+                )
+                if len(self.pending) >= size or left <= 0:
+                    return size
+                self._condition.wait(left)
+
+    def _run(self):
+        while True:
+            size = self._next_batch_size()
+            try:
+                self.write(size)
+            finally:
+                close_old_connections()
+
+
+comment_queue = CommentQueue()
+atexit.register(comment_queue.flush)
@@ -0,0 +1,96 @@
+"""
+Бюджеты SQL-запросов для тестов.
+
+Бюджет задаётся по имени URL в таблице budgets тестового пакета.
+При превышении тест падает со списком запросов, сгруппированных
+по месту в коде проекта, откуда они были выполнены. Время ответа
+здесь не проверяется: на общем CI оно скачет, и его меряет
+нагрузочный прогон (benchmarks/load.py --max-p95).
+"""
+import traceback
+from collections import OrderedDict, namedtuple
+from contextlib import ExitStack
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections
+
+Budget = namedtuple('Budget', ('queries',))
+UNKNOWN_SITE = '<django>'
+
+
+class QueryRecorder:
+    """Обёртка выполнения SQL, запоминающая запросы и место вызова."""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        self.queries.append((self.call_site(), sql))
+        return execute(sql, params, many, context)
+
+    def call_site(self):
+        """Ближайшая к запросу строка кода проекта, не из site-packages."""
+        base = str(settings.BASE_DIR)
+        for frame in reversed(traceback.extract_stack()[:-2]):
+            if (
+                frame.filename.startswith(base)
+                and 'site-packages' not in frame.filename
+            ):
+                path = Path(frame.filename).relative_to(base)
+                return f'{path}:{frame.lineno} in {frame.name}'
+        return UNKNOWN_SITE
+
+    def report(self):
+        sites = OrderedDict()
+        for site, sql in self.queries:
+            sites.setdefault(site, []).append(sql)
+        lines = []
+        for site, queries in sites.items():
+            lines.append(f'{site} — запросов: {len(queries)}')
+            lines.extend(f'    {sql}' for sql in queries)
+        return '\n'.join(lines)
+
+
+class QueryBudget:
+    """
+    Контекстный менеджер, проверяющий бюджет по имени URL.
+
+    with QueryBudget(url_name, BUDGETS):
+        client.get(url)
+    """
+
+    def __init__(self, name, budgets):
+        if name not in budgets:
+            raise KeyError(f'Для {name} нет бюджета в таблице.')
+        self.name = name
+        self.budget = budgets[name]
+        self.recorder = QueryRecorder()
+
+    def __enter__(self):
+        self._stack = ExitStack()
+        for connection in connections.all():
+            self._stack.enter_context(
+                connection.execute_wrapper(self.recorder)
+            )
+        return self.recorder
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self._stack.close()
+        if exc_type is not None:
+            return
+        if len(self.recorder.queries) > self.budget.queries:
+            raise AssertionError(
+                f'{self.name}: {len(self.recorder.queries)} SQL-запросов '
+                f'при бюджете {self.budget.queries}.\n'
+                + self.recorder.report()
+            )
+
+
+class QueryBudgetMixin:
+    """Примесь к TestCase: self.assert_query_budget('notes:list')."""
+
+    query_budgets = {}
+
+    def assert_query_budget(self, name):
+        return QueryBudget(name, self.query_budgets)
@@ -0,0 +1,154 @@
+"""
+Реплики базы для чтения: свежесть, копирование и липкость к primary.
+
+Реплика — копия файла SQLite, которую обновляет команда
+sync_replicas. Реплика считается отставшей, если её файл не
+обновлялся дольше REPLICA_MAX_LAG секунд, и тогда чтение уходит
+на primary. После записи пользователь REPLICA_STICKY_SECONDS секунд
+читает с primary, чтобы сразу увидеть свой комментарий.
+
+С реплик читает только код запроса (его состояние ставит
+ReplicaStickinessMiddleware): команды и фоновые потоки всегда читают
+primary. Запрос, который заполняет кеш под только что поднятой
+версией данных, переключается на primary через read_from_primary():
+иначе отставшая реплика попала бы в кеш на NEWS_CACHE_TIMEOUT.
+"""
+import contextlib
+import contextvars
+import os
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+STICKY_COOKIE = 'primary_until'
+HEALTH_TTL = 1.0
+IGNORED_WRITES = ('sessions',)
+
+_health = {}
+_request_state = contextvars.ContextVar('replica_request_state', default=None)
+
+
+class RequestState:
+    __slots__ = ('sticky', 'wrote')
+
+    def __init__(self, sticky):
+        self.sticky = sticky
+        self.wrote = False
+
+
+def current_state():
+    return _request_state.get()
+
+
+@contextlib.contextmanager
+def request_state(sticky=False):
+    """Состояние запроса: пока оно действует, чтение можно вести с реплик."""
+    state = RequestState(sticky)
+    token = _request_state.set(state)
+    try:
+        yield state
+    finally:
+        _request_state.reset(token)
+
+
+def read_from_primary():
+    """Остаток текущего запроса читает с primary."""
+    state = current_state()
+    if state is not None:
+        state.sticky = True
+
+
+def replica_path(alias):
+    return str(connections.databases[alias]['NAME'])
+
+
+def is_fresh(alias):
+    """Есть ли файл реплики и не отстал ли он; ответ кешируется на секунду."""
+    now = time.monotonic()
+    checked = _health.get(alias)
+    if checked and now - checked[0] < HEALTH_TTL:
+        return checked[1]
+    try:
+        age = time.time() - os.stat(replica_path(alias)).st_mtime
+    except FileNotFoundError:
+        fresh = False
+    else:
+        fresh = age <= settings.REPLICA_MAX_LAG
+    _health[alias] = (now, fresh)
+    return fresh
+
+
+def reset_health():
+    _health.clear()
+
+
+def file_signature(path):
+    """Размер и время изменения файла базы вместе с журналом WAL."""
+    signature = []
+    for name in (path, f'{path}-wal'):
+        try:
+            stat = os.stat(name)
+        except FileNotFoundError:
+            signature.append(None)
+        else:
+            signature.append((stat.st_mtime_ns, stat.st_size))
+    return tuple(signature)
+
+
+def copy_database(source, target, signature=None):
+    """
+    Копирует базу source в target через backup API SQLite.
+
+    Копия пишется во временный файл и подменяет target атомарно,
+    так что читатели видят либо старую, либо новую копию целиком.
+    Если signature совпадает с текущей подписью source, файл
+    только помечается свежим. Возвращает подпись скопированной базы.
+    """
+    current = file_signature(source)
+    if signature == current and os.path.exists(target):
+        os.utime(target)
+        return current
+    temporary = f'{target}.{os.getpid()}.tmp'
+    primary = sqlite3.connect(source)
+    replica = sqlite3.connect(temporary)
+    try:
+        primary.backup(replica)
+        replica.execute('PRAGMA journal_mode = DELETE')
+    finally:
+        replica.close()
+        primary.close()
+    os.replace(temporary, target)
+    return current
+
+
+class ReplicaStickinessMiddleware:
+    """
+    Ставит cookie primary_until после запроса, который что-то записал.
+
+    Пока cookie действует, ReplicaRouter не отправляет чтение
+    на реплики этого пользователя.
+    """
+
+    def __init__(self, get_response):
+        if not settings.DATABASE_REPLICAS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        try:
+            until = float(request.COOKIES.get(STICKY_COOKIE, 0))
+        except ValueError:
+            until = 0
+        with request_state(sticky=time.time() < until) as state:
+            response = self.get_response(request)
+        if state.wrote:
+            response.set_cookie(
+                STICKY_COOKIE,
+                str(time.time() + settings.REPLICA_STICKY_SECONDS),
+                max_age=settings.REPLICA_STICKY_SECONDS,
+                httponly=True, samesite='Lax',
+            )
+        return response
@@ -0,0 +1,71 @@
+import random
+
+from django.conf import settings
+from django.db import connections
+
+from yanews import replicas
+
+READ_ONLY_ALIAS = 'readonly'
+
+
+class ReadOnlyRouter:
+    """
+    Чтение через соединение только для чтения, если оно настроено.
+
+    Внутри транзакции на default чтение остаётся на default:
+    иначе запрос не увидел бы ещё не зафиксированных записей.
+    """
+
+    def db_for_read(self, model, **hints):
+        if (
+            READ_ONLY_ALIAS in connections.databases
+            and not connections['default'].in_atomic_block
+        ):
+            return READ_ONLY_ALIAS
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
+
+
+class ReplicaRouter:
+    """
+    Чтение со случайной свежей реплики из DATABASE_REPLICAS.
+
+    Возвращает None, когда читать нужно с primary: вне запроса,
+    внутри транзакции, после недавней записи пользователя или свежего
+    сброса кеша, или если все реплики отстали. Тогда решение принимает
+    следующий роутер.
+    """
+
+    def db_for_read(self, model, **hints):
+        state = replicas.current_state()
+        if (
+            not settings.DATABASE_REPLICAS
+            or state is None
+            or state.sticky
+            or connections['default'].in_atomic_block
+        ):
+            return None
+        fresh = [
+            alias for alias in settings.DATABASE_REPLICAS
+            if replicas.is_fresh(alias)
+        ]
+        return random.choice(fresh) if fresh else None
+
+    def db_for_write(self, model, **hints):
+        state = replicas.current_state()
+        if state and model._meta.app_label not in replicas.IGNORED_WRITES:
+            state.wrote = True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
@@ -1,3 +1,5 @@
+import os
+import tempfile
 from pathlib import Path
 
 from django.urls import reverse_lazy
@@ -21,6 +23,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'yanews.metrics.MetricsMiddleware',
+    'yanews.replicas.ReplicaStickinessMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -32,12 +36,27 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = 'yanews.urls'
 
+# Шаблоны компилируются один раз и хранятся в памяти процесса.
+# При DEBUG кеш включается переменной TEMPLATE_CACHE=1; runserver
+# всё равно сбрасывает его при изменении файлов шаблонов.
+TEMPLATE_CACHE = not DEBUG or os.getenv('TEMPLATE_CACHE') == '1'
+TEMPLATE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+if TEMPLATE_CACHE:
+    TEMPLATE_LOADERS = [
+        ('django.template.loaders.cached.Loader', TEMPLATE_LOADERS),
+    ]
+TEMPLATE_LIBRARIES = {'fragments': 'yanews.templating'}
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
-        'APP_DIRS': True,
         'OPTIONS': {
+            'loaders': TEMPLATE_LOADERS,
+            'libraries': TEMPLATE_LIBRARIES,
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
@@ -46,16 +65,127 @@ TEMPLATES = [
             ],
         },
     },
+    # Движок для горячих страниц: только user, без request,
+    # messages и debug, которые этим шаблонам не нужны.
+    {
+        'NAME': 'lean',
+        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'DIRS': [BASE_DIR / 'templates'],
+        'OPTIONS': {
+            'loaders': TEMPLATE_LOADERS,
+            'libraries': TEMPLATE_LIBRARIES,
+            'context_processors': [
+                'django.contrib.auth.context_processors.auth',
+            ],
+        },
+    },
 ]
+# Что компилируется при старте процесса (templating.warm_templates).
+WARM_TEMPLATES = [
+    'base.html',
+    'includes/header.html',
+    'includes/errors.html',
+    'includes/paginator.html',
+    'news/home.html',
+    'news/detail.html',
+    'news/includes/comments.html',
+    'news/includes/comment_list.html',
+    'news/includes/no_comments.html',
+]
+# Фрагменты, которые у анонимных пользователей одинаковы: они
+# рендерятся один раз на процесс.
+PRERENDERED_FRAGMENTS = ['includes/header.html']
 
 WSGI_APPLICATION = 'yanews.wsgi.application'
 
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+DATABASE_FILE = os.getenv('DJANGO_DATABASE_FILE', str(BASE_DIR / 'db.sqlite3'))
+# Файл тестовой базы для parallel_tests.py, по умолчанию в памяти.
+TEST_DATABASE = {'NAME': os.getenv('DJANGO_TEST_DATABASE')}
+SQLITE_PRAGMAS = {
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,
+    'busy_timeout': 5000,
+}
+
+# Профиль базы выбирается переменной окружения DB_PROFILE. В production
+# база работает в режиме WAL, соединения живут между запросами
+# и проверяются, а чтение идёт через отдельное соединение только для
+# чтения (см. yanews.routers.ReadOnlyRouter).
+DATABASE_PROFILES = {
+    'development': {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': DATABASE_FILE,
+            'TEST': TEST_DATABASE,
+        },
+    },
+    'production': {
+        'default': {
+            'ENGINE': 'yanews.sqlite',
+            'NAME': DATABASE_FILE,
+            'CONN_MAX_AGE': 600,
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {'pragmas': {'journal_mode': 'WAL', **SQLITE_PRAGMAS}},
+            'TEST': TEST_DATABASE,
+        },
+        'readonly': {
+            'ENGINE': 'yanews.sqlite',
+            'NAME': f'file:{DATABASE_FILE}?mode=ro',
+            'CONN_MAX_AGE': 600,
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {'pragmas': {'query_only': 'ON', **SQLITE_PRAGMAS}},
+            'TEST': {'MIRROR': 'default'},
+        },
+    },
+}
+# Профиль replicas: primary как в production и копии для чтения,
+# которые обновляет команда sync_replicas.
+DATABASE_PROFILES['replicas'] = {
+    'default': DATABASE_PROFILES['production']['default'],
+    **{
+        f'replica{number}': {
+            'ENGINE': 'yanews.sqlite',
+            'NAME': DATABASE_FILE.replace(
+                '.sqlite3', f'.replica{number}.sqlite3'
+            ),
+            'OPTIONS': {'pragmas': {'query_only': 'ON', **SQLITE_PRAGMAS}},
+            'TEST': {'MIRROR': 'default'},
+        }
+        for number in (1, 2)
+    },
+}
+DATABASES = DATABASE_PROFILES[os.getenv('DB_PROFILE', 'development')]
+DATABASE_ROUTERS = [
+    'yanews.routers.ReplicaRouter',
+    'yanews.routers.ReadOnlyRouter',
+]
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias.startswith('replica')]
+# Реплика старше этого числа секунд считается отставшей.
+REPLICA_MAX_LAG = 5
+# Сколько секунд после записи пользователь читает с primary.
+REPLICA_STICKY_SECONDS = 10
+
+# Хранилище кеша страниц выбирается переменной окружения YANEWS_CACHE.
+# memcached служит общим для всех процессов хранилищем вместо Redis,
+# бэкенда для которого в Django 3.2 нет.
+CACHE_BACKENDS = {
+    'locmem': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': Path(tempfile.gettempdir()) / 'yanews_cache',
+    },
+    'memcached': {
+        'BACKEND': 'django.core.cache.backends.memcached.PyMemcacheCache',
+        'LOCATION': '127.0.0.1:11211',
+    },
+}
+
+CACHES = {
+    'default': CACHE_BACKENDS[os.getenv('YANEWS_CACHE', 'locmem')],
 }
 
 
@@ -80,3 +210,44 @@ LOGIN_URL = reverse_lazy('users:login')
 LOGIN_REDIRECT_URL = reverse_lazy('news:home')
 
 NEWS_COUNT_ON_HOME_PAGE = 10
+COMMENTS_COUNT_ON_DETAIL_PAGE = 50
+# Окно ленты «Обсуждаемое» в днях от сегодняшнего, см. news.feed.
+FEED_DISCUSSED_DAYS = 1
+NEWS_CACHE_TIMEOUT = 60 * 5
+# Асинхронные NewsList и NewsDetail для запуска под ASGI.
+NEWS_ASYNC_VIEWS = os.getenv('NEWS_ASYNC_VIEWS') == '1'
+# NewsDetail отдаёт все комментарии потоком, по COMMENTS_STREAM_CHUNK
+# за раз, вместо страниц. Асинхронный NewsDetail остаётся со страницами:
+# ASGI в Django 3.2 перебирает потоковый ответ в цикле событий, где
+# запросы к базе запрещены.
+NEWS_STREAMING_DETAIL = os.getenv('NEWS_STREAMING_DETAIL') == '1'
+COMMENTS_STREAM_CHUNK = 200
+# Частота комментариев, ведро токенов: (ёмкость, токенов в секунду).
+# None снимает ограничение. См. news.throttling.
+COMMENT_RATE_PER_USER = (5, 0.2)
+COMMENT_RATE_PER_NEWS = (200, 50)
+# Отложенная запись комментариев пачками, см. news.writer.
+COMMENT_WRITE_BEHIND = os.getenv('COMMENT_WRITE_BEHIND') == '1'
+COMMENT_QUEUE_BATCH = 200
+COMMENT_QUEUE_INTERVAL = 0.05
+# 'commit' — ответ после записи пачки, 'memory' — сразу.
+COMMENT_QUEUE_DURABILITY = os.getenv('COMMENT_QUEUE_DURABILITY', 'commit')
+# Сколько секунд ответ 'commit' ждёт записи, прежде чем вернуть 503.
+COMMENT_QUEUE_TIMEOUT = 5
+# created комментария: 'written' — время записи, 'accepted' — приёма.
+COMMENT_QUEUE_ORDERING = os.getenv('COMMENT_QUEUE_ORDERING', 'written')
+
+# Поиск: fts5 (SQLite), inverted (любая база) или auto.
+NEWS_SEARCH_BACKEND = 'auto'
+SEARCH_RESULTS_LIMIT = 20
+# Сколько документов ранжирует inverted по самому редкому слову запроса.
+# Не больше 999: список pk уходит параметрами в запрос SQLite.
+SEARCH_CANDIDATES = 500
+
+# Файл с дополнительными запрещёнными словами, по слову в строке.
+BAD_WORDS_FILE = os.getenv('BAD_WORDS_FILE')
+
+# Метрики запросов: METRICS_ENABLED=1 включает middleware и /metrics/.
+METRICS_ENABLED = os.getenv('METRICS_ENABLED') == '1'
+METRICS_ALLOWED_IPS = ('127.0.0.1', '::1')
+METRICS_PREFIX = 'yanews_http_request'
@@ -0,0 +1,44 @@
+"""
+Бэкенд SQLite для рабочего профиля базы.
+
+Отличия от django.db.backends.sqlite3:
+
+* OPTIONS['pragmas'] — PRAGMA, выполняемые для каждого нового
+  соединения (WAL, synchronous, mmap_size и т. п.);
+* CONN_HEALTH_CHECKS — постоянное соединение проверяется
+  запросом SELECT 1 в начале и в конце каждого HTTP-запроса
+  и закрывается, если перестало отвечать.
+"""
+from django.db.backends.sqlite3 import base
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        params.pop('pragmas', None)
+        return params
+
+    def get_new_connection(self, conn_params):
+        connection = super().get_new_connection(conn_params)
+        pragmas = self.settings_dict['OPTIONS'].get('pragmas', {})
+        for name, value in pragmas.items():
+            connection.execute(f'PRAGMA {name} = {value}')
+        return connection
+
+    def is_usable(self):
+        try:
+            self.connection.execute('SELECT 1')
+        except base.Database.Error:
+            return False
+        return True
+
+    def close_if_unusable_or_obsolete(self):
+        super().close_if_unusable_or_obsolete()
+        if (
+            self.connection is not None
+            and self.settings_dict.get('CONN_HEALTH_CHECKS')
+            and not self.in_atomic_block
+            and not self.is_usable()
+        ):
+            self.close()
@@ -0,0 +1,97 @@
+"""
+Нагрузочный прогон маршрутов YaNote.
+
+База заполняется заранее: ``python -m benchmarks.seed``. Все маршруты
+открывает автор с наибольшим числом заметок. Результаты сохраняются
+в JSON (--output) и сравниваются с прошлым прогоном (--baseline).
+
+С --max-p95 прогон завершается с ошибкой, если p95 какого-либо
+маршрута превысил порог: проверка времени ответа живёт здесь,
+а не в модульных тестах.
+"""
+import argparse
+import platform
+
+from benchmarks import print_table, setup_django
+from benchmarks.harness import (
+    HEADER, Route, compare, load_baseline, login_cookie, over_p95, run,
+    save
+)
+from benchmarks.seed import DEFAULT_DATABASE
+
+SAMPLE = 1000
+
+
+def make_routes():
+    from django.contrib.auth import get_user_model
+    from django.urls import reverse
+
+    from notes.models import Note
+
+    author = get_user_model().objects.order_by('pk').first()
+    if author is None:
+        raise SystemExit('База пуста: сначала python -m benchmarks.seed.')
+    notes = list(Note.objects.filter(author=author).order_by('?').values_list(
+        'id', 'slug'
+    )[:SAMPLE])
+    cookie = login_cookie(author)
+    home = reverse('notes:home')
+    notes_list = reverse('notes:list')
+    add = reverse('notes:add')
+    return [
+        Route('notes:home', lambda rng: home, cookie),
+        Route('notes:list', lambda rng: notes_list, cookie),
+        Route(
+            'notes:list (after)',
+            lambda rng: f'{notes_list}?after={rng.choice(notes)[0]}', cookie
+        ),
+        Route(
+            'notes:detail',
+            lambda rng: reverse('notes:detail', args=(rng.choice(notes)[1],)),
+            cookie
+        ),
+        Route('notes:add', lambda rng: add, cookie),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--database', default=DEFAULT_DATABASE)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument(
+        '--duration', type=float, default=10,
+        help='Секунд нагрузки на каждый маршрут.'
+    )
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='Куда сохранить JSON с итогами.')
+    parser.add_argument('--baseline', help='JSON прошлого прогона.')
+    parser.add_argument(
+        '--max-p95', type=float,
+        help='Порог p95 в миллисекундах для каждого маршрута.'
+    )
+    args = parser.parse_args()
+
+    setup_django(args.database)
+    from django.core.wsgi import get_wsgi_application
+
+    application = get_wsgi_application()
+    results = run(
+        application, make_routes(), args.concurrency, args.duration,
+        args.seed
+    )
+    print_table(HEADER, compare(results, load_baseline(args.baseline)))
+    if args.output:
+        save(args.output, {
+            'project': 'yanote', 'concurrency': args.concurrency,
+            'duration': args.duration, 'python': platform.python_version(),
+        }, results)
+    if args.max_p95 is not None:
+        slow = over_p95(results, args.max_p95)
+        if slow:
+            raise SystemExit(
+                f'p95 выше {args.max_p95} мс: {", ".join(slow)}.'
+            )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+"""
+Замер списка заметок на 1 тыс., 100 тыс. и 1 млн строк.
+
+Сравнивает постраничный вывод по ключу (after=<id>) с выводом
+через OFFSET и показывает план запроса страницы.
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+from benchmarks import setup_django
+
+INSERT_BATCH = 10_000
+
+
+def fill(author, count):
+    from notes.models import Note
+
+    for start in range(0, count, INSERT_BATCH):
+        Note.objects.bulk_create(
+            Note(title=f'Заметка {index}', text='Текст',
+                 slug=f'n-{author.pk}-{index}', author=author)
+            for index in range(start, min(start + INSERT_BATCH, count))
+        )
+
+
+def timed(func, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+
+def query_plan(author):
+    from django.db import connection
+    from notes.models import Note
+
+    queryset = Note.objects.filter(author=author, id__gt=0).only(
+        'id', 'title', 'slug', 'author'
+    ).order_by('id')[:50]
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+        return '; '.join(row[-1] for row in cursor.fetchall())
+
+
+def measure(count, repeat):
+    from django.conf import settings
+    from django.contrib.auth import get_user_model
+    from django.core.management import call_command
+    from django.test import Client
+    from django.urls import reverse
+
+    from notes.models import Note
+
+    call_command('flush', interactive=False, verbosity=0)
+    author = get_user_model().objects.create(username=f'author-{count}')
+    fill(author, count)
+    client = Client()
+    client.force_login(author)
+    url = reverse('notes:list')
+    ids = Note.objects.filter(author=author).order_by('id').values_list(
+        'id', flat=True
+    )
+    deep = ids[count - settings.NOTES_PAGE_SIZE - 1]
+    deep_offset = count - settings.NOTES_PAGE_SIZE
+    notes = Note.objects.filter(author=author).order_by('id')
+    return {
+        'first': timed(lambda: client.get(url), repeat),
+        'deep_keyset': timed(
+            lambda: client.get(url, {'after': deep}), repeat
+        ),
+        'deep_query': timed(
+            lambda: list(notes.filter(id__gt=deep)[:settings.NOTES_PAGE_SIZE]),
+            repeat
+        ),
+        'deep_offset': timed(
+            lambda: list(notes[deep_offset:count]), repeat
+        ),
+        'plan': query_plan(author),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        '--sizes', type=int, nargs='+', default=[1_000, 100_000, 1_000_000]
+    )
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        setup_django(os.path.join(directory, 'notes_list.sqlite3'))
+        from django.core.management import call_command
+        call_command('migrate', verbosity=0)
+
+        print(f'{"заметок":>10} {"первая, мс":>11} {"after, мс":>10} '
+              f'{"запрос after":>13} {"запрос OFFSET":>14}')
+        plan = ''
+        for count in args.sizes:
+            result = measure(count, args.repeat)
+            plan = result['plan']
+            print(f'{count:>10} {result["first"]:>11.2f} '
+                  f'{result["deep_keyset"]:>10.2f} '
+                  f'{result["deep_query"]:>13.2f} '
+                  f'{result["deep_offset"]:>14.2f}')
+        print(f'План запроса страницы: {plan}')
+
+
+if __name__ == '__main__':
+    main()
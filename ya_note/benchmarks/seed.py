@@ -0,0 +1,116 @@
+"""
+Генератор данных YaNote для нагрузочных замеров.
+
+Заметки распределены по авторам по закону Ципфа: у первого
+пользователя больше всего заметок, у большинства — несколько.
+Строки вставляются пачками через bulk_create, slug строится
+из заголовка с номером заметки.
+"""
+import argparse
+import itertools
+import os
+import random
+import tempfile
+import time
+from collections import Counter
+
+from benchmarks import setup_django
+
+DEFAULT_DATABASE = os.path.join(tempfile.gettempdir(), 'yanote_load.sqlite3')
+BATCH = 10_000
+WORDS = (
+    'покупки', 'список', 'дела', 'идеи', 'встреча', 'проект', 'отпуск',
+    'книги', 'фильмы', 'рецепт', 'работа', 'учёба', 'планы', 'подарки',
+    'ремонт', 'дача', 'спорт', 'врач', 'документы', 'звонки', 'бюджет',
+    'поездка', 'музыка', 'статья', 'лекция', 'экзамен', 'черновик', 'ёлка',
+)
+
+
+def sentence(rng, min_words, max_words):
+    words = rng.choices(WORDS, k=rng.randint(min_words, max_words))
+    return ' '.join(words).capitalize()
+
+
+def zipf(count, skew):
+    """Накопленные веса рангов 1..count для random.choices."""
+    return list(itertools.accumulate(
+        1 / rank ** skew for rank in range(1, count + 1)
+    ))
+
+
+def create_users(count):
+    """Пользователи с одинаковым паролем password."""
+    from django.contrib.auth import get_user_model
+    from django.contrib.auth.hashers import make_password
+
+    user_model = get_user_model()
+    password = make_password('password')
+    user_model.objects.bulk_create(
+        (user_model(username=f'user{index}', password=password)
+         for index in range(count)),
+        batch_size=BATCH,
+    )
+    return list(user_model.objects.order_by('pk').values_list(
+        'pk', flat=True
+    ))
+
+
+def make_notes(user_ids, notes_count, skew, rng):
+    from notes.models import Note
+    from notes.slugs import slugify
+
+    authors = rng.choices(
+        user_ids, cum_weights=zipf(len(user_ids), skew), k=notes_count
+    )
+    for number, author_id in enumerate(authors):
+        title = sentence(rng, 1, 5)
+        yield Note(
+            title=title, text=sentence(rng, 10, 80),
+            slug=f'{slugify(title)[:80]}-{number}', author_id=author_id
+        ), author_id
+
+
+def seed(notes_count, users_count, skew, rng):
+    """Заполняет пустую базу, возвращает число созданных строк."""
+    from django.db import transaction
+
+    from notes.models import Note
+
+    per_author = Counter()
+    with transaction.atomic():
+        user_ids = create_users(users_count)
+        notes = make_notes(user_ids, notes_count, skew, rng)
+        while True:
+            batch = list(itertools.islice(notes, BATCH))
+            if not batch:
+                break
+            Note.objects.bulk_create(note for note, _ in batch)
+            per_author.update(author_id for _, author_id in batch)
+    return {
+        'users': users_count, 'notes': notes_count,
+        'max_notes_per_user': max(per_author.values(), default=0),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--database', default=DEFAULT_DATABASE)
+    parser.add_argument('--notes', type=int, default=1_000_000)
+    parser.add_argument('--users', type=int, default=1_000)
+    parser.add_argument('--skew', type=float, default=1.1)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    setup_django(args.database)
+    from django.core.management import call_command
+
+    started = time.perf_counter()
+    call_command('migrate', verbosity=0)
+    call_command('flush', interactive=False, verbosity=0)
+    created = seed(args.notes, args.users, args.skew, random.Random(args.seed))
+    created['seconds'] = round(time.perf_counter() - started, 1)
+    print(created)
+
+
+if __name__ == '__main__':
+    main()
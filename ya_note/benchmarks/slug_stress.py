@@ -0,0 +1,103 @@
+"""
+Нагрузочная проверка подбора slug.
+
+Несколько процессов, в каждом несколько потоков, одновременно
+создают заметки с одинаковым заголовком в общей базе SQLite.
+Все заметки должны сохраниться, каждая со своим slug.
+"""
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from benchmarks import setup_django
+
+TITLE = 'Название заметки'
+
+
+def run_worker(args):
+    setup_django(args.database)
+    from django.db import connection
+    from notes.models import Note
+
+    errors = []
+
+    def create_notes():
+        try:
+            for _ in range(args.notes):
+                Note(title=TITLE, text='Текст', author_id=args.author).save()
+        except Exception as error:
+            errors.append(repr(error))
+        finally:
+            connection.close()
+
+    threads = [
+        threading.Thread(target=create_notes) for _ in range(args.threads)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if errors:
+        print('\n'.join(errors), file=sys.stderr)
+        sys.exit(1)
+
+
+def run(args, database):
+    setup_django(database)
+    from django.contrib.auth import get_user_model
+    from django.core.management import call_command
+    from notes.models import Note
+
+    call_command('migrate', verbosity=0)
+    author = get_user_model().objects.create(username='Нагрузка')
+    command = [
+        sys.executable, '-m', 'benchmarks.slug_stress', '--worker',
+        '--database', database, '--author', str(author.pk),
+        '--threads', str(args.threads), '--notes', str(args.notes),
+    ]
+    started = time.perf_counter()
+    workers = [
+        subprocess.Popen(command, cwd=Path(__file__).resolve().parents[1])
+        for _ in range(args.processes)
+    ]
+    failed = sum(bool(worker.wait()) for worker in workers)
+    elapsed = time.perf_counter() - started
+
+    expected = args.processes * args.threads * args.notes
+    slugs = list(Note.objects.values_list('slug', flat=True))
+    result = {
+        'expected': expected,
+        'created': len(slugs),
+        'unique_slugs': len(set(slugs)),
+        'failed_workers': failed,
+        'notes_per_second': round(len(slugs) / elapsed, 1),
+    }
+    print(json.dumps(result, ensure_ascii=False))
+    return (
+        not failed and len(slugs) == len(set(slugs)) == expected
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--processes', type=int, default=4)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--notes', type=int, default=10)
+    parser.add_argument('--worker', action='store_true')
+    parser.add_argument('--database')
+    parser.add_argument('--author', type=int)
+    args = parser.parse_args()
+    if args.worker:
+        return run_worker(args)
+    with tempfile.TemporaryDirectory() as directory:
+        ok = run(args, str(Path(directory) / 'stress.sqlite3'))
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+"""
+Замер кеша транслитерации notes.slugs.slugify.
+
+Заголовки выбираются по закону Ципфа: немногие, вроде заголовка
+по умолчанию, повторяются очень часто, остальные — редко.
+"""
+import argparse
+import random
+import time
+
+from benchmarks import setup_django
+
+WORDS = (
+    'заметка', 'покупки', 'список', 'дела', 'идеи', 'встреча', 'проект',
+    'отпуск', 'книги', 'фильмы', 'рецепт', 'работа', 'учёба', 'планы',
+)
+
+
+def make_titles(count, distinct, rng):
+    pool = ['Название заметки'] + [
+        ' '.join(rng.choice(WORDS) for _ in range(rng.randint(2, 5)))
+        + f' {index}'
+        for index in range(distinct - 1)
+    ]
+    weights = [1 / rank for rank in range(1, len(pool) + 1)]
+    return rng.choices(pool, weights, k=count)
+
+
+def timed(func, titles):
+    start = time.perf_counter()
+    func(titles)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--titles', type=int, default=100_000)
+    parser.add_argument('--distinct', type=int, default=2_000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    setup_django()
+    from pytils.translit import slugify as translit_slugify
+    from notes.slugs import slugify, slugify_many
+
+    titles = make_titles(args.titles, args.distinct, random.Random(args.seed))
+    plain = timed(lambda items: [translit_slugify(t) for t in items], titles)
+    slugify.cache_clear()
+    cached = timed(lambda items: [slugify(t) for t in items], titles)
+    info = slugify.cache_info()
+    slugify.cache_clear()
+    batch = timed(slugify_many, titles)
+
+    print(f'Заголовков: {args.titles}, разных: {args.distinct}')
+    print(f'pytils.slugify:      {plain * 1000:8.1f} мс')
+    print(f'slugify с кешем:     {cached * 1000:8.1f} мс  '
+          f'({plain / cached:.1f}x, попаданий {info.hits}, '
+          f'промахов {info.misses})')
+    print(f'slugify_many:        {batch * 1000:8.1f} мс  '
+          f'({plain / batch:.1f}x)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+"""
+Время рендеринга notes/list.html.
+
+Данные читаются из базы один раз, замеряется только рендеринг
+страницы со списком для её автора в режимах:
+
+- без кеша: шаблоны разбираются заново при каждом рендеринге;
+- кеш: скомпилированные шаблоны хранятся в памяти (cached.Loader);
+- lean: кеш и движок без лишних контекст-процессоров.
+
+Готовая анонимная шапка здесь не участвует: список видят только
+авторизованные пользователи.
+"""
+import argparse
+import os
+import tempfile
+
+from benchmarks import measure, print_table, setup_django
+
+LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+# Режим: (кешировать шаблоны, движок из TEMPLATES).
+MODES = {
+    'без кеша': (False, 'django'),
+    'кеш': (True, 'django'),
+    'lean': (True, 'lean'),
+}
+
+
+def make_engine(name, cached):
+    """Движок как в TEMPLATES, но с загрузчиками нужного режима."""
+    from django.conf import settings
+    from django.template.backends.django import DjangoTemplates
+
+    params = next(
+        entry for entry in settings.TEMPLATES
+        if entry.get('NAME', 'django') == name
+    )
+    loaders = [('django.template.loaders.cached.Loader', LOADERS)]
+    return DjangoTemplates({
+        'NAME': name,
+        'DIRS': params['DIRS'],
+        'APP_DIRS': False,
+        'OPTIONS': dict(
+            params['OPTIONS'], loaders=loaders if cached else LOADERS
+        ),
+    })
+
+
+def prepare():
+    from django.conf import settings
+    from django.contrib.auth import get_user_model
+    from django.core.management import call_command
+
+    from notes.models import Note
+    from notes.pagination import IdPage
+
+    call_command('migrate', verbosity=0)
+    author = get_user_model().objects.create(username='Автор')
+    Note.objects.bulk_create(
+        Note(title=f'Заметка {index}', text='Текст',
+             slug=f'note-{index}', author=author)
+        for index in range(settings.NOTES_PAGE_SIZE + 1)
+    )
+    notes = list(Note.objects.order_by('id').only(
+        'id', 'title', 'slug', 'author'
+    )[:settings.NOTES_PAGE_SIZE])
+    page = IdPage(notes, has_next=True, has_previous=False)
+    return author, {
+        'notes/list.html': {
+            'object_list': notes,
+            'page_obj': page,
+            'is_paginated': True,
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--renders', type=int, default=200)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        setup_django(os.path.join(directory, 'templates.sqlite3'))
+        from django.test import RequestFactory
+
+        author, pages = prepare()
+        request = RequestFactory().get('/')
+        request.user = author
+        request.session = {}
+        rows = []
+        for template_name, context in pages.items():
+            for mode, (cached, engine_name) in MODES.items():
+                template = make_engine(engine_name, cached).get_template(
+                    template_name
+                )
+
+                def render():
+                    for _ in range(args.renders):
+                        template.render(context, request)
+
+                best, median = measure(render, args.repeat)
+                rows.append((
+                    template_name, mode,
+                    round(best / args.renders * 1000, 3),
+                    round(median / args.renders * 1000, 3),
+                ))
+    print_table(('шаблон', 'режим', 'лучшее, мс', 'медиана, мс'), rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+import json
+
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+
+from .forms import WARNING
+from .models import Note
+from .slugs import SlugAllocator, slugify_many
+
+IMPORT_FIELDS = ('title', 'text', 'slug')
+EXPORT_FIELDS = ('title', 'text', 'slug')
+
+
+class ImportResult:
+    """Итог импорта: сколько заметок создано и ошибки по номерам строк."""
+
+    def __init__(self):
+        self.created = 0
+        self.errors = []
+
+    def add_error(self, line_number, message):
+        self.errors.append({'line': line_number, 'error': message})
+
+    def as_dict(self):
+        return {
+            'created': self.created,
+            'errors': sorted(self.errors, key=lambda error: error['line']),
+        }
+
+
+def parse_note(line, author):
+    """Заметка из строки JSON Lines, проверенная по полям модели."""
+    try:
+        data = json.loads(line)
+    except ValueError as error:
+        raise ValidationError(f'Некорректный JSON: {error}')
+    if not isinstance(data, dict):
+        raise ValidationError('Ожидается JSON-объект.')
+    unknown = set(data) - set(IMPORT_FIELDS)
+    if unknown:
+        raise ValidationError(
+            f'Неизвестные поля: {", ".join(sorted(unknown))}.'
+        )
+    note = Note(author=author, **data)
+    note.full_clean(exclude=('author',), validate_unique=False)
+    return note
+
+
+def import_notes(lines, author, batch_size=500):
+    """
+    Создаёт заметки из строк JSON Lines пачками через bulk_create.
+
+    Ошибочные строки попадают в отчёт и не прерывают импорт.
+    Строки читаются по одной, в памяти держится не больше пачки.
+    """
+    result = ImportResult()
+    batch = []
+    for line_number, line in enumerate(lines, start=1):
+        if isinstance(line, bytes):
+            line = line.decode('utf-8', errors='replace')
+        if not line.strip():
+            continue
+        try:
+            batch.append((line_number, parse_note(line, author)))
+        except ValidationError as error:
+            result.add_error(line_number, ' '.join(error.messages))
+        if len(batch) >= batch_size:
+            save_batch(batch, result)
+            batch = []
+    if batch:
+        save_batch(batch, result)
+    return result
+
+
+def save_batch(batch, result):
+    explicit = [note.slug for _, note in batch if note.slug]
+    taken = set(Note.objects.filter(slug__in=explicit).values_list(
+        'slug', flat=True
+    ))
+    accepted = []
+    for line_number, note in batch:
+        if note.slug and note.slug in taken:
+            result.add_error(line_number, note.slug + WARNING)
+            continue
+        taken.add(note.slug)
+        accepted.append((line_number, note))
+
+    generated = [note for _, note in accepted if not note.slug]
+    allocator = SlugAllocator(
+        Note.objects, Note._meta.get_field('slug').max_length,
+        reserved=taken - {''}
+    )
+    for note, base in zip(
+            generated, slugify_many([note.title for note in generated])
+    ):
+        note.slug = allocator.allocate(base)
+    try:
+        with transaction.atomic():
+            Note.objects.bulk_create(note for _, note in accepted)
+        result.created += len(accepted)
+    except IntegrityError:
+        # Параллельная запись заняла один из slug: сохраняем по одной,
+        # подобранные slug Note.save подберёт заново.
+        for note in generated:
+            note.slug = ''
+        for line_number, note in accepted:
+            try:
+                note.save()
+                result.created += 1
+            except IntegrityError:
+                result.add_error(line_number, note.slug + WARNING)
+
+
+def export_notes(queryset, chunk_size=1000):
+    """Строки JSON Lines с заметками, читаемыми курсором по частям."""
+    for note in queryset.order_by('id').values(*EXPORT_FIELDS).iterator(
+            chunk_size=chunk_size
+    ):
+        yield json.dumps(note, ensure_ascii=False) + '\n'
@@ -0,0 +1,109 @@
+"""
+Условные GET-запросы к странице заметки.
+
+ETag строится из номера правки заметки и её updated_at,
+Last-Modified — из updated_at. Заметка читается одним запросом
+по уникальному индексу slug и дальше достаётся представлению:
+ответ 304 страницу не рендерит, а обычный ответ не делает лишних
+запросов.
+"""
+import hashlib
+from calendar import timegm
+from functools import wraps
+from http import HTTPStatus
+
+from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from .models import Note
+
+NOTE_ATTRIBUTE = '_conditional_note'
+SAFE_METHODS = ('GET', 'HEAD')
+
+
+def make_etag(*parts):
+    return hashlib.md5(
+        ':'.join(str(part) for part in parts).encode()
+    ).hexdigest()
+
+
+def get_note_or_404(request, slug):
+    """Заметка автора для валидаторов и представления, одна на запрос."""
+    note = getattr(request, NOTE_ATTRIBUTE, None)
+    if note is None or note.slug != slug:
+        note = get_object_or_404(Note, slug=slug, author=request.user)
+        setattr(request, NOTE_ATTRIBUTE, note)
+    return note
+
+
+def note_etag(request, slug):
+    """Без входа валидаторов нет: представление отправит на вход."""
+    if not request.user.is_authenticated:
+        return None
+    note = get_note_or_404(request, slug)
+    return make_etag(
+        'note', note.pk, note.revision, note.updated_at.isoformat(),
+        request.user.pk, request.user.get_username(),
+    )
+
+
+def note_last_modified(request, slug):
+    if not request.user.is_authenticated:
+        return None
+    return get_note_or_404(request, slug).updated_at
+
+
+def validators(request, etag_func, last_modified_func, *args, **kwargs):
+    """Валидаторы: ETag в кавычках и Last-Modified в секундах."""
+    etag = etag_func(request, *args, **kwargs)
+    last_modified = last_modified_func(request, *args, **kwargs)
+    return (
+        quote_etag(etag) if etag is not None else None,
+        timegm(last_modified.utctimetuple()) if last_modified else None,
+    )
+
+
+def set_validators(response, etag, last_modified):
+    if last_modified and not response.has_header('Last-Modified'):
+        response.headers['Last-Modified'] = http_date(last_modified)
+    if etag:
+        response.headers.setdefault('ETag', etag)
+    return response
+
+
+def conditional_page(etag_func, last_modified_func):
+    """
+    Как condition из Django, но валидаторы считаются, только когда нужны.
+
+    Для условного запроса — до представления, чтобы ответить 304.
+    Иначе — после него, из уже прочитанной им заметки.
+    """
+    def decorator(view):
+        @wraps(view)
+        def inner(request, *args, **kwargs):
+            if request.method not in SAFE_METHODS:
+                return view(request, *args, **kwargs)
+            if (
+                'HTTP_IF_NONE_MATCH' in request.META
+                or 'HTTP_IF_MODIFIED_SINCE' in request.META
+            ):
+                etag, last_modified = validators(
+                    request, etag_func, last_modified_func, *args, **kwargs
+                )
+                response = get_conditional_response(
+                    request, etag=etag, last_modified=last_modified
+                )
+                if response is not None:
+                    return set_validators(response, etag, last_modified)
+            response = view(request, *args, **kwargs)
+            if response.status_code == HTTPStatus.OK:
+                set_validators(response, *validators(
+                    request, etag_func, last_modified_func, *args, **kwargs
+                ))
+            return response
+        return inner
+    return decorator
+
+
+note_condition = conditional_page(note_etag, note_last_modified)
@@ -0,0 +1,35 @@
+import sys
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from notes.bulk import import_notes
+
+
+class Command(BaseCommand):
+    help = 'Импортирует заметки пользователя из файла JSON Lines.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл JSON Lines или - для stdin.')
+        parser.add_argument('--username', required=True)
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        try:
+            author = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(
+                f'Пользователь {options["username"]} не найден.'
+            )
+        if options['path'] == '-':
+            result = import_notes(sys.stdin, author, options['batch_size'])
+        else:
+            with open(options['path'], encoding='utf-8') as lines:
+                result = import_notes(lines, author, options['batch_size'])
+        for error in result.errors:
+            self.stderr.write(f'Строка {error["line"]}: {error["error"]}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано заметок: {result.created}, ошибок: '
+            f'{len(result.errors)}.'
+        ))
@@ -1,7 +1,10 @@
 from django.conf import settings
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.db.models import F
 
-from pytils.translit import slugify
+from .slugs import allocate_slug, slugify
+
+SLUG_ATTEMPTS = 100
 
 
 class Note(models.Model):
@@ -27,12 +30,56 @@ class Note(models.Model):
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
     )
+    # Номер правки и время последней правки: из них строится ETag.
+    revision = models.PositiveIntegerField(default=0, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = (
+            models.Index(
+                fields=('author', 'id', 'title', 'slug'),
+                name='note_author_list_idx'
+            ),
+        )
 
     def __str__(self):
         return self.title
 
     def save(self, *args, **kwargs):
-        if not self.slug:
-            max_slug_length = self._meta.get_field('slug').max_length
-            self.slug = slugify(self.title)[:max_slug_length]
-        super().save(*args, **kwargs)
+        """
+        Сохраняет заметку, при пустом slug подбирая свободный.
+
+        Каждое сохранение существующей заметки увеличивает revision
+        в самой базе (F-выражение): две параллельные правки получат
+        разные номера, и ETag не повторится.
+        """
+        updating = not self._state.adding
+        if updating:
+            self.revision = F('revision') + 1
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'revision'}
+        self._save_with_slug(*args, **kwargs)
+        if updating:
+            self.refresh_from_db(fields=['revision'])
+
+    def _save_with_slug(self, *args, **kwargs):
+        """
+        Занятость slug проверяет уникальный индекс при вставке:
+        если параллельный запрос успел раньше, берём следующий номер.
+        """
+        if self.slug:
+            with transaction.atomic():
+                return super().save(*args, **kwargs)
+        max_slug_length = self._meta.get_field('slug').max_length
+        base = slugify(self.title)[:max_slug_length]
+        for _ in range(SLUG_ATTEMPTS):
+            self.slug = allocate_slug(
+                Note.objects, base, max_slug_length, exclude_pk=self.pk
+            )
+            try:
+                with transaction.atomic():
+                    return super().save(*args, **kwargs)
+            except IntegrityError:
+                self.slug = ''
+        raise IntegrityError(f'Не удалось подобрать slug для «{base}».')
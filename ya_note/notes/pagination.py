@@ -0,0 +1,84 @@
+from django.http import Http404
+
+
+class IdPage:
+    """Страница заметок между двумя значениями id."""
+
+    def __init__(self, object_list, has_next, has_previous):
+        self.object_list = object_list
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    @property
+    def next_after(self):
+        return self.object_list[len(self) - 1].id
+
+    @property
+    def previous_before(self):
+        return self.object_list[0].id
+
+
+class IdKeysetPaginationMixin:
+    """
+    Постраничный вывод ListView по возрастанию id без OFFSET.
+
+    Следующая страница запрашивается параметром after, предыдущая —
+    before. Обе выбираются по индексу, поэтому любая страница стоит
+    столько же, сколько первая.
+    """
+
+    def get_cursor(self, name):
+        value = self.request.GET.get(name)
+        if value is None:
+            return None
+        try:
+            return int(value)
+        except ValueError:
+            raise Http404('Неверный номер заметки в адресе страницы.')
+
+    def paginate_queryset(self, queryset, page_size):
+        """
+        Страница одной выборкой.
+
+        Строк читается на одну больше: по лишней видно, есть ли
+        страница дальше.
+        """
+        queryset = queryset.order_by('id')
+        before = self.get_cursor('before')
+        if before is not None:
+            rows = list(
+                queryset.filter(id__lt=before).order_by('-id')[:page_size + 1]
+            )
+            has_next = True
+            has_previous = len(rows) > page_size
+            rows = rows[:page_size][::-1]
+        else:
+            after = self.get_cursor('after')
+            filtered = queryset
+            if after is not None:
+                filtered = queryset.filter(id__gt=after)
+            rows = list(filtered[:page_size + 1])
+            has_next = len(rows) > page_size
+            has_previous = after is not None
+            rows = rows[:page_size]
+        # В шаблоны уходит queryset со строками в кеше: count(), exists()
+        # и перебор обходятся без новых запросов.
+        object_list = queryset.all()
+        object_list._result_cache = rows
+        page = IdPage(object_list, has_next, has_previous)
+        return None, page, page.object_list, page.has_other_pages()
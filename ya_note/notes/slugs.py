@@ -0,0 +1,120 @@
+import re
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db.models import Q
+from django.dispatch import receiver
+from pytils.translit import slugify as translit_slugify
+
+# Место под суффикс: дефис и до десяти цифр.
+SUFFIX_RESERVE = 11
+FALLBACK_SLUG = 'note'
+
+
+class SlugAllocator:
+    """
+    Подбор свободных slug: сам base или base-2, base-3 и так далее.
+
+    Все занятые варианты одной основы выбираются одним запросом
+    по диапазону уникального индекса slug, номер берётся следующий
+    за наибольшим. Свободен ли slug на самом деле, решает вставка в базу.
+    """
+
+    def __init__(self, queryset, max_length, exclude_pk=None, reserved=()):
+        self.queryset = queryset
+        self.max_length = max_length
+        self.exclude_pk = exclude_pk
+        self.reserved = set(reserved)
+        self._bases = {}
+
+    def _scan(self, base):
+        stem = base[:self.max_length - SUFFIX_RESERVE]
+        taken = self.queryset.filter(
+            Q(slug=base) | Q(slug__gt=f'{stem}-', slug__lt=f'{stem}.')
+        ).exclude(pk=self.exclude_pk).values_list('slug', flat=True)
+        pattern = re.compile(rf'{re.escape(stem)}-(\d+)')
+        base_taken = False
+        last_number = 1
+        for slug in taken:
+            if slug == base:
+                base_taken = True
+                continue
+            match = pattern.fullmatch(slug)
+            if match:
+                last_number = max(last_number, int(match.group(1)))
+        return [stem, base_taken, last_number]
+
+    def allocate(self, base):
+        """
+        Следующий свободный slug.
+
+        Повторный вызов с той же основой не обращается к базе
+        и выдаёт следующий номер.
+        """
+        base = base or FALLBACK_SLUG
+        if base not in self._bases:
+            self._bases[base] = self._scan(base)
+        state = self._bases[base]
+        stem, base_taken, last_number = state
+        if not base_taken and base not in self.reserved:
+            slug = base
+            state[1] = True
+        else:
+            last_number += 1
+            while f'{stem}-{last_number}' in self.reserved:
+                last_number += 1
+            slug = f'{stem}-{last_number}'
+            state[2] = last_number
+        self.reserved.add(slug)
+        return slug
+
+
+def allocate_slug(queryset, base, max_length, exclude_pk=None):
+    """Свободный slug для одной записи, см. SlugAllocator."""
+    return SlugAllocator(queryset, max_length, exclude_pk).allocate(base)
+
+
+_cache = None
+
+
+def _cached_translit():
+    """
+    LRU-кеш транслитерации, создаётся при первом вызове.
+
+    Размер берётся из SLUGIFY_CACHE_SIZE в момент создания, а не
+    при импорте модуля, поэтому override_settings его меняет.
+    """
+    global _cache
+    if _cache is None:
+        _cache = lru_cache(maxsize=settings.SLUGIFY_CACHE_SIZE)(
+            translit_slugify
+        )
+    return _cache
+
+
+def slugify(title):
+    """
+    pytils.translit.slugify с LRU-кешем.
+
+    Заголовки часто повторяются, а транслитерация заметно дороже
+    поиска в словаре. Счётчики попаданий: slugify.cache_info().
+    """
+    return _cached_translit()(title)
+
+
+slugify.cache_info = lambda: _cached_translit().cache_info()
+slugify.cache_clear = lambda: _cached_translit().cache_clear()
+
+
+@receiver(setting_changed)
+def reset_slugify_cache(setting, **kwargs):
+    global _cache
+    if setting == 'SLUGIFY_CACHE_SIZE':
+        _cache = None
+
+
+def slugify_many(titles):
+    """Slug для списка заголовков, каждый разный заголовок переводится раз."""
+    slugs = {title: slugify(title) for title in dict.fromkeys(titles)}
+    return [slugs[title] for title in titles]
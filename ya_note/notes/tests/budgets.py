@@ -0,0 +1,21 @@
+"""
+Бюджеты SQL-запросов по имени URL.
+
+Число запросов указано для авторизованного пользователя: сессия
+и пользователь добавляют по запросу, у анонима их нет.
+"""
+from yanote.query_budget import Budget
+
+BUDGETS = {
+    'notes:home': Budget(queries=2),
+    'notes:list': Budget(queries=3),
+    'notes:add': Budget(queries=2),
+    'notes:edit': Budget(queries=3),
+    'notes:detail': Budget(queries=3),
+    'notes:delete': Budget(queries=3),
+    'notes:success': Budget(queries=2),
+    'notes:export': Budget(queries=3),
+    'users:login': Budget(queries=2),
+    'users:logout': Budget(queries=4),
+    'users:signup': Budget(queries=2),
+}
@@ -1,9 +1,14 @@
+from http import HTTPStatus
+
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.template import engines
+from django.test import TestCase, override_settings
 from django.urls import reverse
 
 from notes.models import Note
 from notes.forms import NoteForm
+from yanote.templating import warm_templates
 
 User = get_user_model()
 
@@ -47,3 +52,136 @@ class TestRoutes(TestCase):
                 response = self.client.get(url)
                 self.assertIn('form', response.context)
                 self.assertIsInstance(response.context['form'], NoteForm)
+
+
+@override_settings(NOTES_PAGE_SIZE=3)
+class TestNotesPagination(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='Автор')
+        Note.objects.bulk_create(
+            Note(title=f'Заметка {index}', text='Текст',
+                 slug=f'note-{index}', author=cls.author)
+            for index in range(7)
+        )
+        cls.ids = list(Note.objects.order_by('id').values_list(
+            'id', flat=True
+        ))
+        cls.url = reverse('notes:list')
+
+    def setUp(self):
+        self.client.force_login(self.author)
+
+    def page_ids(self, **params):
+        response = self.client.get(self.url, params)
+        return response, [note.id for note in response.context['object_list']]
+
+    def test_pages_follow_id_order(self):
+        response, ids = self.page_ids()
+        self.assertEqual(ids, self.ids[:3])
+        page = response.context['page_obj']
+        self.assertTrue(page.has_next())
+        self.assertFalse(page.has_previous())
+
+        response, ids = self.page_ids(after=page.next_after)
+        self.assertEqual(ids, self.ids[3:6])
+
+        response, ids = self.page_ids(
+            after=response.context['page_obj'].next_after
+        )
+        self.assertEqual(ids, self.ids[6:])
+        self.assertFalse(response.context['page_obj'].has_next())
+
+    def test_previous_page(self):
+        response, ids = self.page_ids(before=self.ids[6])
+        self.assertEqual(ids, self.ids[3:6])
+        self.assertTrue(response.context['page_obj'].has_previous())
+        response, ids = self.page_ids(before=self.ids[3])
+        self.assertEqual(ids, self.ids[:3])
+        self.assertFalse(response.context['page_obj'].has_previous())
+
+    def test_page_query_count(self):
+        # Сессия, пользователь и одна выборка страницы.
+        with self.assertNumQueries(3):
+            self.page_ids(after=self.ids[0])
+
+    def test_invalid_cursor(self):
+        response = self.client.get(self.url, {'after': 'abc'})
+        self.assertEqual(response.status_code, 404)
+
+
+class TestTemplates(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='Автор')
+
+    def test_warm_templates(self):
+        loaders = [
+            engine.engine.template_loaders[0] for engine in engines.all()
+        ]
+        for loader in loaders:
+            loader.reset()
+        warm_templates()
+        for loader in loaders:
+            warmed = {
+                template.origin.template_name
+                for template in loader.get_template_cache.values()
+            }
+            self.assertTrue(set(settings.WARM_TEMPLATES) <= warmed)
+
+    def test_list_uses_lean_engine(self):
+        self.client.force_login(self.author)
+        response = self.client.get(reverse('notes:list'))
+        self.assertIn('user', response.context)
+        self.assertNotIn('messages', response.context)
+
+
+class TestNoteValidators(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='Автор')
+        cls.note = Note.objects.create(
+            title='Заметка', text='Текст', slug='note', author=cls.author
+        )
+        cls.url = reverse('notes:detail', args=(cls.note.slug,))
+
+    def setUp(self):
+        self.client.force_login(self.author)
+
+    def test_not_modified_after_one_query(self):
+        response = self.client.get(self.url)
+        self.assertTrue(response.has_header('Last-Modified'))
+        # Сессия и пользователь, затем заметка по индексу slug.
+        with self.assertNumQueries(3):
+            response = self.client.get(
+                self.url, HTTP_IF_NONE_MATCH=response['ETag']
+            )
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+
+    def test_edit_changes_etag(self):
+        etag = self.client.get(self.url)['ETag']
+        self.client.post(
+            reverse('notes:edit', args=(self.note.slug,)),
+            {'title': 'Новый заголовок', 'text': 'Текст', 'slug': 'note'}
+        )
+        self.note.refresh_from_db()
+        self.assertEqual(self.note.revision, 1)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_concurrent_edits_get_distinct_revisions(self):
+        first = Note.objects.get(pk=self.note.pk)
+        second = Note.objects.get(pk=self.note.pk)
+        first.save()
+        second.save()
+        self.assertEqual((first.revision, second.revision), (1, 2))
+
+    def test_no_validators_for_anonymous(self):
+        self.client.logout()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH='"x"')
+        self.assertEqual(response.status_code, HTTPStatus.FOUND)
+        self.assertFalse(response.has_header('ETag'))
@@ -1,15 +1,29 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
 from http import HTTPStatus
+from io import StringIO
+from unittest import mock, skipUnless
 
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.test import Client, TestCase
+from django.core.management import call_command
+from django.db import IntegrityError
+from django.test import Client, SimpleTestCase, TestCase
 from django.urls import reverse
 from pytils.translit import slugify
 
 from notes.forms import WARNING
 from notes.models import Note
+from notes.slugs import (
+    allocate_slug, slugify as cached_slugify, slugify_many
+)
 
 
 User = get_user_model()
+RUN_SLOW_TESTS = os.getenv('RUN_SLOW_TESTS') == '1'
 
 
 class TestRoutes(TestCase):
@@ -157,6 +171,14 @@ class TestRoutes(TestCase):
         note_count = Note.objects.count()
         self.assertEqual(note_count, self.expected_note_count)
 
+    def test_other_integrity_errors_are_not_slug_errors(self):
+        with mock.patch.object(
+            Note, 'save', side_effect=IntegrityError('NOT NULL')
+        ), self.assertRaises(IntegrityError):
+            self.author_client.post(
+                self.url_note_create, self.NOTE_CREATE_DATA
+            )
+
     def test_empty_slug(self):
         no_slug_create_data = self.NOTE_CREATE_DATA
         no_slug_create_data.pop('slug')
@@ -171,3 +193,134 @@ class TestRoutes(TestCase):
         expected_slug = slugify(no_slug_create_data['title'])
 
         self.assertEqual(new_note.slug, expected_slug)
+
+    def test_same_title_gets_numbered_slug(self):
+        data = {'title': 'Одинаковое название', 'text': 'Текст'}
+        for _ in range(3):
+            self.author_client.post(self.url_note_create, data)
+        base_slug = slugify(data['title'])
+        self.assertQuerysetEqual(
+            Note.objects.filter(title=data['title']).order_by('id'),
+            (base_slug, f'{base_slug}-2', f'{base_slug}-3'),
+            transform=lambda note: note.slug
+        )
+
+    def test_import_notes(self):
+        lines = (
+            {'title': 'Импорт', 'text': 'Текст'},
+            {'text': 'Текст', 'slug': self.NOTE_SLUG},
+            'не json',
+            {'title': 'Импорт', 'text': 'Ещё текст'},
+            {'title': 'Импорт'},
+        )
+        response = self.author_client.post(
+            reverse('notes:import'),
+            '\n'.join(json.dumps(line, ensure_ascii=False) for line in lines),
+            content_type='application/x-ndjson'
+        )
+        report = response.json()
+        self.assertEqual(report['created'], 2)
+        self.assertEqual(
+            [error['line'] for error in report['errors']], [2, 3, 5]
+        )
+        self.assertEqual(
+            set(Note.objects.filter(
+                title='Импорт', author=self.user_creator
+            ).values_list('slug', flat=True)),
+            {'import', 'import-2'}
+        )
+
+    def test_import_notes_command(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.jsonl') as file:
+            file.write('{"title": "Из файла", "text": "Текст"}\n')
+            file.flush()
+            call_command(
+                'import_notes', file.name,
+                username=self.user_authorized.username, stdout=StringIO()
+            )
+        self.assertTrue(Note.objects.filter(
+            title='Из файла', author=self.user_authorized
+        ).exists())
+
+    def test_export_notes(self):
+        users_notes = (
+            (self.author_client, [{
+                'title': self.user_creator_note.title,
+                'text': self.user_creator_note.text,
+                'slug': self.NOTE_SLUG,
+            }]),
+            (self.non_author_client, []),
+        )
+        for client, expected in users_notes:
+            with self.subTest(expected=expected):
+                response = client.get(reverse('notes:export'))
+                content = b''.join(response.streaming_content).decode()
+                self.assertEqual(
+                    [json.loads(line) for line in content.splitlines()],
+                    expected
+                )
+
+
+class TestSlugRetry(TestCase):
+    """Гонка без потоков: slug занимают между подбором и вставкой."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='Автор')
+
+    def test_taken_slug_is_allocated_again(self):
+        def allocate_then_take(*args, **kwargs):
+            slug = allocate_slug(*args, **kwargs)
+            if allocate.call_count == 1:
+                Note.objects.create(
+                    title='Соперник', text='Текст', slug=slug,
+                    author=self.author
+                )
+            return slug
+
+        with mock.patch(
+            'notes.models.allocate_slug', side_effect=allocate_then_take
+        ) as allocate:
+            note = Note.objects.create(
+                title='Заметка', text='Текст', author=self.author
+            )
+        self.assertEqual(allocate.call_count, 2)
+        self.assertEqual(note.slug, f'{slugify("Заметка")}-2')
+        self.assertEqual(Note.objects.filter(title='Заметка').count(), 1)
+
+
+@skipUnless(RUN_SLOW_TESTS, 'Запускается при RUN_SLOW_TESTS=1.')
+class TestSlugConcurrency(SimpleTestCase):
+    """Несколько процессов и потоков: секунды, а не миллисекунды."""
+
+    def test_parallel_notes_with_same_title(self):
+        result = subprocess.run(
+            (sys.executable, '-m', 'benchmarks.slug_stress',
+             '--processes', '3', '--threads', '3', '--notes', '3'),
+            cwd=settings.BASE_DIR, capture_output=True, text=True
+        )
+        self.assertEqual(result.returncode, 0, result.stdout + result.stderr)
+
+
+class TestSlugify(SimpleTestCase):
+
+    def test_slugify_many_uses_cache(self):
+        titles = ['Название заметки', 'Покупки', 'Название заметки']
+        cached_slugify.cache_clear()
+        self.assertEqual(
+            slugify_many(titles), [slugify(title) for title in titles]
+        )
+        info = cached_slugify.cache_info()
+        self.assertEqual((info.hits, info.misses), (0, 2))
+        cached_slugify(titles[0])
+        self.assertEqual(cached_slugify.cache_info().hits, 1)
+
+    def test_slugify_cache_size_follows_settings(self):
+        with self.settings(SLUGIFY_CACHE_SIZE=1):
+            cached_slugify('Покупки')
+            cached_slugify('Название заметки')
+            info = cached_slugify.cache_info()
+            self.assertEqual((info.maxsize, info.currsize), (1, 1))
+        self.assertEqual(
+            cached_slugify.cache_info().maxsize, settings.SLUGIFY_CACHE_SIZE
+        )
@@ -1,10 +1,13 @@
 from http import HTTPStatus
 
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.urls import reverse
 
 from notes.models import Note
+from notes.tests.budgets import BUDGETS
+from yanote.metrics import registry
+from yanote.query_budget import QueryBudgetMixin
 
 
 User = get_user_model()
@@ -95,3 +98,59 @@ class TestRoutes(TestCase):
                 redirect_url = f'{login_url}?next={url}'
                 response = self.client.get(url)
                 self.assertRedirects(response, redirect_url)
+
+
+@override_settings(METRICS_ENABLED=True)
+class TestMetrics(TestCase):
+
+    def setUp(self):
+        registry.clear()
+        self.addCleanup(registry.clear)
+
+    def test_notes_list_metrics(self):
+        self.client.force_login(User.objects.create(username='Автор'))
+        response = self.client.get(reverse('notes:list'))
+        self.assertIn('total;dur=', response['Server-Timing'])
+        count, _, _ = registry.snapshot()[('render_seconds', 'notes:list')]
+        self.assertEqual(count, 1)
+        response = self.client.get(reverse('metrics'))
+        self.assertContains(
+            response, 'yanote_http_request_duration_seconds_count'
+            '{view="notes:list"} 1'
+        )
+
+
+class TestQueryBudgets(QueryBudgetMixin, TestCase):
+    query_budgets = BUDGETS
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='Автор')
+        Note.objects.bulk_create(
+            Note(title=f'Заметка {index}', text='Текст',
+                 slug=f'note-{index}', author=cls.author)
+            for index in range(10)
+        )
+
+    def test_routes_within_budget(self):
+        routes = (
+            ('notes:home', None),
+            ('notes:list', None),
+            ('notes:add', None),
+            ('notes:edit', ('note-0',)),
+            ('notes:detail', ('note-0',)),
+            ('notes:delete', ('note-0',)),
+            ('notes:success', None),
+            ('notes:export', None),
+            ('users:login', None),
+            ('users:signup', None),
+            ('users:logout', None),
+        )
+        for name, args in routes:
+            with self.subTest(name=name):
+                self.client.force_login(self.author)
+                with self.assert_query_budget(name):
+                    response = self.client.get(reverse(name, args=args))
+                    if response.streaming:
+                        b''.join(response.streaming_content)
+                self.assertEqual(response.status_code, HTTPStatus.OK)
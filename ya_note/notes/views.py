@@ -1,9 +1,16 @@
+from django.conf import settings
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.db import IntegrityError
+from django.http import JsonResponse, StreamingHttpResponse
 from django.urls import reverse_lazy
+from django.utils.decorators import method_decorator
 from django.views import generic
 
-from .forms import NoteForm
+from .bulk import export_notes, import_notes
+from .conditional import get_note_or_404, note_condition
+from .forms import WARNING, NoteForm
 from .models import Note
+from .pagination import IdKeysetPaginationMixin
 
 
 class Home(generic.TemplateView):
@@ -25,6 +32,23 @@ class NoteBase(LoginRequiredMixin):
         """Пользователь может работать только со своими заметками."""
         return self.model.objects.filter(author=self.request.user)
 
+    def form_valid(self, form):
+        """
+        Занятый slug выясняется при записи и становится ошибкой формы.
+
+        Другие нарушения ограничений базы ошибкой slug не считаются.
+        """
+        try:
+            return super().form_valid(form)
+        except IntegrityError:
+            slug = form.cleaned_data['slug']
+            if not slug or not Note.objects.filter(slug=slug).exclude(
+                    pk=form.instance.pk
+            ).exists():
+                raise
+            form.add_error('slug', slug + WARNING)
+            return self.form_invalid(form)
+
 
 class NoteCreate(NoteBase, generic.CreateView):
     """Добавление заметки."""
@@ -32,9 +56,7 @@ class NoteCreate(NoteBase, generic.CreateView):
     form_class = NoteForm
 
     def form_valid(self, form):
-        new_note = form.save(commit=False)
-        new_note.author = self.request.user
-        new_note.save()
+        form.instance.author = self.request.user
         return super().form_valid(form)
 
 
@@ -49,11 +71,52 @@ class NoteDelete(NoteBase, generic.DeleteView):
     template_name = 'notes/delete.html'
 
 
-class NotesList(NoteBase, generic.ListView):
+class NotesList(NoteBase, IdKeysetPaginationMixin, generic.ListView):
     """Список всех заметок пользователя."""
     template_name = 'notes/list.html'
+    template_engine = 'lean'
 
+    def get_paginate_by(self, queryset):
+        return settings.NOTES_PAGE_SIZE
+
+    def get_queryset(self):
+        """Только поля из покрывающего индекса (author, id, title, slug)."""
+        return super().get_queryset().only('id', 'title', 'slug', 'author')
 
+
+@method_decorator(note_condition, name='dispatch')
 class NoteDetail(NoteBase, generic.DetailView):
     """Заметка подробно."""
     template_name = 'notes/detail.html'
+    template_engine = 'lean'
+
+    def get_object(self, queryset=None):
+        return get_note_or_404(self.request, self.kwargs['slug'])
+
+
+class NoteImport(LoginRequiredMixin, generic.View):
+    """
+    Импорт заметок из JSON Lines.
+
+    Принимает файл в поле file или само тело запроса,
+    отвечает числом созданных заметок и ошибками по строкам.
+    """
+
+    def post(self, request, *args, **kwargs):
+        lines = request.FILES.get('file') or request
+        result = import_notes(lines, request.user)
+        return JsonResponse(result.as_dict())
+
+
+class NoteExport(NoteBase, generic.View):
+    """Выгрузка всех заметок пользователя в JSON Lines потоком."""
+
+    def get(self, request, *args, **kwargs):
+        response = StreamingHttpResponse(
+            export_notes(self.get_queryset()),
+            content_type='application/x-ndjson; charset=utf-8'
+        )
+        response['Content-Disposition'] = (
+            'attachment; filename="notes.jsonl"'
+        )
+        return response
@@ -0,0 +1,183 @@
+"""
+Метрики запросов: число и время SQL, время отрисовки шаблона и ответа.
+
+Middleware включается настройкой METRICS_ENABLED. Значения копятся
+в памяти процесса по имени URL и отдаются в формате Prometheus
+по адресу /metrics/, а для каждого ответа — в заголовке Server-Timing.
+Имена метрик начинаются с METRICS_PREFIX.
+"""
+import threading
+import time
+from collections import deque
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.http import Http404, HttpResponse
+
+WINDOW = 1000
+QUANTILES = (0.5, 0.95, 0.99)
+METRICS = {
+    'duration_seconds': 'Полное время обработки запроса.',
+    'sql_queries': 'Число SQL-запросов за запрос.',
+    'sql_seconds': 'Суммарное время SQL-запросов.',
+    'render_seconds': 'Время отрисовки шаблона.',
+}
+UNRESOLVED = 'unresolved'
+
+
+class Summary:
+    """Последние WINDOW значений для перцентилей и итоги за всё время."""
+
+    __slots__ = ('samples', 'count', 'total')
+
+    def __init__(self):
+        self.samples = deque(maxlen=WINDOW)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value):
+        self.samples.append(value)
+        self.count += 1
+        self.total += value
+
+    def quantiles(self):
+        ordered = sorted(self.samples)
+        if not ordered:
+            return {}
+        return {
+            quantile: ordered[min(int(quantile * len(ordered)),
+                                  len(ordered) - 1)]
+            for quantile in QUANTILES
+        }
+
+
+class Registry:
+    """Метрики по имени URL, общие для всех потоков процесса."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._summaries = {}
+
+    def observe(self, view, values):
+        with self._lock:
+            for name, value in values.items():
+                summary = self._summaries.get((name, view))
+                if summary is None:
+                    summary = self._summaries[(name, view)] = Summary()
+                summary.observe(value)
+
+    def snapshot(self):
+        """{(метрика, имя URL): (count, sum, {квантиль: значение})}."""
+        with self._lock:
+            return {
+                key: (summary.count, summary.total, summary.quantiles())
+                for key, summary in self._summaries.items()
+            }
+
+    def clear(self):
+        with self._lock:
+            self._summaries.clear()
+
+    def render(self):
+        """Текст в формате экспорта Prometheus, тип summary."""
+        snapshot = self.snapshot()
+        lines = []
+        for name, description in METRICS.items():
+            metric = f'{settings.METRICS_PREFIX}_{name}'
+            lines.append(f'# HELP {metric} {description}')
+            lines.append(f'# TYPE {metric} summary')
+            for (key, view), (count, total, quantiles) in sorted(
+                    snapshot.items()
+            ):
+                if key != name:
+                    continue
+                label = 'view="{}"'.format(
+                    view.replace('\\', '\\\\').replace('"', '\\"')
+                )
+                for quantile, value in quantiles.items():
+                    lines.append(
+                        f'{metric}{{{label},quantile="{quantile}"}} {value}'
+                    )
+                lines.append(f'{metric}_sum{{{label}}} {total}')
+                lines.append(f'{metric}_count{{{label}}} {count}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+
+class QueryTimer:
+    """Обёртка выполнения SQL, считающая запросы и их время."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.seconds += time.perf_counter() - start
+
+
+class MetricsMiddleware:
+    """
+    Снимает метрики каждого запроса.
+
+    Должен стоять первым в MIDDLEWARE, чтобы полное время
+    включало работу остальных middleware.
+    """
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        start = time.perf_counter()
+        timer = QueryTimer()
+        request.metrics_render_seconds = 0.0
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(timer))
+            response = self.get_response(request)
+        duration = time.perf_counter() - start
+        match = request.resolver_match
+        registry.observe(match.view_name if match else UNRESOLVED, {
+            'duration_seconds': duration,
+            'sql_queries': timer.count,
+            'sql_seconds': timer.seconds,
+            'render_seconds': request.metrics_render_seconds,
+        })
+        response['Server-Timing'] = ', '.join((
+            f'db;dur={timer.seconds * 1000:.1f};desc="{timer.count} SQL"',
+            f'render;dur={request.metrics_render_seconds * 1000:.1f}',
+            f'total;dur={duration * 1000:.1f}',
+        ))
+        return response
+
+    def process_template_response(self, request, response):
+        """Шаблон отрисуется сразу после этого вызова: засекаем время."""
+        start = time.perf_counter()
+
+        def rendered(response):
+            request.metrics_render_seconds = time.perf_counter() - start
+
+        response.add_post_render_callback(rendered)
+        return response
+
+
+def metrics_view(request):
+    """Метрики для Prometheus, доступные только с адресов из настроек."""
+    if (
+        not settings.METRICS_ENABLED
+        or request.META.get('REMOTE_ADDR') not in settings.METRICS_ALLOWED_IPS
+    ):
+        raise Http404
+    return HttpResponse(
+        registry.render(), content_type='text/plain; version=0.0.4'
+    )
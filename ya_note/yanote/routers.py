@@ -0,0 +1,29 @@
+from django.db import connections
+
+READ_ONLY_ALIAS = 'readonly'
+
+
+class ReadOnlyRouter:
+    """
+    Чтение через соединение только для чтения, если оно настроено.
+
+    Внутри транзакции на default чтение остаётся на default:
+    иначе запрос не увидел бы ещё не зафиксированных записей.
+    """
+
+    def db_for_read(self, model, **hints):
+        if (
+            READ_ONLY_ALIAS in connections.databases
+            and not connections['default'].in_atomic_block
+        ):
+            return READ_ONLY_ALIAS
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
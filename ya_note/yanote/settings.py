@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 
 from django.urls import reverse_lazy
@@ -22,6 +23,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'yanote.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -33,12 +35,27 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = 'yanote.urls'
 
+# Шаблоны компилируются один раз и хранятся в памяти процесса.
+# При DEBUG кеш включается переменной TEMPLATE_CACHE=1; runserver
+# всё равно сбрасывает его при изменении файлов шаблонов.
+TEMPLATE_CACHE = not DEBUG or os.getenv('TEMPLATE_CACHE') == '1'
+TEMPLATE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+if TEMPLATE_CACHE:
+    TEMPLATE_LOADERS = [
+        ('django.template.loaders.cached.Loader', TEMPLATE_LOADERS),
+    ]
+TEMPLATE_LIBRARIES = {'fragments': 'yanote.templating'}
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
-        'APP_DIRS': True,
         'OPTIONS': {
+            'loaders': TEMPLATE_LOADERS,
+            'libraries': TEMPLATE_LIBRARIES,
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
@@ -47,18 +64,81 @@ TEMPLATES = [
             ],
         },
     },
+    # Движок для горячих страниц: только user, без request,
+    # messages и debug, которые этим шаблонам не нужны.
+    {
+        'NAME': 'lean',
+        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'DIRS': [BASE_DIR / 'templates'],
+        'OPTIONS': {
+            'loaders': TEMPLATE_LOADERS,
+            'libraries': TEMPLATE_LIBRARIES,
+            'context_processors': [
+                'django.contrib.auth.context_processors.auth',
+            ],
+        },
+    },
 ]
+# Что компилируется при старте процесса (templating.warm_templates).
+WARM_TEMPLATES = [
+    'base.html',
+    'includes/header.html',
+    'includes/errors.html',
+    'notes/home.html',
+    'notes/list.html',
+    'notes/detail.html',
+]
+# Фрагменты, которые у анонимных пользователей одинаковы: они
+# рендерятся один раз на процесс.
+PRERENDERED_FRAGMENTS = ['includes/header.html']
 
 WSGI_APPLICATION = 'yanote.wsgi.application'
 
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+DATABASE_FILE = os.getenv('DJANGO_DATABASE_FILE', str(BASE_DIR / 'db.sqlite3'))
+# Файл тестовой базы для parallel_tests.py, по умолчанию в памяти.
+TEST_DATABASE = {'NAME': os.getenv('DJANGO_TEST_DATABASE')}
+SQLITE_PRAGMAS = {
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,
+    'busy_timeout': 5000,
 }
 
+# Профиль базы выбирается переменной окружения DB_PROFILE. В production
+# база работает в режиме WAL, соединения живут между запросами
+# и проверяются, а чтение идёт через отдельное соединение только для
+# чтения (см. yanote.routers.ReadOnlyRouter).
+DATABASE_PROFILES = {
+    'development': {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': DATABASE_FILE,
+            'TEST': TEST_DATABASE,
+        },
+    },
+    'production': {
+        'default': {
+            'ENGINE': 'yanote.sqlite',
+            'NAME': DATABASE_FILE,
+            'CONN_MAX_AGE': 600,
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {'pragmas': {'journal_mode': 'WAL', **SQLITE_PRAGMAS}},
+            'TEST': TEST_DATABASE,
+        },
+        'readonly': {
+            'ENGINE': 'yanote.sqlite',
+            'NAME': f'file:{DATABASE_FILE}?mode=ro',
+            'CONN_MAX_AGE': 600,
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {'pragmas': {'query_only': 'ON', **SQLITE_PRAGMAS}},
+            'TEST': {'MIRROR': 'default'},
+        },
+    },
+}
+DATABASES = DATABASE_PROFILES[os.getenv('DB_PROFILE', 'development')]
+DATABASE_ROUTERS = ['yanote.routers.ReadOnlyRouter']
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -87,3 +167,13 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 LOGIN_URL = reverse_lazy('users:login')
 LOGIN_REDIRECT_URL = reverse_lazy('notes:home')
+
+NOTES_PAGE_SIZE = 50
+
+# Сколько разных заголовков помнит кеш транслитерации notes.slugs.slugify.
+SLUGIFY_CACHE_SIZE = 4096
+
+# Метрики запросов: METRICS_ENABLED=1 включает middleware и /metrics/.
+METRICS_ENABLED = os.getenv('METRICS_ENABLED') == '1'
+METRICS_ALLOWED_IPS = ('127.0.0.1', '::1')
+METRICS_PREFIX = 'yanote_http_request'
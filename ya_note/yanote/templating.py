@@ -0,0 +1,72 @@
+"""
+Заранее скомпилированные шаблоны и готовые фрагменты страниц.
+
+warm_templates() вызывается из wsgi.py и asgi.py: шаблоны из
+WARM_TEMPLATES попадают в кеш загрузчика каждого движка ещё до
+первого запроса. Тег {% prerendered %} из библиотеки fragments
+отдаёт фрагмент, отрендеренный для анонимного пользователя один
+раз на процесс, а {% template_version %} — хеш исходника шаблона
+для ключей {% cache %}: после правки шаблона старые фрагменты
+в общем кеше не используются.
+"""
+import hashlib
+
+from django import template
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.template import Context, engines
+from django.utils.safestring import mark_safe
+
+register = template.Library()
+_fragments = {}
+_versions = {}
+
+
+def render_anonymous(engine, name):
+    from django.contrib.auth.models import AnonymousUser
+
+    return mark_safe(engine.get_template(name).render(
+        Context({'user': AnonymousUser()})
+    ))
+
+
+def prerender(engine, name):
+    """Фрагмент name для анонимного пользователя."""
+    if not settings.TEMPLATE_CACHE:
+        return render_anonymous(engine, name)
+    if name not in _fragments:
+        _fragments[name] = render_anonymous(engine, name)
+    return _fragments[name]
+
+
+@register.simple_tag(takes_context=True)
+def prerendered(context, name):
+    return prerender(context.template.engine, name)
+
+
+@register.simple_tag(takes_context=True)
+def template_version(context, name):
+    """Короткий хеш исходника шаблона name; с TEMPLATE_CACHE — раз."""
+    if not settings.TEMPLATE_CACHE or name not in _versions:
+        source = context.template.engine.get_template(name).source
+        _versions[name] = hashlib.md5(source.encode()).hexdigest()[:8]
+    return _versions[name]
+
+
+def warm_templates():
+    """Компилирует WARM_TEMPLATES во всех движках и готовит фрагменты."""
+    if not settings.TEMPLATE_CACHE:
+        return
+    for engine in engines.all():
+        for name in settings.WARM_TEMPLATES:
+            engine.get_template(name)
+        for name in settings.PRERENDERED_FRAGMENTS:
+            prerender(engine.engine, name)
+
+
+@receiver(setting_changed)
+def reset_fragments(setting, **kwargs):
+    if setting in ('TEMPLATES', 'TEMPLATE_CACHE', 'PRERENDERED_FRAGMENTS'):
+        _fragments.clear()
+        _versions.clear()